@@ -0,0 +1,129 @@
+"""Local HTTP server that answers the Ollama embedding API with fake vectors"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+import numpy as np
+
+
+class FakeOllamaServer:
+    """
+    Serves /api/embed and /api/embeddings on localhost, so the real Ollama
+    providers can be benchmarked without a model. Each request sleeps
+    `latency + per_text_latency * texts` seconds and returns deterministic
+    unit vectors derived from the hash of every text.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 768,
+        latency: float = 0.02,
+        per_text_latency: float = 0.0005,
+        port: int = 0,
+    ):
+        """
+        Args:
+            dimension (int): Length of the vectors
+            latency (float): Fixed seconds per request
+            per_text_latency (float): Extra seconds per text of a request
+            port (int): Port to listen on, 0 picks a free one
+        """
+        self.dimension = dimension
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "texts": 0, "max_concurrent": 0}
+        self._in_flight = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server, for OLLAMA_BASE_URL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        """Serve the requests in a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-ollama", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the number of requests and texts embedded"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).round(6).tolist()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed the texts after the simulated latency, counting the request"""
+        with self._lock:
+            self._in_flight += 1
+            self._stats["requests"] += 1
+            self._stats["texts"] += len(texts)
+            self._stats["max_concurrent"] = max(
+                self._stats["max_concurrent"], self._in_flight
+            )
+        try:
+            time.sleep(self.latency + self.per_text_latency * len(texts))
+            return [self._vector(text) for text in texts]
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Request handler bound to the server instance"""
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+            def _reply(self, status: int, payload: dict):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                """Answer the embedding endpoints of the Ollama API."""
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._reply(400, {"error": "invalid JSON"})
+                    return
+
+                model = request.get("model", "fake")
+                if self.path == "/api/embed":
+                    texts = request.get("input", [])
+                    if isinstance(texts, str):
+                        texts = [texts]
+                    self._reply(
+                        200, {"model": model, "embeddings": server.embed(texts)}
+                    )
+                elif self.path == "/api/embeddings":
+                    vectors = server.embed([request.get("prompt", "")])
+                    self._reply(200, {"embedding": vectors[0]})
+                else:
+                    self._reply(404, {"error": f"unknown endpoint {self.path}"})
+
+        return Handler
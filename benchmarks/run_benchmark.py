@@ -0,0 +1,372 @@
+"""
+End-to-end benchmark of Orchestrator.proccessing_repo.
+
+Generates a synthetic repository, serves fake Ollama embeddings from a local
+server and indexes the repository into the numpy store (or the PostgreSQL of
+the .env), reporting files/s, chunks/s, embeddings/s, rows/s and the busy
+time and peak RSS of each stage. The report is written as JSON, named after
+the current commit, so runs of different commits can be compared.
+
+Usage:
+    python -m benchmarks.run_benchmark --files 1000 --latency 0.05
+    python -m benchmarks.run_benchmark --env PIPELINE_ENABLED=true --env CHUNKING_PROCESSES=4
+"""
+
+import argparse
+import functools
+import inspect
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+MAIN_DIR = BENCHMARKS_DIR.parent
+sys.path.insert(0, str(MAIN_DIR))
+
+# pylint: disable=wrong-import-position
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.synthetic_repo import generate_repo
+
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _current_rss_mb() -> float:
+    """Resident memory of this process, or its peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+class StageProfiler:
+    """
+    Wraps methods of the pipeline objects to measure the calls and busy time
+    of each stage, while a sampler thread records the peak RSS seen while
+    every stage was running. Stages running in several threads at once add
+    up their busy time.
+    """
+
+    def __init__(self, sample_interval: float = 0.02):
+        self.sample_interval = sample_interval
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.peak_rss_mb = 0.0
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_interval):
+            rss = _current_rss_mb()
+            with self._lock:
+                self.peak_rss_mb = max(self.peak_rss_mb, rss)
+                for stage, active in self._active.items():
+                    if active:
+                        stats = self.stages[stage]
+                        stats["peak_rss_mb"] = max(stats["peak_rss_mb"], rss)
+
+    def start(self):
+        """Start sampling the memory."""
+        self._sampler.start()
+
+    def stop(self):
+        """Stop sampling the memory."""
+        self._stop.set()
+        self._sampler.join()
+
+    def count(self, name: str, value: int):
+        """Add to one of the counters of the run."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def _enter(self, stage: str):
+        rss = _current_rss_mb()
+        with self._lock:
+            self._active[stage] = self._active.get(stage, 0) + 1
+            stats = self.stages[stage]
+            stats["peak_rss_mb"] = max(stats["peak_rss_mb"], rss)
+
+    def _exit(self, stage: str, elapsed: float):
+        with self._lock:
+            self._active[stage] -= 1
+            self.stages[stage]["calls"] += 1
+            self.stages[stage]["seconds"] += elapsed
+
+    def wrap(
+        self,
+        target: Any,
+        method: str,
+        stage: str,
+        on_result: Optional[Callable[[tuple, Any], None]] = None,
+    ):
+        """
+        Replace a method of an instance by a measured version of it.
+
+        Args:
+            target: Instance whose method is measured, ignored when None.
+            method (str): Name of the method.
+            stage (str): Stage the busy time is added to.
+            on_result (Callable, optional): Called with the arguments and the
+                result of every call, to update the counters.
+        """
+        if target is None:
+            return
+        original = getattr(target, method)
+        self.stages.setdefault(stage, {"calls": 0, "seconds": 0.0, "peak_rss_mb": 0})
+
+        if inspect.iscoroutinefunction(original):
+
+            @functools.wraps(original)
+            async def measured_async(*args, **kwargs):
+                self._enter(stage)
+                start = time.perf_counter()
+                try:
+                    result = await original(*args, **kwargs)
+                finally:
+                    self._exit(stage, time.perf_counter() - start)
+                if on_result:
+                    on_result(args, result)
+                return result
+
+            setattr(target, method, measured_async)
+            return
+
+        @functools.wraps(original)
+        def measured(*args, **kwargs):
+            self._enter(stage)
+            start = time.perf_counter()
+            try:
+                result = original(*args, **kwargs)
+            finally:
+                self._exit(stage, time.perf_counter() - start)
+            if on_result:
+                on_result(args, result)
+            return result
+
+        setattr(target, method, measured)
+
+
+def _instrument(orchestrator, profiler: StageProfiler):
+    """Measure the stages of the orchestrator pipeline."""
+    splitter = orchestrator.repo_code_splitter
+
+    def count_chunks(_, chunk_items):
+        profiler.count("files", 1)
+        profiler.count("chunks", len(chunk_items))
+
+    def count_rows(args, failed_rows):
+        profiler.count("rows", len(args[0]) - len(failed_rows))
+
+    profiler.wrap(orchestrator.repo_manager, "get_repo", "clone")
+    profiler.wrap(orchestrator.repo_analyzer, "_scan_directory", "walk")
+    profiler.wrap(splitter, "_read_file_content", "read")
+    profiler.wrap(splitter, "_create_text_splitter", "split")
+    profiler.wrap(splitter, "_build_chunk_items", "chunk", count_chunks)
+    profiler.wrap(splitter.embedding_service, "generate_embeddings", "embed")
+    profiler.wrap(splitter.async_embedding_service, "agenerate_embeddings", "embed")
+    profiler.wrap(splitter.vecto_db, "insert_embeddings_bulk", "write", count_rows)
+    profiler.wrap(splitter.vecto_db, "build_vector_index", "index")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=MAIN_DIR,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    """Parse a language mix like "py=0.5,js=0.3,md=0.2"."""
+    mix = {}
+    for item in value.split(","):
+        extension, _, weight = item.partition("=")
+        mix["." + extension.strip().lstrip(".")] = float(weight or 1)
+    return mix
+
+
+def parse_args(argv=None):
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--files", type=int, default=500, help="Files of the repo")
+    parser.add_argument(
+        "--mix", default="py=0.5,js=0.3,md=0.2", help="Language mix of the repo"
+    )
+    parser.add_argument("--units", type=int, default=12, help="Units per file")
+    parser.add_argument(
+        "--duplicates", type=float, default=0.0, help="Share of copied files"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="Seconds per embedding request"
+    )
+    parser.add_argument(
+        "--per-text-latency",
+        type=float,
+        default=0.0005,
+        help="Extra seconds per embedded text",
+    )
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument(
+        "--store",
+        choices=("numpy", "pgvector"),
+        default="numpy",
+        help="numpy, or pgvector with the PostgreSQL settings of the .env",
+    )
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Setting of conf/config.py for the run, can be repeated",
+    )
+    parser.add_argument(
+        "--output", help="JSON report path (default benchmarks/results/<commit>.json)"
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the clone and the indexed data"
+    )
+    return parser.parse_args(argv)
+
+
+def run(args) -> Dict[str, Any]:
+    """Run one benchmark and return its report."""
+    work_dir = Path(tempfile.mkdtemp(prefix="doctech_bench_"))
+    repo_name = f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+    generate_repo(
+        work_dir / repo_name,
+        num_files=args.files,
+        language_mix=_parse_mix(args.mix),
+        units_per_file=args.units,
+        duplicate_ratio=args.duplicates,
+        seed=args.seed,
+    )
+
+    server = FakeOllamaServer(
+        dimension=args.dimension,
+        latency=args.latency,
+        per_text_latency=args.per_text_latency,
+    ).start()
+
+    # conf/config.py reads the environment when imported
+    settings = {
+        "EMBEDDING_PROVIDER": "ollama",
+        "OLLAMA_BASE_URL": server.url,
+        "DIMENSION_EMBEDDING_DIMENSION": str(args.dimension),
+        "VECTOR_STORE_BACKEND": args.store,
+        "EMBEDDING_CACHE_ENABLED": "false",
+    }
+    settings.update(item.split("=", 1) for item in args.env)
+    os.environ.update(settings)
+
+    # pylint: disable=import-outside-toplevel
+    from conf.config import METRICS_DIR, REPOS_DIR, STRUCTURE_DIR, VECTORS_DIR
+    from src.orchestrator import Orchestrator
+    from src.utils.loggers import FileLoggerConfigurator
+    from src.utils.metrics import metrics
+
+    logger = FileLoggerConfigurator().setup_logger("benchmark", level=2)
+    orchestrator = Orchestrator(logger)
+    profiler = StageProfiler()
+    _instrument(orchestrator, profiler)
+
+    profiler.start()
+    start = time.perf_counter()
+    try:
+        completed = orchestrator.proccessing_repo(
+            (work_dir / repo_name).resolve().as_uri()
+        )
+    finally:
+        elapsed = time.perf_counter() - start
+        profiler.stop()
+        server.stop()
+        if not args.keep:
+            if args.store == "pgvector":
+                # No file is kept: every chunk and reference of the table is stale
+                orchestrator.repo_code_splitter.vecto_db.delete_stale_chunks(
+                    {}, table_name=repo_name
+                )
+            shutil.rmtree(REPOS_DIR / repo_name, ignore_errors=True)
+            shutil.rmtree(VECTORS_DIR / repo_name, ignore_errors=True)
+            (STRUCTURE_DIR / f"{repo_name}.json").unlink(missing_ok=True)
+            for path in METRICS_DIR.glob(f"{repo_name}.*"):
+                path.unlink()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    totals = dict(profiler.counters)
+    totals["embeddings"] = server.get_stats()["texts"]
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "completed": completed,
+        "parameters": {
+            key: value for key, value in vars(args).items() if key != "output"
+        },
+        "settings": settings,
+        "elapsed_seconds": round(elapsed, 3),
+        "totals": totals,
+        "rates": {
+            f"{name}_per_s": round(totals.get(name, 0) / elapsed, 2)
+            for name in ("files", "chunks", "embeddings", "rows")
+        },
+        "embedding_server": server.get_stats(),
+        "peak_rss_mb": round(profiler.peak_rss_mb, 1),
+        "stages": {
+            stage: {
+                "calls": int(stats["calls"]),
+                "busy_seconds": round(stats["seconds"], 3),
+                "peak_rss_mb": round(stats["peak_rss_mb"], 1),
+            }
+            for stage, stats in profiler.stages.items()
+        },
+        "metrics": metrics.snapshot(),
+    }
+
+
+def main(argv=None):
+    """Run the benchmark and save its JSON report."""
+    args = parse_args(argv)
+    report = run(args)
+
+    output = Path(
+        args.output
+        or BENCHMARKS_DIR
+        / "results"
+        / f"{report['commit'] or 'nocommit'}_{report['timestamp'].replace(':', '')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    print(json.dumps({k: report[k] for k in ("elapsed_seconds", "rates")}, indent=2))
+    print(f"Report saved to {output}")
+    return 0 if report["completed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
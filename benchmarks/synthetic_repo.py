@@ -0,0 +1,126 @@
+"""Generator of synthetic repositories for the ingestion benchmarks"""
+
+import random
+from pathlib import Path
+from typing import Dict
+import git
+
+DEFAULT_LANGUAGE_MIX = {".py": 0.5, ".js": 0.3, ".md": 0.2}
+
+_WORDS = (
+    "repository embedding chunk vector index query document module function "
+    "class pipeline batch store server client request response commit tree"
+).split()
+
+
+def _python_file(rng: random.Random, idx: int, units: int) -> str:
+    parts = [f'"""Module {idx} of the synthetic repository"""\n\nimport os\n\n']
+    for unit in range(units):
+        if rng.random() < 0.3:
+            methods = "".join(
+                f"    def method_{m}(self, value):\n"
+                f"        total = value * {rng.randint(1, 99)}\n"
+                f"        return total + len(self.name)\n\n"
+                for m in range(rng.randint(1, 6))
+            )
+            parts.append(
+                f"class Model{idx}_{unit}:\n"
+                f'    """Synthetic class {unit}"""\n\n'
+                f"    def __init__(self, name):\n"
+                f"        self.name = name\n\n{methods}\n"
+            )
+        else:
+            parts.append(
+                f"def function_{idx}_{unit}(path, retries={rng.randint(1, 9)}):\n"
+                f'    """Synthetic function {unit}"""\n'
+                f"    for attempt in range(retries):\n"
+                f"        if os.path.exists(path):\n"
+                f"            return attempt * {rng.randint(1, 999)}\n"
+                f"    return None\n\n\n"
+            )
+    return "".join(parts)
+
+
+def _javascript_file(rng: random.Random, idx: int, units: int) -> str:
+    parts = [f"// Module {idx} of the synthetic repository\n\n"]
+    for unit in range(units):
+        parts.append(
+            f"export function handler{idx}_{unit}(request, options = {{}}) {{\n"
+            f"  const limit = options.limit || {rng.randint(1, 500)};\n"
+            f"  return request.items.slice(0, limit).map((item) => item.id);\n"
+            f"}}\n\n"
+        )
+    return "".join(parts)
+
+
+def _markdown_file(rng: random.Random, idx: int, units: int) -> str:
+    parts = [f"# Document {idx}\n\n"]
+    for unit in range(units):
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(30, 90)))
+        parts.append(f"## Section {unit}\n\n{words}.\n\n")
+    return "".join(parts)
+
+
+_GENERATORS = {
+    ".py": _python_file,
+    ".js": _javascript_file,
+    ".md": _markdown_file,
+}
+
+
+def generate_repo(
+    repo_path: str,
+    num_files: int = 200,
+    language_mix: Dict[str, float] = None,
+    units_per_file: int = 12,
+    duplicate_ratio: float = 0.0,
+    seed: int = 42,
+) -> Path:
+    """
+    Write a synthetic repository and commit it, so it can be cloned with a
+    file:// URL. The same arguments always produce the same files.
+
+    Args:
+        repo_path (str): Directory of the repository, created if missing.
+        num_files (int): Number of files.
+        language_mix (Dict[str, float]): Weight of each extension (.py, .js, .md).
+        units_per_file (int): Average functions, classes or sections per file.
+        duplicate_ratio (float): Share of files that copy an earlier one.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        Path: Path of the repository
+    """
+    rng = random.Random(seed)
+    language_mix = language_mix or DEFAULT_LANGUAGE_MIX
+    unknown = set(language_mix) - set(_GENERATORS)
+    if unknown:
+        raise ValueError(f"Unsupported extensions: {sorted(unknown)}")
+    extensions = list(language_mix)
+    weights = [language_mix[ext] for ext in extensions]
+
+    root = Path(repo_path)
+    root.mkdir(parents=True, exist_ok=True)
+    written = []
+    for idx in range(num_files):
+        extension = rng.choices(extensions, weights)[0]
+        directory = root / f"pkg_{idx % 10}" / f"sub_{idx % 3}"
+        directory.mkdir(parents=True, exist_ok=True)
+        if written and rng.random() < duplicate_ratio:
+            source = rng.choice(written)
+            extension, content = source.suffix, source.read_text(encoding="utf-8")
+        else:
+            units = max(1, int(rng.gauss(units_per_file, units_per_file / 3)))
+            content = _GENERATORS[extension](rng, idx, units)
+        path = directory / f"file_{idx}{extension}"
+        path.write_text(content, encoding="utf-8")
+        written.append(path)
+
+    repo = git.Repo.init(root)
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "benchmark")
+        config.set_value("user", "email", "benchmark@localhost")
+    repo.git.add(A=True)
+    repo.index.commit("Synthetic repository")
+    repo.close()
+    return root
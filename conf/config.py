@@ -7,6 +7,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+# Clone strategy: "full", "shallow" (depth 1) or "blobless" (--filter=blob:none)
+GIT_CLONE_STRATEGY = os.getenv("GIT_CLONE_STRATEGY", "shallow").lower()
+# Only check out the files with allowed extensions outside the ignored directories
+GIT_SPARSE_CHECKOUT = os.getenv("GIT_SPARSE_CHECKOUT", "false").lower() == "true"
+# Keep bare clones and read the files from the git object database, no checkout
+GIT_OBJECT_DB_MODE = os.getenv("GIT_OBJECT_DB_MODE", "false").lower() == "true"
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "ollama")
 EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "ollama")
 
@@ -25,6 +31,46 @@ OLLAMA_EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
 OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
 DIMENSION_EMBEDDING_DIMENSION = os.getenv("DIMENSION_EMBEDDING_DIMENSION", "768")
 
+# Number of chunks sent per embedding request and max payload size (bytes) of a request
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_BATCH_MAX_BYTES = int(os.getenv("EMBEDDING_BATCH_MAX_BYTES", "262144"))
+
+# Asynchronous embedding client (httpx connection pool, requests in flight, timeout in seconds)
+EMBEDDING_ASYNC_ENABLED = (
+    os.getenv("EMBEDDING_ASYNC_ENABLED", "false").lower() == "true"
+)
+EMBEDDING_ASYNC_CONCURRENCY = int(os.getenv("EMBEDDING_ASYNC_CONCURRENCY", "8"))
+EMBEDDING_REQUEST_TIMEOUT = float(os.getenv("EMBEDDING_REQUEST_TIMEOUT", "60"))
+
+# Resilience of the embedding calls: retries with exponential backoff and jitter,
+# adaptive (AIMD) limit of the calls in flight and circuit breaker pausing the run
+EMBEDDING_RESILIENCE_ENABLED = (
+    os.getenv("EMBEDDING_RESILIENCE_ENABLED", "true").lower() == "true"
+)
+EMBEDDING_RETRY_ATTEMPTS = int(os.getenv("EMBEDDING_RETRY_ATTEMPTS", "4"))
+EMBEDDING_RETRY_BACKOFF_SECONDS = float(
+    os.getenv("EMBEDDING_RETRY_BACKOFF_SECONDS", "0.5")
+)
+EMBEDDING_RETRY_MAX_BACKOFF_SECONDS = float(
+    os.getenv("EMBEDDING_RETRY_MAX_BACKOFF_SECONDS", "30")
+)
+EMBEDDING_CONCURRENCY_MIN = int(os.getenv("EMBEDDING_CONCURRENCY_MIN", "1"))
+EMBEDDING_CONCURRENCY_MAX = int(os.getenv("EMBEDDING_CONCURRENCY_MAX", "8"))
+EMBEDDING_LATENCY_TOLERANCE = float(os.getenv("EMBEDDING_LATENCY_TOLERANCE", "2.0"))
+EMBEDDING_BREAKER_THRESHOLD = int(os.getenv("EMBEDDING_BREAKER_THRESHOLD", "5"))
+EMBEDDING_BREAKER_RESET_SECONDS = float(
+    os.getenv("EMBEDDING_BREAKER_RESET_SECONDS", "5")
+)
+EMBEDDING_BREAKER_MAX_PAUSE_SECONDS = float(
+    os.getenv("EMBEDDING_BREAKER_MAX_PAUSE_SECONDS", "300")
+)
+# Rounds of re-embedding of the chunks that failed, at the end of a run
+EMBEDDING_RETRY_QUEUE_ROUNDS = int(os.getenv("EMBEDDING_RETRY_QUEUE_ROUNDS", "2"))
+
+# Persistent embedding cache (LRU bounded by number of entries)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
 # CONFIGURACIÓN DE POSGRESQL
 POSGRESQL_DB_NAME = os.getenv("POSGRESQL_DB_NAME")
 POSGRESQL_DB_USER = os.getenv("POSGRESQL_DB_USER")
@@ -32,12 +78,148 @@ POSGRESQL_DB_PSW = os.getenv("POSGRESQL_DB_PSW")
 POSGRESQL_DB_HOST = os.getenv("POSGRESQL_DB_HOST")
 POSGRESQL_DB_PORT = os.getenv("POSGRESQL_DB_PORT")
 
+# Vector store backend: "pgvector" (PostgreSQL) or "numpy" (in-process, under VECTORS_DIR)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pgvector")
+
+# Vector index: "ivfflat" or "hnsw". When deferred, the index is built after the
+# bulk load, sized on the final row count
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "ivfflat").lower()
+VECTOR_INDEX_DEFERRED = os.getenv("VECTOR_INDEX_DEFERRED", "true").lower() == "true"
+VECTOR_INDEX_MAINTENANCE_WORK_MEM = os.getenv(
+    "VECTOR_INDEX_MAINTENANCE_WORK_MEM", "512MB"
+)
+VECTOR_INDEX_PARALLEL_WORKERS = int(os.getenv("VECTOR_INDEX_PARALLEL_WORKERS", "2"))
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+# Default recall/latency trade-off of similarity searches
+VECTOR_SEARCH_PROBES = int(os.getenv("VECTOR_SEARCH_PROBES", "10"))
+VECTOR_SEARCH_EF_SEARCH = int(os.getenv("VECTOR_SEARCH_EF_SEARCH", "40"))
+
+# Number of rows written to the vector database per transaction
+DB_INSERT_BATCH_SIZE = int(os.getenv("DB_INSERT_BATCH_SIZE", "500"))
+# Thread-safe connection pool, so several writer threads can insert at once
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "false").lower() == "true"
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "8"))
+DB_POOL_HEALTH_CHECK = os.getenv("DB_POOL_HEALTH_CHECK", "true").lower() == "true"
+# Retries of transactions that fail on a lost connection
+DB_RETRY_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "3"))
+DB_RETRY_BACKOFF_SECONDS = float(os.getenv("DB_RETRY_BACKOFF_SECONDS", "0.5"))
+
+# Concurrent ingestion pipeline (reader/splitter -> embedder -> DB writer)
+PIPELINE_ENABLED = os.getenv("PIPELINE_ENABLED", "false").lower() == "true"
+PIPELINE_READER_WORKERS = int(os.getenv("PIPELINE_READER_WORKERS", "4"))
+PIPELINE_EMBED_WORKERS = int(os.getenv("PIPELINE_EMBED_WORKERS", "2"))
+PIPELINE_WRITER_WORKERS = int(os.getenv("PIPELINE_WRITER_WORKERS", "1"))
+# Capacity of the stage queues, in files (readers) or batches (embedders/writers)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+PIPELINE_BATCH_WAIT_SECONDS = float(os.getenv("PIPELINE_BATCH_WAIT_SECONDS", "0.05"))
+
+# Batch scheduler: repositories of a manifest indexed at once in worker processes,
+# started by "priority" or "size", with global caps shared by all the workers
+SCHEDULER_MAX_WORKERS = int(os.getenv("SCHEDULER_MAX_WORKERS", "4"))
+SCHEDULER_ORDER = os.getenv("SCHEDULER_ORDER", "priority").lower()
+SCHEDULER_EMBEDDING_CONCURRENCY = int(
+    os.getenv("SCHEDULER_EMBEDDING_CONCURRENCY", "16")
+)
+SCHEDULER_DB_CONNECTIONS = int(os.getenv("SCHEDULER_DB_CONNECTIONS", "16"))
+
+# Counters and latency histograms of each run, exported through the sinks listed in
+# METRICS_SINKS: "json" (summary), "prometheus" (textfile) and "http" (/metrics endpoint)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_SINKS = os.getenv("METRICS_SINKS", "json,prometheus")
+METRICS_PROMETHEUS_PORT = int(os.getenv("METRICS_PROMETHEUS_PORT", "9464"))
+
+# Write the logs from a background thread (QueueHandler/QueueListener)
+LOG_QUEUE_ENABLED = os.getenv("LOG_QUEUE_ENABLED", "true").lower() == "true"
+# Detail of the ingestion logs: "summary" (periodic progress lines), "file" (also
+# one line per file) or "chunk" (also one line per embedded chunk)
+LOG_DETAIL = os.getenv("LOG_DETAIL", "summary").lower()
+LOG_PROGRESS_INTERVAL_SECONDS = float(os.getenv("LOG_PROGRESS_INTERVAL_SECONDS", "10"))
+
+# Journal of the chunks stored by each run under CHECKPOINT_DIR, so an interrupted
+# run of the same commit resumes without embedding the stored chunks again
+CHECKPOINT_ENABLED = os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true"
+
+# Stream the analyzed files into the splitter while the tree is being walked,
+# optionally writing the JSON structure in the background
+STRUCTURE_STREAMING_ENABLED = (
+    os.getenv("STRUCTURE_STREAMING_ENABLED", "true").lower() == "true"
+)
+STRUCTURE_EXPORT_ENABLED = (
+    os.getenv("STRUCTURE_EXPORT_ENABLED", "true").lower() == "true"
+)
+# Also skip the files ignored by the .gitignore files of the repository
+ANALYZER_RESPECT_GITIGNORE = (
+    os.getenv("ANALYZER_RESPECT_GITIGNORE", "false").lower() == "true"
+)
+
 
 # Chunking configuration
 CHUNK_SIZE_CODE = 1000
 CHUNK_OVERLAP_CODE = 200
 CHUNK_SIZE_MD_ = 1500
 CHUNK_OVERLAP_MD = 150
+# Syntax-aware chunking: chunks follow function, class and top-level boundaries,
+# so they need much less overlap than the purely character-based split
+SYNTAX_CHUNKING_ENABLED = os.getenv("SYNTAX_CHUNKING_ENABLED", "true").lower() == "true"
+CHUNK_OVERLAP_SYNTAX = 50
+# Token-aware chunking: chunk lengths are measured in tokens of the embedding
+# model ("auto", "estimate", "tiktoken:<encoding>" or "huggingface:<name>") and
+# packed up to CHUNK_TOKEN_BUDGET tokens, capped by the context of the model.
+# Unknown tokenizers fall back to CHUNK_CHARS_PER_TOKEN characters per token
+TOKEN_CHUNKING_ENABLED = os.getenv("TOKEN_CHUNKING_ENABLED", "true").lower() == "true"
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "auto")
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "1024"))
+CHUNK_CHARS_PER_TOKEN = float(os.getenv("CHUNK_CHARS_PER_TOKEN", "3.0"))
+# Context length (tokens) of the known embedding models
+EMBEDDING_MODEL_CONTEXT_TOKENS = {
+    "nomic-embed-text": 8192,
+    "mxbai-embed-large": 512,
+    "all-minilm": 256,
+    "snowflake-arctic-embed": 512,
+    "bge-m3": 8192,
+    "text-embedding-3-small": 8191,
+    "text-embedding-3-large": 8191,
+    "text-embedding-ada-002": 8191,
+}
+# Read and split the files in worker processes (0 = in the ingestion thread),
+# sending them in batches of CHUNKING_FILE_BATCH_SIZE files
+CHUNKING_PROCESSES = int(os.getenv("CHUNKING_PROCESSES", "0"))
+CHUNKING_FILE_BATCH_SIZE = int(os.getenv("CHUNKING_FILE_BATCH_SIZE", "32"))
+# Skip the embedding of chunks already seen in the run: exact copies by content
+# hash and, optionally, near copies by MinHash/LSH. Copies are stored as
+# references to their canonical chunk
+CHUNK_DEDUP_ENABLED = os.getenv("CHUNK_DEDUP_ENABLED", "false").lower() == "true"
+CHUNK_DEDUP_NEAR_ENABLED = (
+    os.getenv("CHUNK_DEDUP_NEAR_ENABLED", "true").lower() == "true"
+)
+CHUNK_DEDUP_THRESHOLD = float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.9"))
+CHUNK_DEDUP_NUM_PERM = 64
+CHUNK_DEDUP_BANDS = 8
+CHUNK_DEDUP_SHINGLE_SIZE = 5
+# Language separators used for each extension (values of langchain's Language)
+CODE_LANGUAGE_BY_EXTENSION = {
+    ".py": "python",
+    ".js": "js",
+    ".jsx": "js",
+    ".vue": "js",
+    ".ts": "ts",
+    ".tsx": "ts",
+    ".java": "java",
+    ".cpp": "cpp",
+    ".h": "cpp",
+    ".c": "c",
+    ".go": "go",
+    ".rs": "rust",
+    ".php": "php",
+    ".rb": "ruby",
+    ".cs": "csharp",
+    ".kt": "kotlin",
+    ".swift": "swift",
+    ".html": "html",
+    ".ps1": "powershell",
+}
 
 # File and directory configurations
 IGNORED_DIRECTORIES = {
@@ -251,3 +433,7 @@ REPOS_DIR = DATA_DIR / "repo"
 DOCS_DIR = DATA_DIR / "docs"
 STRUCTURE_DIR = DATA_DIR / "struct"
 VECTORS_DIR = DATA_DIR / "vectors"
+CACHE_DIR = DATA_DIR / "cache"
+SCHEDULER_DIR = DATA_DIR / "scheduler"
+METRICS_DIR = DATA_DIR / "metrics"
+CHECKPOINT_DIR = DATA_DIR / "checkpoints"
@@ -1,11 +1,34 @@
 """This script sets up a logger for the application using the FileLoggerConfigurator."""
 
+import argparse
+from conf.config import SCHEDULER_MAX_WORKERS
+from src.core.batch_scheduler import BatchScheduler, load_manifest
 from src.orchestrator import Orchestrator
 from src.utils.loggers import FileLoggerConfigurator
 
 
+def parse_args():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description="Index repositories for RAG.")
+    parser.add_argument("url", nargs="?", help="URL of a single repository")
+    parser.add_argument(
+        "--manifest", help="JSON or YAML manifest of repositories to index in batch"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=SCHEDULER_MAX_WORKERS,
+        help="Repositories of the manifest indexed at the same time",
+    )
+    args = parser.parse_args()
+    if not args.url and not args.manifest:
+        parser.error("a repository URL or --manifest is required")
+    return args
+
+
 def main():
     """Main function to set up the logger."""
+    args = parse_args()
     logger_configurator = FileLoggerConfigurator()
     logger = logger_configurator.setup_logger(
         "application", level=0
@@ -13,9 +36,13 @@ def main():
     logger.info("Logger has been set up successfully.")
 
     try:
-        orchestrator_flow = Orchestrator(logger)
-        orchestrator_flow.proccessing_repo("SET_SOME_URL_REPO")
-    except IOError as e:
+        if args.manifest:
+            scheduler = BatchScheduler(logger, max_workers=args.workers)
+            scheduler.run(load_manifest(args.manifest))
+        else:
+            orchestrator_flow = Orchestrator(logger)
+            orchestrator_flow.proccessing_repo(args.url)
+    except (IOError, ValueError) as e:
         logger.exception("An error occurred while running the application. %s", e)
 
 
@@ -0,0 +1,299 @@
+"""Concurrent ingestion of many repositories across a process pool"""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+import yaml
+from conf.config import (
+    SCHEDULER_MAX_WORKERS,
+    SCHEDULER_ORDER,
+    SCHEDULER_EMBEDDING_CONCURRENCY,
+    SCHEDULER_DB_CONNECTIONS,
+    SCHEDULER_DIR,
+)
+
+_worker_state: Dict[str, Any] = {}
+
+
+@dataclass
+class RepoJob:
+    """One repository of the manifest"""
+
+    url: str
+    token: Optional[str] = None
+    username: Optional[str] = None
+    priority: int = 0
+    # Estimated size of the repository (e.g. in KB), used to start big ones first
+    size: int = 0
+
+
+def load_manifest(manifest_path: str) -> List[RepoJob]:
+    """
+    Load the repositories to index from a JSON or YAML manifest, either a list
+    of entries or a mapping with a "repos" list. Entries are URLs or objects
+    with "url" and optional "token", "username", "priority" and "size".
+
+    Raises:
+        ValueError: If the manifest has no valid entries.
+    """
+    with open(manifest_path, "r", encoding="utf-8") as file:
+        if Path(manifest_path).suffix.lower() in (".yaml", ".yml"):
+            data = yaml.safe_load(file)
+        else:
+            data = json.load(file)
+
+    entries = data.get("repos", []) if isinstance(data, dict) else data or []
+    names = {job_field.name for job_field in fields(RepoJob)}
+    jobs = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        if not isinstance(entry, dict) or not entry.get("url"):
+            raise ValueError(f"Invalid manifest entry: {entry!r}")
+        jobs.append(RepoJob(**{key: entry[key] for key in names if key in entry}))
+
+    if not jobs:
+        raise ValueError(f"The manifest {manifest_path} has no repositories")
+    return jobs
+
+
+def _init_worker(embedding_requests, db_connections):
+    """Set up the global limits and the logger of a worker process."""
+    # pylint: disable=import-outside-toplevel
+    from src.utils.loggers import FileLoggerConfigurator
+    from src.utils.resource_limits import set_global_limits
+
+    set_global_limits(embedding_requests, db_connections)
+    _worker_state["logger"] = FileLoggerConfigurator().setup_logger(
+        f"worker_{os.getpid()}", level=1
+    )
+
+
+def _run_job(job: RepoJob) -> Dict[str, Any]:
+    """Index one repository in a worker process."""
+    # pylint: disable=import-outside-toplevel
+    from src.orchestrator import Orchestrator
+
+    logger = _worker_state["logger"]
+    start = time.time()
+    try:
+        if "orchestrator" not in _worker_state:
+            _worker_state["orchestrator"] = Orchestrator(logger)
+        completed = _worker_state["orchestrator"].proccessing_repo(
+            job.url, job.token, job.username
+        )
+        status, error = ("succeeded", None) if completed else ("failed", None)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception("Repository %s failed", job.url)
+        status, error = "failed", str(e)
+    return {
+        "status": status,
+        "error": error,
+        "elapsed_seconds": round(time.time() - start, 2),
+        "pid": os.getpid(),
+    }
+
+
+class BatchScheduler:
+    """
+    Indexes the repositories of a manifest concurrently, one per worker
+    process, so clones, walks and embeddings of different repositories
+    overlap. All the workers share global caps on the embedding requests and
+    DB connections in flight.
+
+    Jobs are started by priority (highest first) or by size (biggest first,
+    so the long ones do not end up alone at the tail of the run). The status
+    of every repository is written to a JSON file after each change, and a
+    failing repository does not stop the others.
+
+    A worker process that dies (out of memory, segfault) breaks the pool and
+    every job running in it. The pool is then started again, and the jobs it
+    was running are run again one at a time, so only the one that crashes
+    its worker is marked as failed.
+    """
+
+    def __init__(
+        self,
+        logger,
+        max_workers: int = SCHEDULER_MAX_WORKERS,
+        order_by: str = SCHEDULER_ORDER,
+        embedding_concurrency: int = SCHEDULER_EMBEDDING_CONCURRENCY,
+        db_connections: int = SCHEDULER_DB_CONNECTIONS,
+        status_path: Optional[Path] = None,
+    ):
+        """
+        Args:
+            logger: Logger instance
+            max_workers (int): Repositories indexed at the same time
+            order_by (str): "priority" or "size"
+            embedding_concurrency (int): Embedding requests in flight across all workers
+            db_connections (int): DB connections in use across all workers
+            status_path (Path, optional): JSON file with the status of every repository
+        """
+        self.logger = logger
+        self.max_workers = max(1, max_workers)
+        self.order_by = order_by
+        self.embedding_concurrency = max(1, embedding_concurrency)
+        self.db_connections = max(1, db_connections)
+        self.status_path = Path(status_path or SCHEDULER_DIR / "status.json")
+        self.status: Dict[str, Dict[str, Any]] = {}
+
+    def _order(self, jobs: List[RepoJob]) -> List[RepoJob]:
+        if self.order_by == "size":
+            return sorted(jobs, key=lambda job: (-job.size, -job.priority))
+        if self.order_by != "priority":
+            self.logger.warning("Unknown job order '%s', using priority", self.order_by)
+        return sorted(jobs, key=lambda job: (-job.priority, -job.size))
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat(timespec="seconds")
+
+    def _set_status(self, job: RepoJob, **values):
+        entry = self.status.setdefault(
+            job.url, {"priority": job.priority, "size": job.size}
+        )
+        entry.update(values)
+        self._save_status()
+
+    def _save_status(self):
+        try:
+            self.status_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.status_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self.status, file, indent=2)
+            os.replace(tmp_path, self.status_path)
+        except OSError as e:
+            self.logger.error("Could not save the scheduler status: %s", e)
+
+    def _start_executor(self, context) -> ProcessPoolExecutor:
+        """
+        Start a pool with its own global limits: the slots held by the workers
+        of a crashed pool are never released, so they are not shared with the
+        next one.
+        """
+        embedding_requests = context.BoundedSemaphore(self.embedding_concurrency)
+        db_connections = context.BoundedSemaphore(self.db_connections)
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(embedding_requests, db_connections),
+        )
+
+    def _submit(
+        self,
+        executor: ProcessPoolExecutor,
+        pending: List[RepoJob],
+        suspects: List[RepoJob],
+        retried: Set[str],
+        running: Dict[Future, RepoJob],
+    ) -> bool:
+        """
+        Submit only what can run now, so the order of the jobs holds. The jobs
+        that were running when a worker crashed (`retried`) run again alone.
+
+        Returns:
+            bool: False if the pool is broken
+        """
+        while True:
+            if any(job.url in retried for job in running.values()):
+                return True
+            if suspects:
+                if running:
+                    return True
+                queue = suspects
+            elif pending and len(running) < self.max_workers:
+                queue = pending
+            else:
+                return True
+            try:
+                future = executor.submit(_run_job, queue[-1])
+            except BrokenProcessPool:
+                return False
+            job = queue.pop()
+            running[future] = job
+            self._set_status(job, status="running", started_at=self._now())
+
+    def run(self, jobs: List[RepoJob]) -> Dict[str, Dict[str, Any]]:
+        """
+        Index every repository of the list.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Final status of each repository by URL
+        """
+        jobs = self._order(jobs)
+        for job in jobs:
+            self._set_status(job, status="queued")
+
+        context = multiprocessing.get_context()
+        self.logger.info(
+            "Indexing %d repositories with %d workers", len(jobs), self.max_workers
+        )
+        start = time.time()
+        pending = list(reversed(jobs))
+        # Jobs running when a worker crashed, run again one at a time
+        suspects: List[RepoJob] = []
+        retried: Set[str] = set()
+        running: Dict[Future, RepoJob] = {}
+        executor = self._start_executor(context)
+        try:
+            while pending or suspects or running:
+                broken = not self._submit(executor, pending, suspects, retried, running)
+                done = set()
+                if not broken:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    broken = any(
+                        isinstance(future.exception(), BrokenProcessPool)
+                        for future in done
+                    )
+                if broken:
+                    # The other jobs of a broken pool fail right away
+                    done, _ = wait(running)
+                # A job that crashed its worker while alone is the culprit
+                alone = len(running) == 1
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        if not alone:
+                            suspects.append(job)
+                            retried.add(job.url)
+                            self._set_status(job, status="queued")
+                            continue
+                        result = {
+                            "status": "failed",
+                            "error": f"The worker process crashed: {e}",
+                        }
+                    except Exception as e:  # pylint: disable=broad-except
+                        result = {"status": "failed", "error": str(e)}
+                    self._set_status(job, finished_at=self._now(), **result)
+                    self.logger.info("Repository %s %s", job.url, result.get("status"))
+                if broken:
+                    self.logger.warning(
+                        "A worker process crashed, restarting the pool (%d jobs to retry)",
+                        len(suspects),
+                    )
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = self._start_executor(context)
+        finally:
+            executor.shutdown()
+
+        failed = [
+            url for url, entry in self.status.items() if entry["status"] != "succeeded"
+        ]
+        self.logger.info(
+            "Batch finished in %.2f seconds: %d succeeded, %d failed",
+            time.time() - start,
+            len(jobs) - len(failed),
+            len(failed),
+        )
+        return self.status
@@ -0,0 +1,179 @@
+"""Durable journal of the chunks stored by an ingestion run, to resume it"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+from conf.config import CHECKPOINT_DIR
+
+
+class CheckpointJournal:
+    """
+    Append-only JSON lines file with the progress of the indexing of one
+    commit of a repository, under CHECKPOINT_DIR.
+
+    The first line identifies the run (repository, commit and whether it is
+    incremental). After every DB write one line lists the (filename,
+    chunk_order) pairs just stored, rows and references alike, and the files
+    whose chunks are now all stored; each line is fsync'ed before the write
+    is considered done. A new run of the same commit resumes from it: the
+    finished files are skipped and the stored chunks of the unfinished ones
+    are neither embedded nor inserted again.
+
+    The journal is removed once the commit is recorded as indexed.
+    """
+
+    def __init__(self, logger, directory: Path = CHECKPOINT_DIR):
+        """
+        Args:
+            logger: Logger instance
+            directory (Path): Directory of the journal files
+        """
+        self.logger = logger
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._file = None
+        self.resumed = False
+        self.done: Set[str] = set()
+        self._stored: Dict[str, Set[int]] = {}
+        self._expected: Dict[str, Set[int]] = {}
+        self._failed: Set[str] = set()
+        self._finished: List[str] = []
+
+    def _path(self, repo_name: str) -> Path:
+        return self.directory / f"{repo_name.lower()}.jsonl"
+
+    def open(self, repo_name: str, commit: str, incremental: bool) -> bool:
+        """
+        Start journaling the indexing of a commit, loading the progress of a
+        previous interrupted run of the same commit.
+
+        Returns:
+            bool: True if a previous run is resumed
+        """
+        self.close()
+        self.resumed = False
+        self.done, self._stored = set(), {}
+        self._expected, self._failed, self._finished = {}, set(), []
+        header = {"repo": repo_name, "commit": commit, "incremental": incremental}
+        path = self._path(repo_name)
+
+        lines = self._read_lines(path)
+        if lines and lines[0] == header:
+            self.resumed = True
+            for entry in lines[1:]:
+                for filename, chunk_order in entry.get("stored", []):
+                    self._stored.setdefault(filename, set()).add(chunk_order)
+                self.done.update(entry.get("done", []))
+            for filename in self.done:
+                self._stored.pop(filename, None)
+            self.logger.info(
+                "Resuming the indexing of %s at %s: %d files done, %d partially stored",
+                repo_name,
+                commit,
+                len(self.done),
+                len(self._stored),
+            )
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # pylint: disable=consider-using-with
+            self._file = open(path, "a" if self.resumed else "w", encoding="utf-8")
+            if not self.resumed:
+                self._append(header)
+        except OSError as e:
+            self.logger.error("Could not open the checkpoint journal %s: %s", path, e)
+            self._file = None
+        return self.resumed
+
+    def _read_lines(self, path: Path) -> List[dict]:
+        if not path.exists():
+            return []
+        entries = []
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Torn last line of a crash, everything before it is valid
+                        break
+        except OSError as e:
+            self.logger.warning("Could not read the checkpoint journal %s: %s", path, e)
+            return []
+        return entries
+
+    def _append(self, entry: dict):
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @property
+    def touched_files(self) -> Set[str]:
+        """Files with chunks stored by a previous run of the commit"""
+        return self.done | set(self._stored)
+
+    def is_stored(self, filename: str, chunk_order: int) -> bool:
+        """True if the chunk was stored by a previous run of the commit."""
+        return chunk_order in self._stored.get(filename, ())
+
+    def expect(self, filename: str, chunk_orders: Iterable[int]):
+        """
+        Register the chunks of a file that still have to be stored. A file
+        with none left is finished.
+        """
+        orders = set(chunk_orders)
+        with self._lock:
+            if orders:
+                self._expected[filename] = orders
+            else:
+                self._finished.append(filename)
+
+    def fail(self, filename: str):
+        """Keep a file unfinished, one of its chunks could not be stored."""
+        with self._lock:
+            self._failed.add(filename)
+
+    def record_stored(self, pairs: Iterable[Tuple[str, int]]):
+        """
+        Durably record the chunks just stored, and the files they finish.
+
+        Args:
+            pairs (Iterable[Tuple[str, int]]): (filename, chunk_order) of the
+                rows or references written
+        """
+        with self._lock:
+            stored = []
+            for filename, chunk_order in pairs:
+                stored.append((filename, chunk_order))
+                orders = self._expected.get(filename)
+                if orders is None:
+                    continue
+                orders.discard(chunk_order)
+                if not orders:
+                    del self._expected[filename]
+                    if filename not in self._failed:
+                        self._finished.append(filename)
+            finished, self._finished = self._finished, []
+            if self._file is None or not (stored or finished):
+                return
+            try:
+                self._append({"stored": stored, "done": finished})
+            except OSError as e:
+                self.logger.error("Could not write the checkpoint journal: %s", e)
+
+    def close(self):
+        """Close the journal file, keeping it for a resume."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def discard(self, repo_name: str):
+        """Remove the journal of a repository whose commit is fully indexed."""
+        self.close()
+        try:
+            self._path(repo_name).unlink(missing_ok=True)
+        except OSError as e:
+            self.logger.warning("Could not remove the checkpoint journal: %s", e)
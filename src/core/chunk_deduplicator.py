@@ -0,0 +1,241 @@
+"""Exact and near-duplicate detection of chunks before embedding"""
+
+import hashlib
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from conf.config import (
+    CHUNK_DEDUP_NEAR_ENABLED,
+    CHUNK_DEDUP_THRESHOLD,
+    CHUNK_DEDUP_NUM_PERM,
+    CHUNK_DEDUP_BANDS,
+    CHUNK_DEDUP_SHINGLE_SIZE,
+)
+
+ChunkItem = Tuple[str, int, str]
+# (filename, chunk_order, canonical_filename, canonical_chunk_order, match_type)
+ReferenceItem = Tuple[str, int, str, int, str]
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class ChunkDeduplicator:
+    """
+    Drops the chunks already seen in the current run.
+
+    Exact copies are found by the SHA-256 of their whitespace-trimmed content.
+    Near copies (a renamed variable, another license year) are found with
+    MinHash signatures over token shingles, bucketed by LSH bands so only
+    chunks sharing a band are compared. For every dropped chunk a reference
+    to its canonical chunk, the first one seen, is returned instead.
+
+    Instances are thread-safe, so the readers of the ingestion pipeline can
+    share one.
+    """
+
+    def __init__(
+        self,
+        logger,
+        near_duplicates: bool = CHUNK_DEDUP_NEAR_ENABLED,
+        threshold: float = CHUNK_DEDUP_THRESHOLD,
+        num_perm: int = CHUNK_DEDUP_NUM_PERM,
+        bands: int = CHUNK_DEDUP_BANDS,
+        shingle_size: int = CHUNK_DEDUP_SHINGLE_SIZE,
+    ):
+        """
+        Args:
+            logger: Logger instance
+            near_duplicates (bool): Also drop near copies, not only exact ones
+            threshold (float): Minimum estimated Jaccard similarity of a near copy
+            num_perm (int): Length of the MinHash signatures
+            bands (int): LSH bands, num_perm must be divisible by them
+            shingle_size (int): Tokens per shingle
+        """
+        if num_perm % bands:
+            raise ValueError("CHUNK_DEDUP_NUM_PERM must be divisible by the bands")
+
+        self.logger = logger
+        self.near_duplicates = near_duplicates
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Multiply-shift hash family: odd multipliers, the high 32 bits are kept
+        rng = np.random.default_rng(1)
+        self._multipliers = rng.integers(
+            1, 2**63, size=num_perm, dtype=np.uint64
+        ) | np.uint64(1)
+        self._increments = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self._exact: Dict[bytes, Tuple[str, int]] = {}
+        self._signatures: List[np.ndarray] = []
+        self._canonicals: List[Tuple[str, int]] = []
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        # Blob SHA -> (chunk_order, canonical_filename, canonical_chunk_order, size)
+        self._blobs: Dict[str, List[Tuple[int, str, int, int]]] = {}
+        self._stats = {
+            "dedup_exact": 0,
+            "dedup_near": 0,
+            "embeddings_saved": 0,
+            "bytes_saved": 0,
+        }
+
+    def reset(self):
+        """Forget the chunks seen, starting a new run."""
+        with self._lock:
+            self._exact.clear()
+            self._signatures.clear()
+            self._canonicals.clear()
+            self._buckets.clear()
+            self._blobs.clear()
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def _signature(self, content: str) -> Optional[np.ndarray]:
+        """MinHash signature of the token shingles, None for too short chunks."""
+        tokens = _TOKEN_PATTERN.findall(content.lower())
+        if len(tokens) < self.shingle_size:
+            return None
+
+        shingles = {
+            " ".join(tokens[i : i + self.shingle_size])
+            for i in range(len(tokens) - self.shingle_size + 1)
+        }
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        with np.errstate(over="ignore"):
+            permuted = (
+                hashes[:, None] * self._multipliers + self._increments
+            ) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        step = self.rows_per_band
+        return [
+            (band, signature[band * step : (band + 1) * step].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _find_near(
+        self, signature: np.ndarray, keys: List[Tuple[int, bytes]]
+    ) -> Optional[int]:
+        seen = set()
+        for key in keys:
+            for candidate in self._buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                similarity = np.mean(self._signatures[candidate] == signature)
+                if similarity >= self.threshold:
+                    return candidate
+        return None
+
+    def filter(
+        self, chunk_items: List[ChunkItem]
+    ) -> Tuple[List[ChunkItem], List[ReferenceItem]]:
+        """
+        Split the chunks into the ones to embed and references for the copies.
+
+        Args:
+            chunk_items (List[ChunkItem]): (filename, chunk_order, content) items.
+
+        Returns:
+            Tuple: Chunks to embed and (filename, chunk_order, canonical_filename,
+            canonical_chunk_order, match_type) references of the dropped ones
+        """
+        kept, references = [], []
+        for filename, chunk_order, content in chunk_items:
+            digest = hashlib.sha256(content.strip().encode("utf-8")).digest()
+            signature = self._signature(content) if self.near_duplicates else None
+
+            with self._lock:
+                canonical, match_type = self._exact.get(digest), "exact"
+                if canonical is None and signature is not None:
+                    keys = self._band_keys(signature)
+                    candidate = self._find_near(signature, keys)
+                    if candidate is not None:
+                        canonical, match_type = self._canonicals[candidate], "near"
+                    else:
+                        position = len(self._canonicals)
+                        self._signatures.append(signature)
+                        self._canonicals.append((filename, chunk_order))
+                        for key in keys:
+                            self._buckets.setdefault(key, []).append(position)
+
+                if canonical is None:
+                    self._exact[digest] = (filename, chunk_order)
+                    kept.append((filename, chunk_order, content))
+                    continue
+
+                self._stats[f"dedup_{match_type}"] += 1
+                self._stats["embeddings_saved"] += 1
+                self._stats["bytes_saved"] += len(content.encode("utf-8"))
+
+            references.append((filename, chunk_order, *canonical, match_type))
+        return kept, references
+
+    def filter_blob(
+        self, filename: str, blob_sha: str
+    ) -> Optional[List[ReferenceItem]]:
+        """
+        Check a whole file by the SHA of its git blob before reading it.
+
+        Returns:
+            Optional[List[ReferenceItem]]: References of its chunks when an
+            identical file was already processed in the run, None otherwise
+        """
+        with self._lock:
+            chunks = self._blobs.get(blob_sha)
+            if chunks is None:
+                return None
+            self._stats["dedup_exact"] += len(chunks)
+            self._stats["embeddings_saved"] += len(chunks)
+            self._stats["bytes_saved"] += sum(size for *_, size in chunks)
+        return [
+            (filename, chunk_order, canonical_filename, canonical_order, "exact")
+            for chunk_order, canonical_filename, canonical_order, _ in chunks
+        ]
+
+    def register_blob(
+        self,
+        blob_sha: str,
+        kept: List[ChunkItem],
+        references: List[ReferenceItem],
+        sizes: Dict[int, int],
+    ):
+        """
+        Remember the chunks of a processed file by its blob SHA, pointing to
+        the canonical chunk of each one.
+
+        Args:
+            blob_sha (str): SHA of the git blob of the file.
+            kept (List[ChunkItem]): Chunks of the file that will be embedded.
+            references (List[ReferenceItem]): References of its dropped chunks.
+            sizes (Dict[int, int]): Size in bytes of each chunk, by chunk order.
+        """
+        chunks = [
+            (chunk_order, filename, chunk_order, sizes.get(chunk_order, 0))
+            for filename, chunk_order, _ in kept
+        ] + [
+            (
+                chunk_order,
+                canonical_filename,
+                canonical_order,
+                sizes.get(chunk_order, 0),
+            )
+            for _, chunk_order, canonical_filename, canonical_order, _ in references
+        ]
+        with self._lock:
+            self._blobs.setdefault(blob_sha, sorted(chunks))
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the number of dropped chunks and the embedding work saved"""
+        with self._lock:
+            return dict(self._stats)
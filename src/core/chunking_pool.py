@@ -0,0 +1,153 @@
+"""Reading and splitting of files in worker processes"""
+
+import collections
+import itertools
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.core.code_chunker import CodeChunker
+from src.core.token_counter import get_chunk_sizing
+from conf.config import (
+    SYNTAX_CHUNKING_ENABLED,
+    CHUNKING_PROCESSES,
+    CHUNKING_FILE_BATCH_SIZE,
+)
+
+# (filename, path to read, content already read); filename selects the splitter
+FileJob = Tuple[str, Optional[str], Optional[str]]
+
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(logger_name: str):
+    logger = logging.getLogger(logger_name)
+    _worker_state["logger"] = logger
+    sizing = get_chunk_sizing(logger)
+    _worker_state["code_chunker"] = CodeChunker(logger, sizing)
+    _worker_state["text_splitter"] = RecursiveCharacterTextSplitter(
+        chunk_size=sizing.chunk_size,
+        chunk_overlap=sizing.chunk_overlap,
+        length_function=sizing.length_function,
+    )
+
+
+def _split_file(job: FileJob) -> Optional[List[str]]:
+    filename, path, content = job
+    if content is None:
+        try:
+            with open(path, "r", encoding="utf-8") as file_content:
+                content = file_content.read()
+        except (IOError, UnicodeDecodeError) as e:
+            _worker_state["logger"].error("Could not read %s: %s", path, e)
+            return None
+    if SYNTAX_CHUNKING_ENABLED:
+        return _worker_state["code_chunker"].split(content, filename)
+    return _worker_state["text_splitter"].split_text(content)
+
+
+def _split_batch(batch: List[FileJob]) -> List[Optional[List[str]]]:
+    """Read and split a batch of files inside a worker process."""
+    return [_split_file(job) for job in batch]
+
+
+class ChunkingPool:
+    """
+    Fans the reading and splitting of files out to a ProcessPoolExecutor,
+    so those CPU-bound stages use more than one core.
+
+    Files are sent in batches of `batch_size` to amortize the pickling of
+    the jobs and results, and at most two batches per process are in flight,
+    so a streamed list of files is not read ahead without bound. Results
+    come back in the order of the jobs, whatever the number of processes.
+
+    If a worker dies (out of memory, segfault) the pool is broken: the files
+    not split yet, in flight or not, are then split in this process.
+    """
+
+    def __init__(
+        self,
+        logger,
+        processes: int = CHUNKING_PROCESSES,
+        batch_size: int = CHUNKING_FILE_BATCH_SIZE,
+    ):
+        """
+        Args:
+            logger: Logger instance, the workers log to the logger of the same name
+            processes (int): Worker processes
+            batch_size (int): Files per task sent to a worker
+        """
+        self.logger = logger
+        self.processes = max(1, processes)
+        self.batch_size = max(1, batch_size)
+
+    def imap(self, jobs: Iterable[Tuple[Any, FileJob]]) -> Iterator[Tuple[Any, Any]]:
+        """
+        Read and split the files of the jobs in the worker processes.
+
+        Args:
+            jobs (Iterable[Tuple[Any, FileJob]]): (key, job) pairs, the key is
+                returned untouched with the result of its job
+
+        Yields:
+            Tuple[Any, Optional[List[str]]]: The key and the chunks of the
+            file, None if it could not be read, in the order of the jobs
+        """
+        jobs = iter(jobs)
+        # (key, job) pairs of the batches sent, with their future once submitted
+        in_flight: Deque[Tuple[List[Tuple[Any, FileJob]], Optional[Future]]] = (
+            collections.deque()
+        )
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context(),
+                initializer=_init_worker,
+                initargs=(self.logger.name,),
+            ) as executor:
+                while True:
+                    batch = list(itertools.islice(jobs, self.batch_size))
+                    if batch:
+                        # Queued first, so a batch refused by a broken pool is kept
+                        in_flight.append((batch, None))
+                        in_flight[-1] = (
+                            batch,
+                            executor.submit(_split_batch, [job for _, job in batch]),
+                        )
+                    if in_flight and (
+                        not batch or len(in_flight) >= 2 * self.processes
+                    ):
+                        sent, future = in_flight[0]
+                        try:
+                            results = future.result()
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as e:  # pylint: disable=broad-except
+                            self.logger.error("A chunking worker failed: %s", e)
+                            results = [None] * len(sent)
+                        in_flight.popleft()
+                        yield from zip((key for key, _ in sent), results)
+                    elif not batch:
+                        return
+        except BrokenProcessPool as e:
+            self.logger.warning(
+                "A chunking worker died (%s), splitting the remaining files "
+                "in this process",
+                e,
+            )
+        yield from self._split_in_process(in_flight, jobs)
+
+    def _split_in_process(
+        self,
+        in_flight: Deque[Tuple[List[Tuple[Any, FileJob]], Optional[Future]]],
+        jobs: Iterator[Tuple[Any, FileJob]],
+    ) -> Iterator[Tuple[Any, Any]]:
+        """Split the batches left in flight, then the rest of the jobs, here."""
+        _init_worker(self.logger.name)
+        pairs = itertools.chain(
+            (pair for batch, _ in in_flight for pair in batch), jobs
+        )
+        for key, job in pairs:
+            yield key, _split_batch([job])[0]
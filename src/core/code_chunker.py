@@ -0,0 +1,192 @@
+"""Syntax-aware chunking of code files"""
+
+import ast
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from langchain_text_splitters import Language, RecursiveCharacterTextSplitter
+from src.core.token_counter import ChunkSizing, get_chunk_sizing
+from conf.config import CODE_LANGUAGE_BY_EXTENSION
+
+# The AST construction of CPython 3.11 is not thread-safe, it raises
+# "SystemError: AST constructor recursion depth mismatch" when modules are
+# parsed concurrently (pipeline reader threads)
+_PARSE_LOCK = threading.Lock()
+
+
+class CodeChunker:
+    """
+    Splits code files on function, class and top-level boundaries.
+
+    Python files are parsed with `ast` and their top-level statements packed
+    into chunks of up to `chunk_size`, without overlap; classes larger than
+    a chunk are split by method. Other languages use the separators of
+    langchain's `Language`, and unknown extensions the plain character
+    splitter. Splitters are built once per extension and reused.
+
+    Lengths are measured with the ChunkSizing, in characters or in tokens of
+    the embedding model.
+    """
+
+    def __init__(self, logger, sizing: Optional[ChunkSizing] = None):
+        """
+        Args:
+            logger: Logger instance
+            sizing (ChunkSizing, optional): Length function and sizes of the
+                chunks. Defaults to get_chunk_sizing.
+        """
+        self.logger = logger
+        self.sizing = sizing or get_chunk_sizing(logger)
+        self.length = self.sizing.length_function
+        self.chunk_size = self.sizing.chunk_size
+        self.chunk_overlap = self.sizing.syntax_overlap
+        self._splitters: Dict[str, RecursiveCharacterTextSplitter] = {}
+        self._splitters_lock = threading.Lock()
+
+    def get_splitter(self, extension: str) -> RecursiveCharacterTextSplitter:
+        """
+        Returns the cached splitter of an extension, building it on first use.
+        """
+        extension = extension.lower()
+        splitter = self._splitters.get(extension)
+        if splitter is not None:
+            return splitter
+
+        with self._splitters_lock:
+            if extension not in self._splitters:
+                self._splitters[extension] = self._build_splitter(extension)
+            return self._splitters[extension]
+
+    def _build_splitter(self, extension: str) -> RecursiveCharacterTextSplitter:
+        language = CODE_LANGUAGE_BY_EXTENSION.get(extension)
+        if language:
+            try:
+                return RecursiveCharacterTextSplitter.from_language(
+                    Language(language),
+                    chunk_size=self.chunk_size,
+                    chunk_overlap=self.chunk_overlap,
+                    length_function=self.length,
+                )
+            except ValueError as e:
+                self.logger.warning(
+                    "No separators for language '%s', using the default: %s",
+                    language,
+                    e,
+                )
+        return RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.sizing.chunk_overlap,
+            length_function=self.length,
+        )
+
+    def split(self, content: str, filename: str) -> List[str]:
+        """
+        Divide the content of a file in chunks that follow its syntax.
+
+        Args:
+            content (str): The content of the file to be divided.
+            filename (str): Name of the file, its extension selects the splitter.
+
+        Returns:
+            List[str]: List of text fragments.
+        """
+        _, extension = os.path.splitext(filename.lower())
+        if extension == ".py":
+            chunks = self._split_python(content)
+            if chunks is not None:
+                return chunks
+        return self.get_splitter(extension).split_text(content)
+
+    def _split_python(self, content: str) -> Optional[List[str]]:
+        """
+        Pack the top-level units of a Python module into chunks.
+
+        Returns:
+            Optional[List[str]]: The chunks, None if the module cannot be parsed
+            and has to be split by characters.
+        """
+        try:
+            with _PARSE_LOCK:
+                tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            return None
+        except (SystemError, RecursionError, MemoryError) as e:
+            # Too deeply nested or too large for the parser
+            self.logger.warning(
+                "Could not parse the Python module, splitting it by characters: %s", e
+            )
+            return None
+        if not tree.body:
+            return None
+
+        lines = content.splitlines(keepends=True)
+        units = self._python_units(tree.body, lines, 0, len(lines))
+        return self._pack(units)
+
+    def _python_units(
+        self, nodes: List[ast.stmt], lines: List[str], start: int, end: int
+    ) -> List[str]:
+        """
+        Cut lines[start:end] at the statements of `nodes`. The comments and
+        blank lines before a statement go with it and the trailing lines with
+        the last one. Units larger than a chunk are split further.
+        """
+        units = []
+        bounds = self._node_bounds(nodes, start, end)
+        for node, (node_start, node_end) in zip(nodes, bounds):
+            text = "".join(lines[node_start:node_end])
+            if not text.strip():
+                continue
+            if self.length(text) <= self.chunk_size:
+                units.append(text)
+            elif isinstance(node, ast.ClassDef) and node.body:
+                # The class header (decorators, signature) leads its first member
+                body_start = self._first_line(node.body[0])
+                header = "".join(lines[node_start:body_start])
+                members = self._python_units(node.body, lines, body_start, node_end)
+                if (
+                    members
+                    and self.length(header) + self.length(members[0]) <= self.chunk_size
+                ):
+                    members[0] = header + members[0]
+                elif header.strip():
+                    units.append(header)
+                units.extend(members)
+            else:
+                units.extend(self.get_splitter(".py").split_text(text))
+        return units
+
+    def _first_line(self, node: ast.stmt) -> int:
+        """Index of the first line of a statement, decorators included."""
+        decorators = getattr(node, "decorator_list", [])
+        return min([node.lineno] + [d.lineno for d in decorators]) - 1
+
+    def _node_bounds(
+        self, nodes: List[ast.stmt], start: int, end: int
+    ) -> List[Tuple[int, int]]:
+        """Line range [start, end) owned by each statement."""
+        bounds = []
+        current = start
+        for idx, node in enumerate(nodes):
+            node_end = node.end_lineno if idx + 1 < len(nodes) else end
+            bounds.append((current, max(current, node_end)))
+            current = max(current, node_end)
+        return bounds
+
+    def _pack(self, units: List[str]) -> List[str]:
+        """
+        Greedily join consecutive units while they fit in one chunk. The
+        length of a chunk is the sum of the lengths of its units, each unit
+        is measured once.
+        """
+        chunks, current, current_length = [], "", 0
+        for unit in units:
+            unit_length = self.length(unit)
+            if current and current_length + unit_length > self.chunk_size:
+                chunks.append(current)
+                current, current_length = "", 0
+            current += unit
+            current_length += unit_length
+        if current:
+            chunks.append(current)
+        return [chunk.strip("\r\n") for chunk in chunks if chunk.strip()]
@@ -0,0 +1,146 @@
+"""Read the files of a commit straight from the git object database"""
+
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+import git
+import git.exc
+from src.core.ignore_matcher import GitignoreRules, is_gitignored
+from src.utils.metrics import metrics
+
+_SYMLINK_MODE = 0o120000
+
+
+class GitTreeReader:
+    """
+    Walks the tree of a commit and reads its blobs without a working tree,
+    so a bare clone can be indexed directly.
+
+    Blob contents are read through GitPython's object database, which keeps
+    a single `git cat-file --batch` process open; reads are serialized with
+    a lock so the pipeline readers can share the instance. The blob SHA of
+    every walked file is kept as its content hash.
+
+    The walk applies the same rules as the filesystem walk of RepoAnalyzer,
+    including the .gitignore files committed in the tree, so both modes
+    index the same files of a commit.
+    """
+
+    def __init__(self, logger, repo_path: str, rev: str = "HEAD"):
+        """
+        Args:
+            logger: Logger instance
+            repo_path (str): Path of the repository, bare or not
+            rev (str, optional): Commit whose tree is read. Defaults to HEAD.
+        """
+        self.logger = logger
+        self.repo = git.Repo(repo_path)
+        self.commit = self.repo.commit(rev)
+        self._blob_shas: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def iter_directories(
+        self, matcher, respect_gitignore: bool = False
+    ) -> Iterator[Tuple[str, List[str]]]:
+        """
+        Walk the tree top-down, yielding each directory with the names of its
+        allowed files. Ignored directories are pruned without being read.
+
+        Args:
+            matcher (IgnoreMatcher): Decides the directories and files to skip.
+            respect_gitignore (bool, optional): Also skip the paths ignored by
+                the .gitignore files of the tree.
+
+        Yields:
+            Tuple[str, List[str]]: Relative Unix-style path ("/" for the root)
+            and file names
+        """
+        stack = [(self.commit.tree, ())]
+        while stack:
+            tree, rule_sets = stack.pop()
+            if respect_gitignore:
+                rule_sets = self._load_gitignore(tree, rule_sets)
+            files = []
+            for blob in tree.blobs:
+                if blob.mode == _SYMLINK_MODE:
+                    continue
+                if not matcher.allows_file(blob.name, blob.path):
+                    continue
+                if rule_sets and is_gitignored(rule_sets, blob.path, False):
+                    continue
+                self._blob_shas[blob.path] = blob.hexsha
+                files.append(blob.name)
+            if files:
+                yield "/" + tree.path, files
+
+            stack.extend(
+                (subtree, rule_sets)
+                for subtree in reversed(tree.trees)
+                if not matcher.ignores_dir(subtree.name, subtree.path)
+                and not (rule_sets and is_gitignored(rule_sets, subtree.path, True))
+            )
+
+    def _load_gitignore(
+        self, tree, rule_sets: Tuple[GitignoreRules, ...]
+    ) -> Tuple[GitignoreRules, ...]:
+        """
+        Adds the rules of the .gitignore of a tree, if any, to the ones
+        inherited from its parents.
+        """
+        blob = next(
+            (
+                blob
+                for blob in tree.blobs
+                if blob.name == ".gitignore" and blob.mode != _SYMLINK_MODE
+            ),
+            None,
+        )
+        if blob is None:
+            return rule_sets
+        try:
+            with self._lock:
+                data = self.repo.odb.stream(blob.binsha).read()
+        except (git.exc.GitError, ValueError, OSError) as e:
+            self.logger.warning("Could not read %s: %s", blob.path, e)
+            return rule_sets
+        rules = GitignoreRules.parse(
+            data.decode("utf-8", errors="ignore").splitlines(), tree.path
+        )
+        return rule_sets + (rules,) if rules else rule_sets
+
+    def blob_sha(self, path: str) -> Optional[str]:
+        """SHA of the blob of a file, which doubles as the hash of its content."""
+        sha = self._blob_shas.get(path)
+        if sha is None:
+            try:
+                sha = (self.commit.tree / path).hexsha
+            except KeyError:
+                return None
+            self._blob_shas[path] = sha
+        return sha
+
+    def read(self, path: str) -> Optional[str]:
+        """
+        Read the content of a file of the tree.
+
+        Args:
+            path (str): Path of the file relative to the repository root.
+
+        Returns:
+            Optional[str]: The decoded content, None if it cannot be read.
+        """
+        sha = self.blob_sha(path)
+        if sha is None:
+            self.logger.error("File not found in the git tree: %s", path)
+            return None
+        try:
+            with metrics.timer(stage="read"), self._lock:
+                data = self.repo.odb.stream(bytes.fromhex(sha)).read()
+            metrics.inc("bytes_read_total", len(data))
+            return data.decode("utf-8")
+        except (git.exc.GitError, ValueError, OSError) as e:
+            self.logger.error("Could not read blob %s of %s: %s", sha, path, e)
+            return None
+
+    def close(self):
+        """Stop the git processes kept by the repository."""
+        self.repo.close()
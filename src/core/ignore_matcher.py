@@ -0,0 +1,216 @@
+"""Precompiled matching of the ignored directories, files and extensions"""
+
+import os
+import re
+from typing import Iterable, List, Optional, Pattern, Tuple
+from conf.config import (
+    IGNORED_DIRECTORIES,
+    IGNORED_FILES,
+    IGNORED_EXTS,
+    ALLOWED_FILE_EXTENSIONS,
+)
+
+_GLOB_CHARS = set("*?[")
+
+
+def _translate_glob(pattern: str, anchored: bool) -> str:
+    """
+    Translate a gitignore-style glob into a regex matched against a relative
+    Unix-style path. `*` and `?` do not cross directories, `**` does.
+    Unanchored patterns match at any depth.
+    """
+    parts, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif char == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif char == "?":
+            parts.append("[^/]")
+            i += 1
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+                i += 1
+                continue
+            body = pattern[i + 1 : end].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body}]")
+            i = end + 1
+        else:
+            parts.append(re.escape(char))
+            i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    return f"{prefix}{''.join(parts)}"
+
+
+def _compile_any(regexes: Iterable[str]) -> Optional[Pattern]:
+    """Combine several regexes into a single case-insensitive full-match pattern."""
+    regexes = list(regexes)
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{regex})" for regex in regexes), re.IGNORECASE)
+
+
+class IgnoreMatcher:
+    """
+    Decides which directories are pruned and which files are analyzed.
+
+    Every pattern of the configuration is compiled once: plain names go into
+    a set, name globs (`*.min.js`) into one regex over the file or directory
+    name and path globs (`packages/*/dist`) into one regex over the relative
+    path. Names and globs of IGNORED_FILES also prune directories, so
+    `coverage` or `*.egg-info` are never walked.
+    """
+
+    def __init__(
+        self,
+        ignored_directories: Iterable[str] = frozenset(IGNORED_DIRECTORIES),
+        ignored_files: Iterable[str] = frozenset(IGNORED_FILES),
+        ignored_exts: Iterable[str] = frozenset(IGNORED_EXTS),
+        allowed_exts: Iterable[str] = frozenset(ALLOWED_FILE_EXTENSIONS),
+    ):
+        names, name_globs, path_globs = set(), [], []
+        for pattern in list(ignored_directories) + list(ignored_files):
+            pattern = pattern.strip("/").lower()
+            if "/" in pattern:
+                path_globs.append(_translate_glob(pattern, anchored=False))
+            elif _GLOB_CHARS.intersection(pattern):
+                name_globs.append(_translate_glob(pattern, anchored=True))
+            else:
+                names.add(pattern)
+
+        self._names = frozenset(names)
+        self._name_regex = _compile_any(name_globs)
+        self._path_regex = _compile_any(path_globs)
+        self._ignored_exts = frozenset(ext.lower() for ext in ignored_exts)
+        self._allowed_exts = frozenset(ext.lower() for ext in allowed_exts)
+
+    def _matches(self, name: str, rel_path: str) -> bool:
+        name = name.lower()
+        if name in self._names:
+            return True
+        if self._name_regex and self._name_regex.fullmatch(name):
+            return True
+        return bool(self._path_regex and self._path_regex.fullmatch(rel_path))
+
+    def ignores_dir(self, name: str, rel_path: str) -> bool:
+        """
+        Checks if a directory must be pruned from the walk.
+
+        Args:
+            name (str): Name of the directory.
+            rel_path (str): Path of the directory relative to the repository root,
+                without leading slash.
+        """
+        return self._matches(name, rel_path)
+
+    def allows_file(self, name: str, rel_path: str) -> bool:
+        """
+        Checks if a file is allowed based on its extension, name and path.
+
+        Args:
+            name (str): Name of the file.
+            rel_path (str): Path of the file relative to the repository root,
+                without leading slash.
+        """
+        _, ext = os.path.splitext(name.lower())
+        if ext not in self._allowed_exts or ext in self._ignored_exts:
+            return False
+        return not self._matches(name, rel_path)
+
+
+class GitignoreRules:
+    """
+    Rules of one .gitignore file, applied to the paths below its directory.
+
+    Supports comments, negation (`!`), directory-only (`dir/`) and anchored
+    (`/build`, `docs/*.md`) patterns and `**`. As in git, the last matching
+    rule wins.
+    """
+
+    def __init__(self, base: str, rules: List[Tuple[Pattern, bool, bool]]):
+        self.base = base
+        self.rules = rules
+
+    @classmethod
+    def from_file(cls, path: str, base: str) -> Optional["GitignoreRules"]:
+        """
+        Parse a .gitignore file.
+
+        Args:
+            path (str): Path of the .gitignore file.
+            base (str): Relative path of its directory, "" for the repository root.
+
+        Returns:
+            Optional[GitignoreRules]: The parsed rules, None if the file has none.
+        """
+        with open(path, "r", encoding="utf-8", errors="ignore") as file:
+            return cls.parse(file, base)
+
+    @classmethod
+    def parse(cls, lines: Iterable[str], base: str) -> Optional["GitignoreRules"]:
+        """
+        Parse the lines of a .gitignore file.
+
+        Args:
+            lines (Iterable[str]): Lines of the file.
+            base (str): Relative path of its directory, "" for the repository root.
+
+        Returns:
+            Optional[GitignoreRules]: The parsed rules, None if the file has none.
+        """
+        rules = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate or line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            regex = _translate_glob(line.lstrip("/"), anchored=anchored)
+            rules.append((re.compile(regex), negate, dir_only))
+        return cls(base, rules) if rules else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Returns True if the path is ignored, False if it is explicitly
+        re-included and None if no rule matches it.
+        """
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1 :]
+
+        result = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(rel_path):
+                result = not negate
+        return result
+
+
+def is_gitignored(
+    rule_sets: Iterable[GitignoreRules], rel_path: str, is_dir: bool
+) -> bool:
+    """Evaluate the .gitignore files from the root down, the deepest match wins."""
+    ignored = False
+    for rules in rule_sets:
+        result = rules.match(rel_path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
@@ -0,0 +1,194 @@
+"""Concurrent producer/consumer ingestion pipeline"""
+
+import queue
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+from conf.config import (
+    EMBEDDING_BATCH_SIZE,
+    DB_INSERT_BATCH_SIZE,
+    PIPELINE_READER_WORKERS,
+    PIPELINE_EMBED_WORKERS,
+    PIPELINE_WRITER_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_BATCH_WAIT_SECONDS,
+)
+
+ChunkItem = Tuple[str, int, str]
+RowItem = Tuple[str, int, str, List[float]]
+
+_STOP = object()
+
+
+class IngestionPipeline:
+    """
+    Runs ingestion as three stages connected by bounded queues:
+
+    - readers: turn a file entry into its chunks (file I/O and splitting)
+    - embedders: group chunks into batches and generate their embeddings
+    - writers: group rows into batches and store them in the vector DB
+
+    Every queue is bounded, so a slow stage blocks the previous one instead
+    of letting chunks or rows pile up in memory.
+
+    A stage that raises does not stop the pipeline: the file entry, chunks or
+    rows it was handling are passed to `on_failure`, so the caller can count
+    them as failed or queue them again, and the stage goes on with the next.
+    """
+
+    def __init__(
+        self,
+        logger,
+        load_chunks: Callable[[object], List[ChunkItem]],
+        embed_chunks: Callable[[List[ChunkItem]], List[RowItem]],
+        write_rows: Callable[[List[RowItem]], None],
+        on_failure: Optional[Callable[[str, list], None]] = None,
+        reader_workers: int = PIPELINE_READER_WORKERS,
+        embed_workers: int = PIPELINE_EMBED_WORKERS,
+        writer_workers: int = PIPELINE_WRITER_WORKERS,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        embed_batch_size: int = EMBEDDING_BATCH_SIZE,
+        write_batch_size: int = DB_INSERT_BATCH_SIZE,
+    ):
+        """
+        Args:
+            logger: Logger instance
+            load_chunks: Reads one file entry and returns its (filename, chunk_order, content) items
+            embed_chunks: Embeds a batch of chunk items and returns the rows to store
+            write_rows: Stores a batch of (filename, chunk_order, content, embedding) rows
+            on_failure: Called with the stage ("reader", "embedder" or "writer")
+                and the items it dropped: [entry], chunk items or rows
+            reader_workers (int): Threads reading and splitting files
+            embed_workers (int): Threads calling the embedding service concurrently
+            writer_workers (int): Threads writing rows into the vector DB
+            queue_size (int): Capacity of the file queue; the chunk and row queues
+                hold queue_size batches
+            embed_batch_size (int): Chunks per embedding call
+            write_batch_size (int): Rows per DB write
+        """
+        self.logger = logger
+        self.load_chunks = load_chunks
+        self.embed_chunks = embed_chunks
+        self.write_rows = write_rows
+        self.on_failure = on_failure
+        self.reader_workers = max(1, reader_workers)
+        self.embed_workers = max(1, embed_workers)
+        self.writer_workers = max(1, writer_workers)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.write_batch_size = max(1, write_batch_size)
+
+        self._file_queue = queue.Queue(maxsize=max(1, queue_size))
+        self._chunk_queue = queue.Queue(
+            maxsize=max(1, queue_size) * self.embed_batch_size
+        )
+        self._row_queue = queue.Queue(
+            maxsize=max(1, queue_size) * self.write_batch_size
+        )
+
+    def _next_batch(self, source: queue.Queue, batch_size: int) -> Tuple[list, bool]:
+        """
+        Block for the first item of a batch, then keep filling it while items
+        arrive within PIPELINE_BATCH_WAIT_SECONDS.
+
+        Returns:
+            Tuple[list, bool]: The batch and whether the stop marker was received
+        """
+        first = source.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        while len(batch) < batch_size:
+            try:
+                item = source.get(timeout=PIPELINE_BATCH_WAIT_SECONDS)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _failed(self, stage: str, items: list):
+        """Hand the items dropped by a stage to on_failure."""
+        if self.on_failure is None:
+            return
+        try:
+            self.on_failure(stage, items)
+        except Exception:  # pylint: disable=broad-except
+            self.logger.exception("Failure handler of the %s stage failed", stage)
+
+    def _reader(self):
+        while True:
+            entry = self._file_queue.get()
+            if entry is _STOP:
+                return
+            try:
+                for chunk_item in self.load_chunks(entry):
+                    self._chunk_queue.put(chunk_item)
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Reader stage failed for entry %s", entry)
+                self._failed("reader", [entry])
+
+    def _embedder(self):
+        stopped = False
+        while not stopped:
+            batch, stopped = self._next_batch(self._chunk_queue, self.embed_batch_size)
+            if not batch:
+                continue
+            try:
+                for row in self.embed_chunks(batch):
+                    self._row_queue.put(row)
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception(
+                    "Embedding stage failed for a batch of %d chunks", len(batch)
+                )
+                self._failed("embedder", batch)
+
+    def _writer(self):
+        stopped = False
+        while not stopped:
+            batch, stopped = self._next_batch(self._row_queue, self.write_batch_size)
+            if not batch:
+                continue
+            try:
+                self.write_rows(batch)
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception(
+                    "Writer stage failed for a batch of %d rows", len(batch)
+                )
+                self._failed("writer", batch)
+
+    @staticmethod
+    def _start(target: Callable, count: int, name: str) -> List[threading.Thread]:
+        threads = [
+            threading.Thread(target=target, name=f"{name}-{idx}", daemon=True)
+            for idx in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    @staticmethod
+    def _stop(threads: List[threading.Thread], stage_queue: queue.Queue):
+        for _ in threads:
+            stage_queue.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    def run(self, entries: Iterable[object]):
+        """
+        Push every entry through the pipeline and wait until all the rows are written.
+
+        Args:
+            entries (Iterable[object]): File entries understood by load_chunks
+        """
+        readers = self._start(self._reader, self.reader_workers, "reader")
+        embedders = self._start(self._embedder, self.embed_workers, "embedder")
+        writers = self._start(self._writer, self.writer_workers, "writer")
+
+        try:
+            for entry in entries:
+                self._file_queue.put(entry)
+        finally:
+            self._stop(readers, self._file_queue)
+            self._stop(embedders, self._chunk_queue)
+            self._stop(writers, self._row_queue)
@@ -1,73 +1,104 @@
 import os
 import json
-from conf.config import (
-    IGNORED_DIRECTORIES,
-    ALLOWED_FILE_EXTENSIONS,
-    IGNORED_FILES,
-    STRUCTURE_DIR,
-)
+import threading
+from typing import Iterator, List, Optional, Tuple
+from src.core.ignore_matcher import GitignoreRules, IgnoreMatcher, is_gitignored
+from src.core.git_tree_reader import GitTreeReader
+from src.utils.metrics import metrics
+from conf.config import STRUCTURE_DIR, ANALYZER_RESPECT_GITIGNORE
 
 
 class RepoAnalyzer:
-    def __init__(self, logger):
+    def __init__(self, logger, respect_gitignore: bool = ANALYZER_RESPECT_GITIGNORE):
         self.logger = logger
+        self.matcher = IgnoreMatcher()
+        self.respect_gitignore = respect_gitignore
+        self._export_thread: Optional[threading.Thread] = None
 
-    def _is_file_allowed(self, filename: str) -> bool:
+    def _load_gitignore(
+        self, dir_path: str, rel_dir: str, rule_sets: Tuple[GitignoreRules, ...]
+    ) -> Tuple[GitignoreRules, ...]:
         """
-        Checks if a file is allowed based on its extension and name.
+        Adds the rules of the .gitignore of a directory, if any, to the ones
+        inherited from its parents.
         """
-        _, ext = os.path.splitext(filename.lower())
-        return ext in ALLOWED_FILE_EXTENSIONS and filename.lower() not in IGNORED_FILES
-
-    def _filter_allowed_files(self, filenames: list[str]) -> list[str]:
-        """
-        Filters a list of filenames to include only allowed files.
-        """
-        return [f for f in filenames if self._is_file_allowed(f)]
-
-    def _should_ignore_dir(self, dirname: str) -> bool:
-        """
-        Determines if a directory should be ignored.
-        """
-        return dirname in IGNORED_DIRECTORIES
+        gitignore_path = os.path.join(dir_path, ".gitignore")
+        if not os.path.isfile(gitignore_path):
+            return rule_sets
+        try:
+            rules = GitignoreRules.from_file(gitignore_path, rel_dir)
+        except OSError as e:
+            self.logger.warning("Could not read %s: %s", gitignore_path, e)
+            return rule_sets
+        return rule_sets + (rules,) if rules else rule_sets
 
-    def _get_relative_path(self, full_path: str, base_dir: str) -> str:
-        """
-        Converts an absolute path to a relative Unix-style path.
+    def _scan_directory(
+        self, dir_path: str, rel_dir: str, rule_sets: Tuple[GitignoreRules, ...]
+    ) -> Tuple[List[str], List[Tuple[str, str]]]:
         """
-        rel_path = os.path.relpath(full_path, base_dir)
-        return "/" if rel_path == "." else "/" + rel_path.replace("\\", "/")
+        Lists a directory once with os.scandir, using the file type cached in
+        each DirEntry instead of extra stat calls.
 
-    def _process_directory(
-        self, dirpath: str, dirnames: list[str], filenames: list[str], base_dir: str
-    ) -> tuple[str, list[str]]:
+        Returns:
+            Tuple: allowed file names and (path, relative path) of the
+            subdirectories to walk
         """
-        Processes a directory, filters subdirectories and files, and returns
-        a relative path with allowed files.
-        """
-        dirnames[:] = [d for d in dirnames if not self._should_ignore_dir(d)]
-        allowed_files = self._filter_allowed_files(filenames)
-
-        if allowed_files:
-            relative_path = self._get_relative_path(dirpath, base_dir)
-            return relative_path, allowed_files
-        return None, None
+        files, subdirs = [], []
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        is_file = not is_dir and entry.is_file()
+                    except OSError:
+                        continue
+
+                    if is_dir:
+                        if self.matcher.ignores_dir(entry.name, rel_path):
+                            continue
+                        if rule_sets and is_gitignored(rule_sets, rel_path, True):
+                            continue
+                        subdirs.append((entry.path, rel_path))
+                    elif is_file:
+                        if not self.matcher.allows_file(entry.name, rel_path):
+                            continue
+                        if rule_sets and is_gitignored(rule_sets, rel_path, False):
+                            continue
+                        files.append(entry.name)
+        except OSError as e:
+            self.logger.warning("Could not list directory %s: %s", dir_path, e)
+        return files, subdirs
+
+    def _walk_structure(self, base_dir: str) -> Iterator[Tuple[str, list[str]]]:
+        """
+        Walks through the directory tree top-down, yielding each valid directory
+        with its allowed files as soon as it is visited. Ignored directories
+        are pruned before being listed.
+        """
+        stack = [(str(base_dir), "", ())]
+        while stack:
+            dir_path, rel_dir, rule_sets = stack.pop()
+            if self.respect_gitignore:
+                rule_sets = self._load_gitignore(dir_path, rel_dir, rule_sets)
+
+            with metrics.timer(stage="walk"):
+                files, subdirs = self._scan_directory(dir_path, rel_dir, rule_sets)
+            metrics.inc("directories_walked_total")
+            if files:
+                yield "/" + rel_dir, files
+
+            stack.extend(
+                (sub_path, sub_rel, rule_sets)
+                for sub_path, sub_rel in reversed(subdirs)
+            )
 
     def _build_structure(self, base_dir: str) -> dict:
         """
         Walks through the directory tree and builds a dictionary structure
         of valid directories and files.
         """
-        structure = {}
-
-        for dirpath, dirnames, filenames in os.walk(base_dir):
-            rel_path, files = self._process_directory(
-                dirpath, dirnames, filenames, base_dir
-            )
-            if rel_path and files:
-                structure[rel_path] = files
-
-        return structure
+        return dict(self._walk_structure(base_dir))
 
     def _save_structure_to_json(self, structure: dict, output_path: str):
         """
@@ -81,6 +112,72 @@ class RepoAnalyzer:
         except (OSError, json.JSONDecodeError) as e:
             self.logger.error("Error saving the JSON file: %s", e)
 
+    def _export_in_background(self, structure: dict, output_path: str):
+        """
+        Saves the directory structure from a separate thread, so the caller
+        does not wait for the serialization.
+        """
+        self.wait_for_export()
+        self._export_thread = threading.Thread(
+            target=self._save_structure_to_json,
+            args=(structure, output_path),
+            name="structure-export",
+        )
+        self._export_thread.start()
+
+    def wait_for_export(self):
+        """
+        Blocks until the background JSON export, if any, has been written.
+        """
+        if self._export_thread is not None:
+            self._export_thread.join()
+            self._export_thread = None
+
+    def iter_entries(
+        self,
+        cloned_repo_path: str,
+        repo_name: str,
+        export_json: bool = True,
+        tree_reader: Optional[GitTreeReader] = None,
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        Analyzes the repository while yielding its (relative_path, filename)
+        entries, so their processing can start on the first file found.
+
+        Args:
+            cloned_repo_path (str): Path of the cloned repository.
+            repo_name (str): Name of the repository.
+            export_json (bool, optional): Once the walk is complete, also export
+                the structure to a JSON file in a background thread.
+            tree_reader (GitTreeReader, optional): Walk the tree of the commit in
+                the git object database instead of the working tree.
+        """
+        if not cloned_repo_path:
+            self.logger.error("Invalid repository path: None received")
+            raise ValueError("cloned_repo_path cannot be None")
+
+        if not repo_name:
+            self.logger.error("Invalid repository name: None received")
+            raise ValueError("repo_name cannot be None")
+
+        self.logger.info("Starting streamed analysis of the repository")
+        structure = {}
+        if tree_reader:
+            directories = tree_reader.iter_directories(
+                self.matcher, self.respect_gitignore
+            )
+        else:
+            directories = self._walk_structure(cloned_repo_path)
+        for rel_path, files in directories:
+            if export_json:
+                structure[rel_path] = files
+            for filename in files:
+                yield rel_path, filename
+
+        if export_json:
+            output_path = os.path.join(STRUCTURE_DIR, f"{repo_name.lower()}.json")
+            self._export_in_background(structure, output_path)
+
     def analyze_and_export(self, cloned_repo_path: str, repo_name: str) -> str:
         """
         Analyzes the structure of the repository and exports it to a JSON file.
@@ -2,11 +2,37 @@
 
 import os
 import json
-from typing import Optional, List
+import asyncio
+import itertools
+import threading
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from src.embeddings.embedding_factory import EmbeddingFactory
-from src.db.vdb_manager import VectorDatabase
-from conf.config import CHUNK_SIZE_CODE, CHUNK_OVERLAP_CODE
+from src.db.vector_store_factory import VectorStoreFactory
+from src.core.repo_manager import RepoChanges
+from src.core.ingestion_pipeline import IngestionPipeline
+from src.core.code_chunker import CodeChunker
+from src.core.chunk_deduplicator import ChunkDeduplicator
+from src.core.chunking_pool import ChunkingPool
+from src.core.git_tree_reader import GitTreeReader
+from src.core.checkpoint_journal import CheckpointJournal
+from src.core.token_counter import get_chunk_sizing
+from src.utils.metrics import metrics
+from src.utils.progress import ProgressReporter
+from conf.config import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_RETRY_QUEUE_ROUNDS,
+    DB_INSERT_BATCH_SIZE,
+    PIPELINE_ENABLED,
+    EMBEDDING_ASYNC_ENABLED,
+    EMBEDDING_ASYNC_CONCURRENCY,
+    VECTOR_INDEX_DEFERRED,
+    SYNTAX_CHUNKING_ENABLED,
+    CHUNK_DEDUP_ENABLED,
+    CHUNKING_PROCESSES,
+    LOG_DETAIL,
+    CHECKPOINT_ENABLED,
+)
 
 
 class RepoCodeSplitter:
@@ -15,7 +41,35 @@ class RepoCodeSplitter:
     def __init__(self, logger):
         self.logger = logger
         self.embedding_service = EmbeddingFactory.get_embedding_service(self.logger)
-        self.vecto_db = VectorDatabase(logger)
+        self.async_embedding_service = (
+            EmbeddingFactory.get_async_embedding_service(self.logger)
+            if EMBEDDING_ASYNC_ENABLED
+            else None
+        )
+        self.vecto_db = VectorStoreFactory.get_vector_store(logger)
+        # Chunk lengths in characters or in tokens of the embedding model
+        sizing = get_chunk_sizing(logger)
+        self.code_chunker = CodeChunker(logger, sizing)
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=sizing.chunk_size,
+            chunk_overlap=sizing.chunk_overlap,
+            length_function=sizing.length_function,
+        )
+        self.deduplicator = ChunkDeduplicator(logger) if CHUNK_DEDUP_ENABLED else None
+        self._pending_references: List[Tuple[str, int, str, int, str]] = []
+        # Chunks without embedding, embedded again at the end of the run
+        self._retry_queue: List[Tuple[str, int, str]] = []
+        self._tree_reader: Optional[GitTreeReader] = None
+        self.checkpoint = CheckpointJournal(logger) if CHECKPOINT_ENABLED else None
+        self._journal: Optional[CheckpointJournal] = None
+        self._failed_chunks = 0
+        # Number of chunks of every file split in the run, for the stale sweep
+        self._chunk_counts: Dict[str, Optional[int]] = {}
+        self._stats_lock = threading.Lock()
+        # Per-file and per-chunk lines are replaced by periodic progress summaries
+        self.progress = ProgressReporter(logger)
+        self._log_files = LOG_DETAIL in ("file", "chunk")
+        self._log_chunks = LOG_DETAIL == "chunk"
 
     def _load_repo_structure(self, json_structure_path: str):
         """Load the repository structure from a JSON file"""
@@ -41,12 +95,16 @@ class RepoCodeSplitter:
 
     def _read_file_content(self, full_file_path: str) -> Optional[str]:
         """Read the content of a file."""
-        self.logger.info("Opening and processing file")
+        if self._log_files:
+            self.logger.info("Opening and processing file %s", full_file_path)
         try:
-            with open(full_file_path, "r", encoding="utf-8") as file_content:
+            with metrics.timer(stage="read"), open(
+                full_file_path, "r", encoding="utf-8"
+            ) as file_content:
+                metrics.inc("bytes_read_total", os.fstat(file_content.fileno()).st_size)
                 return file_content.read()
-        except IOError as e:
-            self.logger.error("Unexpected error while loading the JSON: %s", e)
+        except (IOError, UnicodeDecodeError) as e:
+            self.logger.error("Could not read the file %s: %s", full_file_path, e)
             return None
 
     def _build_final_filename(self, relative_path: str, filename: str) -> str:
@@ -56,22 +114,22 @@ class RepoCodeSplitter:
             final_filename = os.path.join(relative_path.lstrip("/"), filename)
         return final_filename.replace("\\", "/")
 
-    def _create_text_splitter(self, content: str) -> List[str]:
+    def _create_text_splitter(self, content: str, filename: str = "") -> List[str]:
         """
-        Divide the content given in fragments using recursivehactertextsplitter.
+        Divide the content given in fragments, following the functions and
+        classes of the code with SYNTAX_CHUNKING_ENABLED, or purely by
+        characters using recursivehactertextsplitter otherwise.
 
         Args:
             content (str): The content of the file to be divided.
+            filename (str, optional): Name of the file, selects the language.
 
         Returns:
             List[str]: List of text fragments.
         """
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE_CODE,
-            chunk_overlap=CHUNK_OVERLAP_CODE,
-            length_function=len,
-        )
-        return text_splitter.split_text(content)
+        if SYNTAX_CHUNKING_ENABLED:
+            return self.code_chunker.split(content, filename)
+        return self.text_splitter.split_text(content)
 
     def _generate_embeddings(self, content: str) -> Optional[List[float]]:
         """
@@ -98,19 +156,637 @@ class RepoCodeSplitter:
             self.logger.error("Unexpected error generating embedding: %s", e)
             return None
 
-    def process_files(
-        self, repo_name: str, cloned_repo_path: str, json_structure_path: str
+    def _generate_embeddings_batch(
+        self, contents: List[str]
+    ) -> List[Optional[List[float]]]:
+        """
+        Generate the embedding vectors of several contents with a single call
+        to the injected service. The result keeps the order of the contents.
+        """
+        if not self.embedding_service:
+            self.logger.error("Embeddings service not available")
+            return [None] * len(contents)
+
+        try:
+            return self.embedding_service.generate_embeddings(contents)
+        except IOError as e:
+            self.logger.error("Unexpected error generating embeddings: %s", e)
+            return [None] * len(contents)
+
+    def _embed_chunks(
+        self, pending_chunks: List[Tuple[str, int, str]]
+    ) -> List[Tuple[str, int, str, List[float]]]:
+        """
+        Generate the embeddings of the pending chunks as one batch.
+
+        Args:
+            pending_chunks (List[Tuple[str, int, str]]): (filename, chunk_order, content) items.
+
+        Returns:
+            List[Tuple[str, int, str, List[float]]]: Rows ready to be stored, chunks
+            without embedding are left out.
+        """
+        if not pending_chunks:
+            return []
+
+        metrics.observe("embedding_batch_size", len(pending_chunks))
+        with metrics.timer("embedding_request_seconds"):
+            embedding_vectors = self._generate_embeddings_batch(
+                [chunk for _, _, chunk in pending_chunks]
+            )
+        return self._build_rows(pending_chunks, embedding_vectors)
+
+    async def _aembed_chunks(
+        self, pending_chunks: List[Tuple[str, int, str]]
+    ) -> List[Tuple[str, int, str, List[float]]]:
+        """Asynchronous counterpart of _embed_chunks using the async embedding service."""
+        metrics.observe("embedding_batch_size", len(pending_chunks))
+        try:
+            with metrics.timer("embedding_request_seconds"):
+                embedding_vectors = (
+                    await self.async_embedding_service.agenerate_embeddings(
+                        [chunk for _, _, chunk in pending_chunks]
+                    )
+                )
+        except IOError as e:
+            self.logger.error("Unexpected error generating embeddings: %s", e)
+            embedding_vectors = [None] * len(pending_chunks)
+        return self._build_rows(pending_chunks, embedding_vectors)
+
+    def _build_rows(
+        self,
+        pending_chunks: List[Tuple[str, int, str]],
+        embedding_vectors: List[Optional[List[float]]],
+    ) -> List[Tuple[str, int, str, List[float]]]:
+        """
+        Pair the chunks with their vectors. The chunks without embedding are
+        left out and queued to be embedded again at the end of the run.
+        """
+        rows, failed = [], []
+        for (final_filename, idx, chunk), embedding_vector in zip(
+            pending_chunks, embedding_vectors
+        ):
+            if not embedding_vector:
+                failed.append((final_filename, idx, chunk))
+                continue
+
+            if self._log_chunks:
+                self.logger.info(
+                    "Embedding generated for: %s [chunk %d]", final_filename, idx
+                )
+            rows.append((final_filename, idx, chunk, embedding_vector))
+        metrics.inc("embeddings_generated_total", len(rows))
+        self.progress.add(embeddings=len(rows))
+        if failed:
+            metrics.inc("chunks_requeued_total", len(failed))
+            with self._stats_lock:
+                self._retry_queue.extend(failed)
+        return rows
+
+    def _retry_failed_chunks(self, repo_name: str):
+        """
+        Embed and store again the chunks queued without embedding, for up to
+        EMBEDDING_RETRY_QUEUE_ROUNDS rounds. The ones still failing are
+        counted as failures, their files stay unfinished in the journal.
+        """
+        for round_number in range(1, EMBEDDING_RETRY_QUEUE_ROUNDS + 1):
+            with self._stats_lock:
+                queued, self._retry_queue = self._retry_queue, []
+            if not queued:
+                return
+            self.logger.info(
+                "Retrying %d chunks without embedding (round %d of %d)",
+                len(queued),
+                round_number,
+                EMBEDDING_RETRY_QUEUE_ROUNDS,
+            )
+            for start in range(0, len(queued), EMBEDDING_BATCH_SIZE):
+                rows = self._embed_chunks(queued[start : start + EMBEDDING_BATCH_SIZE])
+                self._flush_rows(rows, repo_name)
+
+        with self._stats_lock:
+            queued, self._retry_queue = self._retry_queue, []
+        for final_filename, idx, _ in queued:
+            self.logger.warning(
+                "Embedding could not be generated for: %s [chunk %d]",
+                final_filename,
+                idx,
+            )
+            if self._journal:
+                self._journal.fail(final_filename)
+        self._record_failures(len(queued))
+
+    def _flush_rows(
+        self, pending_rows: List[Tuple[str, int, str, List[float]]], repo_name: str
     ):
+        """
+        Write the pending rows into the vector DB in a single transaction.
+        With a checkpoint journal the pending references are written too, and
+        both are recorded in the journal.
+        """
+        if self._journal:
+            self._flush_references(repo_name)
+        if not pending_rows:
+            return
+
+        with metrics.timer("db_insert_seconds"):
+            failed_rows = self.vecto_db.insert_embeddings_bulk(
+                pending_rows, table_name=repo_name
+            )
+        metrics.inc("rows_written_total", len(pending_rows) - len(failed_rows))
+        self._record_failures(len(failed_rows))
+        for idx in failed_rows:
+            final_filename, chunk_order, _, _ = pending_rows[idx]
+            self.logger.error(
+                "Failed when inserting chunk %d of %s", chunk_order, final_filename
+            )
+            if self._journal:
+                self._journal.fail(final_filename)
+        if self._journal:
+            failed = set(failed_rows)
+            self._journal.record_stored(
+                (row[0], row[1])
+                for idx, row in enumerate(pending_rows)
+                if idx not in failed
+            )
+
+    def _flush_references(self, repo_name: str):
+        """Store the references of the duplicated chunks that were not embedded."""
+        with self._stats_lock:
+            references, self._pending_references = self._pending_references, []
+        if not references:
+            return
+        if not self.vecto_db.insert_chunk_references(references, table_name=repo_name):
+            self._record_failures(len(references))
+            if self._journal:
+                for filename, *_ in references:
+                    self._journal.fail(filename)
+        elif self._journal:
+            self._journal.record_stored(
+                (filename, chunk_order) for filename, chunk_order, *_ in references
+            )
+
+    def _fail_file(self, final_filename: str):
+        """
+        Count a file that could not be read or split as a failure. Its chunks
+        stored by previous runs are kept and it stays unfinished in the journal.
+        """
+        self._record_failures(1)
+        self._count_chunks(final_filename, None)
+        if self._journal:
+            self._journal.fail(final_filename)
+
+    def _pipeline_failure(self, stage: str, items: list):
+        """
+        Account for the items dropped by a failed stage of the IngestionPipeline:
+        the file of a reader, the chunks of an embedder are queued to be
+        embedded again and the rows of a writer counted as failures.
+        """
+        if stage == "reader":
+            for relative_path, filename in items:
+                self._fail_file(self._build_final_filename(relative_path, filename))
+        elif stage == "embedder":
+            metrics.inc("chunks_requeued_total", len(items))
+            with self._stats_lock:
+                self._retry_queue.extend(items)
+        else:
+            self._record_failures(len(items))
+            if self._journal:
+                for final_filename, *_ in items:
+                    self._journal.fail(final_filename)
+
+    def _record_failures(self, count: int):
+        """Add to the number of chunks that could not be indexed in this run."""
+        if count:
+            metrics.inc("failures_total", count)
+            self.progress.add(failures=count)
+            with self._stats_lock:
+                self._failed_chunks += count
+
+    def _iter_entries(self, repo_structure: dict) -> Iterator[Tuple[str, str]]:
+        """Yield the (relative_path, filename) entries of a loaded JSON structure."""
+        for relative_path, files in repo_structure.items():
+            for filename in files:
+                yield relative_path, filename
+
+    def _filter_changed_entries(
+        self, entries: Iterable[Tuple[str, str]], changes: Optional[RepoChanges]
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        Yield the entries that must be processed, restricted to the changed
+        files when `changes` is given.
+        """
+        for relative_path, filename in entries:
+            if changes is not None:
+                final_filename = self._build_final_filename(relative_path, filename)
+                if final_filename not in changes.files_to_index:
+                    continue
+            yield relative_path, filename
+
+    def _skip_finished_entries(
+        self, entries: Iterable[Tuple[str, str]]
+    ) -> Iterator[Tuple[str, str]]:
+        """Yield the entries not finished by a previous run of the commit."""
+        for relative_path, filename in entries:
+            final_filename = self._build_final_filename(relative_path, filename)
+            if final_filename not in self._journal.done:
+                yield relative_path, filename
+
+    def _journal_pending(
+        self,
+        final_filename: str,
+        chunk_items: List[Tuple[str, int, str]],
+        references: List[Tuple[str, int, str, int, str]],
+    ) -> Tuple[List[Tuple[str, int, str]], List[Tuple[str, int, str, int, str]]]:
+        """
+        Drop the chunks of a file stored by a previous run of the commit and
+        register the rest in the checkpoint journal.
+        """
+        if not self._journal:
+            return chunk_items, references
+        chunk_items = [
+            item
+            for item in chunk_items
+            if not self._journal.is_stored(final_filename, item[1])
+        ]
+        references = [
+            reference
+            for reference in references
+            if not self._journal.is_stored(final_filename, reference[1])
+        ]
+        self._journal.expect(
+            final_filename,
+            [item[1] for item in chunk_items] + [ref[1] for ref in references],
+        )
+        return chunk_items, references
+
+    def _count_chunks(self, final_filename: str, count: Optional[int]):
+        """Record the number of chunks of a file, None keeps all its stored chunks."""
+        with self._stats_lock:
+            self._chunk_counts[final_filename] = count
+
+    def _store_references(self, references: List[Tuple[str, int, str, int, str]]):
+        if references:
+            with self._stats_lock:
+                self._pending_references.extend(references)
+
+    def _blob_references(self, final_filename: str) -> Tuple[Optional[str], bool]:
+        """
+        When reading from the git tree with deduplication enabled, a file whose
+        blob SHA was already processed is not read nor split again, its chunks
+        are stored as references to the ones of the first copy.
+
+        Returns:
+            Tuple[Optional[str], bool]: Blob SHA of the file, if known, and
+            whether the file was already handled as a copy
+        """
+        if not (self._tree_reader and self.deduplicator):
+            return None, False
+        blob_sha = self._tree_reader.blob_sha(final_filename)
+        references = (
+            self.deduplicator.filter_blob(final_filename, blob_sha)
+            if blob_sha
+            else None
+        )
+        if references is None:
+            return blob_sha, False
+        self._count_chunks(
+            final_filename, max((ref[1] + 1 for ref in references), default=0)
+        )
+        _, references = self._journal_pending(final_filename, [], references)
+        self._store_references(references)
+        return blob_sha, True
+
+    def _build_chunk_items(
+        self, final_filename: str, chunks: List[str], blob_sha: Optional[str]
+    ) -> List[Tuple[str, int, str]]:
+        """
+        Number the chunks of a file, dropping the empty ones and, with
+        deduplication enabled, the copies of chunks already seen.
+        """
+        metrics.inc("files_processed_total")
+        self.progress.add(files=1, chunks=len(chunks))
+        self._count_chunks(final_filename, len(chunks))
+        if not chunks:
+            self.logger.warning("No se generaron chunks para: %s", final_filename)
+            self._journal_pending(final_filename, [], [])
+            return []
+        metrics.inc("chunks_created_total", len(chunks))
+
+        chunk_items = []
+        for idx, chunk in enumerate(chunks):
+            if not chunk or not chunk.strip():
+                self.logger.warning("Empty content, embedding cannot be generated")
+                continue
+            chunk_items.append((final_filename, idx, chunk))
+
+        references = []
+        if self.deduplicator:
+            sizes = {idx: len(chunk.encode("utf-8")) for _, idx, chunk in chunk_items}
+            chunk_items, references = self.deduplicator.filter(chunk_items)
+            if blob_sha:
+                self.deduplicator.register_blob(
+                    blob_sha, chunk_items, references, sizes
+                )
+        chunk_items, references = self._journal_pending(
+            final_filename, chunk_items, references
+        )
+        self._store_references(references)
+        return chunk_items
+
+    def _load_file_chunks(
+        self, cloned_repo_path: str, relative_path: str, filename: str
+    ) -> List[Tuple[str, int, str]]:
+        """
+        Read a file and split it into chunks.
+
+        Returns:
+            List[Tuple[str, int, str]]: (filename, chunk_order, content) items of the file
+        """
+        final_filename = self._build_final_filename(relative_path, filename)
+        blob_sha, is_copy = self._blob_references(final_filename)
+        if is_copy:
+            return []
+
+        if self._tree_reader:
+            content = self._tree_reader.read(final_filename)
+        else:
+            full_file_path = self._get_file_path(
+                cloned_repo_path, relative_path, filename
+            )
+            if not os.path.exists(full_file_path):
+                self.logger.error("File not found: %s", full_file_path)
+                return []
+            content = self._read_file_content(full_file_path)
+
+        if content is None:
+            self._fail_file(final_filename)
+            return []
+
+        with metrics.timer(stage="split"):
+            chunks = self._create_text_splitter(content, filename)
+        return self._build_chunk_items(final_filename, chunks, blob_sha)
+
+    def _iter_file_chunks(
+        self, entries: Iterable[Tuple[str, str]], cloned_repo_path: str
+    ) -> Iterator[List[Tuple[str, int, str]]]:
+        """
+        Yield the chunk items of each file of the entries, in order. With
+        CHUNKING_PROCESSES the files are read and split by a ChunkingPool;
+        files of the git tree are still read here, only split in the pool.
+        """
+        if CHUNKING_PROCESSES <= 0:
+            for relative_path, filename in entries:
+                yield self._load_file_chunks(cloned_repo_path, relative_path, filename)
+            return
+
+        def jobs():
+            for relative_path, filename in entries:
+                final_filename = self._build_final_filename(relative_path, filename)
+                blob_sha, is_copy = self._blob_references(final_filename)
+                if is_copy:
+                    continue
+                if self._tree_reader:
+                    content = self._tree_reader.read(final_filename)
+                    if content is None:
+                        self._fail_file(final_filename)
+                        continue
+                    yield (final_filename, blob_sha), (filename, None, content)
+                    continue
+
+                full_file_path = self._get_file_path(
+                    cloned_repo_path, relative_path, filename
+                )
+                try:
+                    # Read in the workers, counted here
+                    metrics.inc("bytes_read_total", os.path.getsize(full_file_path))
+                except OSError:
+                    self.logger.error("File not found: %s", full_file_path)
+                    continue
+                yield (final_filename, blob_sha), (filename, full_file_path, None)
+
+        pool = ChunkingPool(self.logger)
+        for (final_filename, blob_sha), chunks in pool.imap(jobs()):
+            if chunks is None:
+                self._fail_file(final_filename)
+                continue
+            yield self._build_chunk_items(final_filename, chunks, blob_sha)
+
+    def _process_sequential(
+        self,
+        entries: Iterator[Tuple[str, str]],
+        repo_name: str,
+        cloned_repo_path: str,
+    ):
+        """Read, split, embed and store the files one after another in this thread."""
+        pending_chunks: List[Tuple[str, int, str]] = []
+        pending_rows: List[Tuple[str, int, str, List[float]]] = []
+
+        for chunk_items in self._iter_file_chunks(entries, cloned_repo_path):
+            pending_chunks.extend(chunk_items)
+
+            if len(pending_chunks) >= EMBEDDING_BATCH_SIZE:
+                pending_rows.extend(self._embed_chunks(pending_chunks))
+                pending_chunks = []
+
+            if len(pending_rows) >= DB_INSERT_BATCH_SIZE:
+                self._flush_rows(pending_rows, repo_name)
+                pending_rows = []
+
+        pending_rows.extend(self._embed_chunks(pending_chunks))
+        self._flush_rows(pending_rows, repo_name)
+
+    def _process_concurrent(
+        self,
+        entries: Iterator[Tuple[str, str]],
+        repo_name: str,
+        cloned_repo_path: str,
+    ):
+        """
+        Overlap file reading, embedding and DB writes with an IngestionPipeline.
+        With CHUNKING_PROCESSES the files reach the pipeline already split.
+        What a failed stage drops is counted or queued, see _pipeline_failure.
+        """
+        presplit = CHUNKING_PROCESSES > 0
+        if presplit:
+            entries = self._iter_file_chunks(entries, cloned_repo_path)
+        pipeline = IngestionPipeline(
+            self.logger,
+            load_chunks=lambda entry: (
+                entry if presplit else self._load_file_chunks(cloned_repo_path, *entry)
+            ),
+            embed_chunks=self._embed_chunks,
+            write_rows=lambda rows: self._flush_rows(rows, repo_name),
+            on_failure=self._pipeline_failure,
+        )
+        pipeline.run(entries)
+
+    async def aprocess_entries(
+        self,
+        entries: Iterator[Tuple[str, str]],
+        repo_name: str,
+        cloned_repo_path: str,
+    ):
+        """
+        Read and split the files, embedding their chunks with the async embedding
+        service. Up to EMBEDDING_ASYNC_CONCURRENCY batches are in flight while the
+        next files are read; rows are written every DB_INSERT_BATCH_SIZE rows.
+        Reading, splitting and writing run in worker threads, off the event loop.
+
+        Must be awaited from a running event loop.
+        """
+        chunk_iterator = self._iter_file_chunks(entries, cloned_repo_path)
+        in_flight = set()
+        pending_chunks: List[Tuple[str, int, str]] = []
+        pending_rows: List[Tuple[str, int, str, List[float]]] = []
+
+        async def collect(return_when):
+            nonlocal pending_rows
+            done, _ = await asyncio.wait(in_flight, return_when=return_when)
+            for task in done:
+                in_flight.discard(task)
+                pending_rows.extend(task.result())
+            if len(pending_rows) >= DB_INSERT_BATCH_SIZE:
+                await asyncio.to_thread(self._flush_rows, pending_rows, repo_name)
+                pending_rows = []
+
+        try:
+            while True:
+                chunk_items = await asyncio.to_thread(next, chunk_iterator, None)
+                if chunk_items is None:
+                    break
+                pending_chunks.extend(chunk_items)
+                while len(pending_chunks) >= EMBEDDING_BATCH_SIZE:
+                    batch = pending_chunks[:EMBEDDING_BATCH_SIZE]
+                    pending_chunks = pending_chunks[EMBEDDING_BATCH_SIZE:]
+                    in_flight.add(asyncio.create_task(self._aembed_chunks(batch)))
+                    if len(in_flight) >= EMBEDDING_ASYNC_CONCURRENCY:
+                        await collect(asyncio.FIRST_COMPLETED)
+
+            if pending_chunks:
+                in_flight.add(asyncio.create_task(self._aembed_chunks(pending_chunks)))
+            if in_flight:
+                await collect(asyncio.ALL_COMPLETED)
+            await asyncio.to_thread(self._flush_rows, pending_rows, repo_name)
+        finally:
+            await self.async_embedding_service.aclose()
+
+    def get_indexed_commit(self, repo_name: str) -> Optional[str]:
+        """Return the commit SHA of the last indexed state of the repository table."""
+        return self.vecto_db.get_indexed_commit(table_name=repo_name)
+
+    def set_indexed_commit(self, repo_name: str, commit_sha: str) -> bool:
+        """
+        Store the commit SHA of the indexed state of the repository table,
+        dropping the checkpoint journal of the run.
+        """
+        stored = self.vecto_db.set_indexed_commit(commit_sha, table_name=repo_name)
+        if stored and self.checkpoint:
+            self.checkpoint.discard(repo_name)
+        return stored
+
+    def process_files(
+        self,
+        repo_name: str,
+        cloned_repo_path: str,
+        json_structure_path: str,
+        changes: Optional[RepoChanges] = None,
+        commit: Optional[str] = None,
+    ) -> bool:
         """
         Coordinate reading of the structured JSON and the processing of the
         corresponding code files, storing embeddings into the vector DB.
+
+        Args:
+            repo_name (str): Name of the repository, used as table name.
+            cloned_repo_path (str): Path of the cloned repository.
+            json_structure_path (str): Path of the JSON structure of the repository.
+            changes (RepoChanges, optional): Files changed since the last indexed
+                commit, see process_entries.
+            commit (str, optional): Commit being indexed, see process_entries.
+
+        Returns:
+            bool: True if every chunk was embedded and stored, False otherwise
         """
         repo_structure = self._load_repo_structure(json_structure_path)
-        if not repo_structure:
+        return self.process_entries(
+            repo_name,
+            cloned_repo_path,
+            self._iter_entries(repo_structure or {}),
+            changes=changes,
+            commit=commit,
+        )
+
+    def process_entries(
+        self,
+        repo_name: str,
+        cloned_repo_path: str,
+        entries: Iterable[Tuple[str, str]],
+        changes: Optional[RepoChanges] = None,
+        tree_reader: Optional[GitTreeReader] = None,
+        commit: Optional[str] = None,
+    ) -> bool:
+        """
+        Process the code files of the given (relative_path, filename) entries,
+        storing embeddings into the vector DB. The entries are consumed lazily,
+        so they can be streamed from RepoAnalyzer.iter_entries while the
+        repository is still being walked.
+
+        Chunks are accumulated across files and embedded in batches of
+        EMBEDDING_BATCH_SIZE, the resulting rows are written to the DB every
+        DB_INSERT_BATCH_SIZE rows. With EMBEDDING_ASYNC_ENABLED the batches are
+        embedded concurrently from an event loop, with PIPELINE_ENABLED the
+        reading, embedding and writing stages run in concurrent threads. With
+        CHUNK_DEDUP_ENABLED the copies of chunks already seen in the run are
+        not embedded, only a reference to the canonical chunk is stored. With
+        CHUNKING_PROCESSES the files are read and split in worker processes,
+        keeping their order, so the stored rows do not depend on it.
+
+        Rows are upserted by (filename, chunk_order), so a full re-index does
+        not clear the table: unchanged chunks are left as they are and, once
+        every file is processed, the chunks of the files that no longer exist
+        (or beyond the new end of a file) are deleted in bulk.
+
+        Chunks left without embedding (provider down, retries exhausted) are
+        queued and embedded again once the files are processed, see
+        _retry_failed_chunks; only the ones that still fail count as failures.
+
+        With CHECKPOINT_ENABLED and a commit, every stored chunk is recorded in
+        a CheckpointJournal. When a previous run of the same commit did not
+        finish, the table is not cleared again: its finished files are skipped
+        and its stored chunks are neither embedded nor inserted again.
+
+        Args:
+            repo_name (str): Name of the repository, used as table name.
+            cloned_repo_path (str): Path of the cloned repository.
+            entries (Iterable[Tuple[str, str]]): Files of the repository.
+            changes (RepoChanges, optional): Files changed since the last indexed
+                commit. When given, only those files are re-indexed and their stale
+                chunks removed; otherwise every file is re-indexed.
+            tree_reader (GitTreeReader, optional): Read the files from the git
+                object database instead of the working tree.
+            commit (str, optional): Commit being indexed, identifies the
+                checkpoint journal to resume.
+
+        Returns:
+            bool: True if every chunk was embedded and stored, False otherwise
+        """
+        self._failed_chunks = 0
+        self._chunk_counts = {}
+        self._retry_queue = []
+        self._journal = None
+        self._tree_reader = tree_reader
+        self.progress.reset(repo_name)
+        if self.deduplicator:
+            self.deduplicator.reset()
+        entries = iter(entries)
+        first_entry = next(entries, None)
+        if first_entry is None:
             self.logger.error(
                 "The repository structure could not be loaded or is empty."
             )
-            return
+            return False
+        entries = itertools.chain([first_entry], entries)
 
         model_info = self.embedding_service.get_model_info()
         self.logger.info(
@@ -119,57 +795,80 @@ class RepoCodeSplitter:
             model_info.get("model"),
         )
 
-        if not self.vecto_db.setup_database(table_name=repo_name):
+        if not self.vecto_db.setup_database(
+            table_name=repo_name, create_index=not VECTOR_INDEX_DEFERRED
+        ):
             self.logger.error("Database setup failed for table: %s", repo_name)
-            return
+            return False
 
-        for relative_path, files in repo_structure.items():
-            for filename in files:
-                full_file_path = self._get_file_path(
-                    cloned_repo_path, relative_path, filename
-                )
-                if not os.path.exists(full_file_path):
-                    self.logger.error("File not found: %s", full_file_path)
-                    continue
+        resumed = False
+        if self.checkpoint and commit:
+            resumed = self.checkpoint.open(
+                repo_name, commit, incremental=changes is not None
+            )
+            self._journal = self.checkpoint
 
-                content = self._read_file_content(full_file_path)
-                if content is None:
-                    continue
+        if changes is not None:
+            files_to_remove = changes.files_to_remove
+            if resumed:
+                files_to_remove = files_to_remove - self._journal.touched_files
+            self.logger.info(
+                "Incremental re-index: %d files to index, %d files to remove",
+                len(changes.files_to_index),
+                len(files_to_remove),
+            )
+            if not self.vecto_db.delete_file_chunks(
+                files_to_remove, table_name=repo_name
+            ):
+                self.logger.error("Could not remove stale chunks of: %s", repo_name)
+                return False
 
-                final_filename = self._build_final_filename(relative_path, filename)
+        entries = self._filter_changed_entries(entries, changes)
+        if resumed:
+            # The files finished before the interruption keep their chunks
+            for final_filename in self._journal.done:
+                self._count_chunks(final_filename, None)
+            entries = self._skip_finished_entries(entries)
+        try:
+            if self.async_embedding_service:
+                asyncio.run(self.aprocess_entries(entries, repo_name, cloned_repo_path))
+            elif PIPELINE_ENABLED:
+                self._process_concurrent(entries, repo_name, cloned_repo_path)
+            else:
+                self._process_sequential(entries, repo_name, cloned_repo_path)
+            self._retry_failed_chunks(repo_name)
+            self._flush_references(repo_name)
+        finally:
+            if self._journal:
+                # Record the files finished without chunks left to store
+                self._journal.record_stored([])
+                self._journal.close()
 
-                chunks = self._create_text_splitter(content)
-                if not chunks:
-                    self.logger.warning(
-                        "No se generaron chunks para: %s", final_filename
-                    )
-                    continue
+        if changes is None and not self.vecto_db.delete_stale_chunks(
+            self._chunk_counts, table_name=repo_name
+        ):
+            self.logger.error("Could not remove stale chunks of: %s", repo_name)
+            return False
 
-                for idx, chunk in enumerate(chunks):
-                    embedding_vector = self._generate_embeddings(chunk)
-
-                    if embedding_vector:
-                        self.logger.info(
-                            "Embedding generated for: %s [chunk %d]",
-                            final_filename,
-                            idx,
-                        )
-                        success = self.vecto_db.insert_embedding(
-                            filename=final_filename,
-                            content=chunk,
-                            embedding=embedding_vector,
-                            chunk_order=idx,
-                            table_name=repo_name,
-                        )
-                        if not success:
-                            self.logger.error(
-                                "Failed when inserting chunk %d of %s",
-                                idx,
-                                final_filename,
-                            )
-                    else:
-                        self.logger.warning(
-                            "Embedding could not be generated for: %s [chunk %d]",
-                            final_filename,
-                            idx,
-                        )
+        if VECTOR_INDEX_DEFERRED and not self.vecto_db.build_vector_index(
+            table_name=repo_name, rebuild=changes is None
+        ):
+            self.logger.warning(
+                "The vector index of '%s' could not be built", repo_name
+            )
+
+        service = self.async_embedding_service or self.embedding_service
+        service_stats = service.get_stats()
+        if service_stats:
+            self.logger.info("Embedding service stats: %s", service_stats)
+        if self.deduplicator:
+            self.logger.info(
+                "Chunk deduplication stats: %s", self.deduplicator.get_stats()
+            )
+        self.progress.finish()
+
+        if self._failed_chunks:
+            self.logger.warning(
+                "%d chunks of '%s' could not be indexed", self._failed_chunks, repo_name
+            )
+        return self._failed_chunks == 0
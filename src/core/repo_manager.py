@@ -3,17 +3,67 @@
 import os
 import re
 import socket
+from dataclasses import dataclass, field
+from typing import List, Optional, Set, Tuple
 from urllib.parse import urlparse, urlunparse
 import git
 import git.exc
-from conf.config import REPOS_DIR
+from conf.config import (
+    REPOS_DIR,
+    GIT_CLONE_STRATEGY,
+    GIT_SPARSE_CHECKOUT,
+    GIT_OBJECT_DB_MODE,
+    ALLOWED_FILE_EXTENSIONS,
+    IGNORED_DIRECTORIES,
+)
+
+CLONE_STRATEGIES = ("full", "shallow", "blobless")
+
+
+@dataclass
+class RepoChanges:
+    """Files changed between two commits, as repository relative paths"""
+
+    added: Set[str] = field(default_factory=set)
+    modified: Set[str] = field(default_factory=set)
+    deleted: Set[str] = field(default_factory=set)
+    renamed: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def files_to_index(self) -> Set[str]:
+        """Files whose current content must be chunked and embedded."""
+        return self.added | self.modified | {new for _, new in self.renamed}
+
+    @property
+    def files_to_remove(self) -> Set[str]:
+        """Files whose stored chunks are stale and must be deleted."""
+        return self.deleted | self.modified | {old for old, _ in self.renamed}
+
+    def is_empty(self) -> bool:
+        """True when no file changed."""
+        return not (self.added or self.modified or self.deleted or self.renamed)
 
 
 class RepoManager:
     """Temporary repository handler class"""
 
-    def __init__(self, logger):
+    def __init__(
+        self,
+        logger,
+        clone_strategy: str = GIT_CLONE_STRATEGY,
+        sparse_checkout: bool = GIT_SPARSE_CHECKOUT,
+        bare: bool = GIT_OBJECT_DB_MODE,
+    ):
         self.logger = logger
+        if clone_strategy not in CLONE_STRATEGIES:
+            self.logger.warning(
+                "Unknown clone strategy '%s', using 'full'", clone_strategy
+            )
+            clone_strategy = "full"
+        self.clone_strategy = clone_strategy
+        self.bare = bare
+        # A bare clone has no working tree to check out sparsely
+        self.sparse_checkout = sparse_checkout and not bare
 
     def _identify_platform(self, hostname: str) -> str:
         """Detect the platform (GitHub, GitLab, Bitbucket, Azure, etc.)"""
@@ -36,7 +86,7 @@ class RepoManager:
         hostname = parsed_url.netloc
         platform = self._identify_platform(hostname)
 
-        if not token:
+        if not token or parsed_url.scheme == "file":
             self.logger.info("No token provided. Using URL as is.")
             return url_repo
 
@@ -90,7 +140,7 @@ class RepoManager:
         return path.strip("/").split("/")[-1]
 
     def _is_valid_url(self, url: str) -> bool:
-        """Check if a given string is a valid HTTP(S) or SSH Git URL."""
+        """Check if a given string is a valid HTTP(S), SSH or file:// Git URL."""
         if not url or not isinstance(url, str):
             return False
 
@@ -100,6 +150,10 @@ class RepoManager:
         if parsed.scheme in ["http", "https"] and parsed.netloc and parsed.path:
             return True
 
+        # Valida URLs locales file:///path/repo.git
+        if parsed.scheme == "file" and parsed.path.strip("/"):
+            return True
+
         # Valida URLs SSH estilo: git@github.com:user/repo.git
         ssh_pattern = r"^(git@|ssh://git@)[\w.-]+[:/][\w./-]+(\.git)?$"
         if re.match(ssh_pattern, url):
@@ -107,6 +161,124 @@ class RepoManager:
 
         return False
 
+    def _sparse_checkout_patterns(self) -> List[str]:
+        """
+        Non-cone sparse-checkout patterns: every file with an allowed extension,
+        except the ones inside ignored directories.
+        """
+        patterns = [f"*{ext}" for ext in sorted(ALLOWED_FILE_EXTENSIONS)]
+        patterns += [f"!**/{dirname}/**" for dirname in sorted(IGNORED_DIRECTORIES)]
+        return patterns
+
+    def _clone_options(self) -> dict:
+        """Options of `git clone` for the configured strategy."""
+        options = {}
+        if self.clone_strategy == "shallow":
+            options.update(depth=1, no_tags=True)
+        elif self.clone_strategy == "blobless":
+            options["filter"] = "blob:none"
+        if self.bare:
+            options["bare"] = True
+        elif self.sparse_checkout:
+            options["no_checkout"] = True
+        return options
+
+    def _clone(self, url: str, repo_dest_path) -> git.Repo:
+        """Clone the repository with the configured strategy."""
+        repo = git.Repo.clone_from(url, str(repo_dest_path), **self._clone_options())
+        if self.sparse_checkout:
+            repo.git.sparse_checkout(
+                "set", "--no-cone", *self._sparse_checkout_patterns()
+            )
+            repo.git.checkout()
+        return repo
+
+    def _update(self, repo: git.Repo):
+        """
+        Bring an existing clone to the remote HEAD of its branch. Shallow clones
+        only fetch the last commit; the working tree is then reset to it, or
+        the branch moved to it in a bare clone.
+        """
+        branch = "HEAD" if repo.head.is_detached else repo.active_branch.name
+        fetch_options = (
+            ["--depth=1", "--no-tags"] if self.clone_strategy == "shallow" else []
+        )
+        if repo.bare:
+            repo.git.fetch(*fetch_options, "origin", f"+{branch}:{branch}")
+        else:
+            repo.git.fetch(*fetch_options, "origin", branch)
+            repo.git.reset("--hard", "FETCH_HEAD")
+
+    def get_head_commit(self, repo_path: str) -> Optional[str]:
+        """Return the SHA of the commit checked out in the repository"""
+        if not repo_path:
+            return None
+        try:
+            return git.Repo(repo_path).head.commit.hexsha
+        except (ValueError, git.exc.GitError) as e:
+            self.logger.error("Could not resolve HEAD of '%s': %s", repo_path, e)
+            return None
+
+    def _ensure_commit(self, repo: git.Repo, commit_sha: str):
+        """
+        Make sure a commit is in the object database. Shallow clones lack the
+        older history, so the commit alone is fetched from origin.
+        """
+        try:
+            repo.commit(commit_sha)
+        except (ValueError, git.exc.BadName):
+            if not os.path.exists(os.path.join(repo.git_dir, "shallow")):
+                raise
+            self.logger.info("Fetching commit %s into the shallow clone", commit_sha)
+            repo.git.fetch("--depth=1", "--no-tags", "origin", commit_sha)
+            repo.commit(commit_sha)
+
+    def get_changed_files(
+        self, repo_path: str, from_commit: str, to_commit: str = "HEAD"
+    ) -> Optional[RepoChanges]:
+        """
+        List the files added, modified, deleted and renamed between two commits
+        using `git diff --name-status`.
+
+        Returns:
+            Optional[RepoChanges]: The changes, or None if the diff cannot be computed
+            (e.g. the old commit is no longer in the history)
+        """
+        try:
+            repo = git.Repo(repo_path)
+            self._ensure_commit(repo, from_commit)
+            output = repo.git.diff("--name-status", "-M", "-z", from_commit, to_commit)
+        except (ValueError, git.exc.BadName, git.exc.GitError) as e:
+            self.logger.warning(
+                "Could not diff '%s' against %s: %s", repo_path, from_commit, e
+            )
+            return None
+
+        changes = RepoChanges()
+        fields = output.split("\0")
+        position = 0
+        while position < len(fields) and fields[position]:
+            status = fields[position][0]
+            if status in ("R", "C"):
+                old_path, new_path = fields[position + 1], fields[position + 2]
+                if status == "R":
+                    changes.renamed.append((old_path, new_path))
+                else:
+                    changes.added.add(new_path)
+                position += 3
+                continue
+
+            path = fields[position + 1]
+            if status == "A":
+                changes.added.add(path)
+            elif status == "D":
+                changes.deleted.add(path)
+            else:
+                changes.modified.add(path)
+            position += 2
+
+        return changes
+
     def get_repo(self, url_repo: str, token: str = None, username: str = None):
         """Clone or update a temporary repository from the URL"""
         if not self._is_valid_url(url_repo):
@@ -120,14 +292,20 @@ class RepoManager:
 
             if repo_dest_path.exists():
                 self.logger.info(
-                    "Repository '%s' already exists. Performing git pull", repo_name
+                    "Repository '%s' already exists. Fetching and resetting to the remote",
+                    repo_name,
                 )
-                repo = git.Repo(repo_dest_path)
-                repo.remotes.origin.pull()
+                self._update(git.Repo(repo_dest_path))
                 self.logger.info("Repository '%s' updated successfully", repo_name)
             else:
-                repo = git.Repo.clone_from(url, str(repo_dest_path))
-                self.logger.info("Repository '%s'", repo_name)
+                self._clone(url, repo_dest_path)
+                self.logger.info(
+                    "Repository '%s' cloned (%s%s%s)",
+                    repo_name,
+                    self.clone_strategy,
+                    ", sparse" if self.sparse_checkout else "",
+                    ", bare" if self.bare else "",
+                )
             return [repo_dest_path, repo_name]
 
         except git.exc.GitCommandError:
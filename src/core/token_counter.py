@@ -0,0 +1,170 @@
+"""Length of the chunks in tokens of the embedding model"""
+
+import math
+import os
+from dataclasses import dataclass
+from typing import Callable
+from conf.config import (
+    EMBEDDING_PROVIDER,
+    OLLAMA_EMBEDDING_MODEL,
+    OPENAI_EMBEDDING_MODEL,
+    EMBEDDING_MODEL_CONTEXT_TOKENS,
+    TOKEN_CHUNKING_ENABLED,
+    CHUNK_TOKENIZER,
+    CHUNK_TOKEN_BUDGET,
+    CHUNK_CHARS_PER_TOKEN,
+    CHUNK_SIZE_CODE,
+    CHUNK_OVERLAP_CODE,
+    CHUNK_OVERLAP_SYNTAX,
+)
+
+# Share of the context of the model a chunk may fill, the estimate is not exact
+CONTEXT_SAFETY_MARGIN = 0.9
+
+
+class TokenCounter:
+    """
+    Cheap estimate of the tokens of a text: `chars_per_token` ASCII
+    characters per token, plus half a token per extra UTF-8 byte, so
+    accented and CJK text, which tokenizers split much finer, is not
+    undercounted.
+    """
+
+    name = "estimate"
+
+    def __init__(self, chars_per_token: float = CHUNK_CHARS_PER_TOKEN):
+        self.chars_per_token = max(0.1, chars_per_token)
+
+    def count(self, text: str) -> int:
+        """Number of tokens of the text"""
+        tokens = len(text) / self.chars_per_token
+        if not text.isascii():
+            tokens += (len(text.encode("utf-8")) - len(text)) / 2
+        return math.ceil(tokens)
+
+
+class TiktokenCounter(TokenCounter):
+    """Exact count with a tiktoken encoding, used by the OpenAI models"""
+
+    def __init__(self, encoding: str):
+        super().__init__()
+        import tiktoken  # pylint: disable=import-outside-toplevel
+
+        self._encoding = tiktoken.get_encoding(encoding)
+        self.name = f"tiktoken:{encoding}"
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+class HuggingFaceCounter(TokenCounter):
+    """Exact count with a Hugging Face `tokenizers` tokenizer, by name or file"""
+
+    def __init__(self, name_or_path: str):
+        super().__init__()
+        from tokenizers import Tokenizer  # pylint: disable=import-outside-toplevel
+
+        if os.path.isfile(name_or_path):
+            self._tokenizer = Tokenizer.from_file(name_or_path)
+        else:
+            self._tokenizer = Tokenizer.from_pretrained(name_or_path)
+        self.name = f"huggingface:{name_or_path}"
+
+    def count(self, text: str) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def embedding_model() -> str:
+    """Name of the configured embedding model, without the Ollama tag"""
+    if EMBEDDING_PROVIDER.lower() == "openai":
+        return OPENAI_EMBEDDING_MODEL
+    return OLLAMA_EMBEDDING_MODEL.split(":")[0]
+
+
+def get_token_counter(logger, tokenizer: str = CHUNK_TOKENIZER) -> TokenCounter:
+    """
+    Build the token counter selected by CHUNK_TOKENIZER:
+        - "estimate": characters per token, no dependency
+        - "tiktoken:<encoding>": tiktoken encoding (optional package)
+        - "huggingface:<name or tokenizer.json>": `tokenizers` (optional package)
+        - "auto": tiktoken cl100k_base for the OpenAI models, the estimate otherwise
+
+    A tokenizer that cannot be loaded falls back to the estimate.
+    """
+    kind, _, argument = tokenizer.partition(":")
+    kind = kind.strip().lower()
+    if kind == "auto":
+        if EMBEDDING_PROVIDER.lower() != "openai":
+            return TokenCounter()
+        kind, argument = "tiktoken", "cl100k_base"
+
+    try:
+        if kind == "tiktoken":
+            return TiktokenCounter(argument or "cl100k_base")
+        if kind == "huggingface" and argument:
+            return HuggingFaceCounter(argument)
+        if kind != "estimate":
+            logger.warning("Unknown tokenizer '%s', estimating the tokens", tokenizer)
+    except ImportError as e:
+        logger.warning(
+            "Tokenizer '%s' not installed, estimating the tokens: %s", tokenizer, e
+        )
+    except (OSError, ValueError, RuntimeError) as e:
+        logger.warning(
+            "Tokenizer '%s' could not be loaded, estimating the tokens: %s",
+            tokenizer,
+            e,
+        )
+    return TokenCounter()
+
+
+def chunk_token_budget(model: str, budget: int = CHUNK_TOKEN_BUDGET) -> int:
+    """
+    Target tokens per chunk for a model: CHUNK_TOKEN_BUDGET, capped to the
+    share CONTEXT_SAFETY_MARGIN of its context when the model is known.
+    """
+    context = EMBEDDING_MODEL_CONTEXT_TOKENS.get(model)
+    if context:
+        budget = min(budget, int(context * CONTEXT_SAFETY_MARGIN))
+    return max(1, budget)
+
+
+@dataclass(frozen=True)
+class ChunkSizing:
+    """Length function of the chunks and their sizes, in the same unit"""
+
+    length_function: Callable[[str], int]
+    chunk_size: int
+    chunk_overlap: int
+    syntax_overlap: int
+    unit: str
+
+
+def get_chunk_sizing(logger) -> ChunkSizing:
+    """
+    Sizes of the chunks. With TOKEN_CHUNKING_ENABLED they are measured in
+    tokens of the embedding model and packed up to its token budget, the
+    overlaps are converted with CHUNK_CHARS_PER_TOKEN. Otherwise in
+    characters, with CHUNK_SIZE_CODE.
+    """
+    if not TOKEN_CHUNKING_ENABLED:
+        return ChunkSizing(
+            len, CHUNK_SIZE_CODE, CHUNK_OVERLAP_CODE, CHUNK_OVERLAP_SYNTAX, "chars"
+        )
+
+    counter = get_token_counter(logger)
+    model = embedding_model()
+    budget = chunk_token_budget(model)
+    logger.debug(
+        "Chunks of up to %d tokens for '%s', counted with %s",
+        budget,
+        model,
+        counter.name,
+    )
+    return ChunkSizing(
+        counter.count,
+        budget,
+        min(budget // 2, round(CHUNK_OVERLAP_CODE / CHUNK_CHARS_PER_TOKEN)),
+        min(budget // 2, round(CHUNK_OVERLAP_SYNTAX / CHUNK_CHARS_PER_TOKEN)),
+        "tokens",
+    )
@@ -0,0 +1,136 @@
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Layout of the stored tables. 1: append-only rows, 2: one row per
+# (filename, chunk_order) written with upserts, with the hash of its content
+SCHEMA_VERSION = 2
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 hex digest of the content of a chunk"""
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+class BaseVectorStore(ABC):
+    """Abstract base class for the storages of chunk embeddings"""
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    @abstractmethod
+    def connect(self) -> bool:
+        """Open the storage. Returns True if it is ready to be used"""
+
+    @abstractmethod
+    def disconnect(self):
+        """Release the storage"""
+
+    @abstractmethod
+    def setup_database(
+        self,
+        table_name: str = "default_table",
+        vector_dimension: int = 768,
+        create_index: bool = True,
+    ) -> bool:
+        """Create the table of a repository if it does not exist"""
+
+    @abstractmethod
+    def build_vector_index(
+        self, table_name: str = "default_table", rebuild: bool = False
+    ) -> bool:
+        """Build the similarity index of a loaded table"""
+
+    @abstractmethod
+    def get_indexed_commit(self, table_name: str = "default_table") -> Optional[str]:
+        """Get the commit SHA of the last indexed state of a table"""
+
+    @abstractmethod
+    def set_indexed_commit(
+        self, commit_sha: str, table_name: str = "default_table"
+    ) -> bool:
+        """Store the commit SHA of the last indexed state of a table"""
+
+    @abstractmethod
+    def delete_file_chunks(
+        self, filenames: Iterable[str], table_name: str = "default_table"
+    ) -> bool:
+        """
+        Delete every chunk stored for the given files, and the references from
+        or to them. A deleted chunk still referenced by other files is first
+        promoted: the first of its references becomes a row with its content
+        and embedding, and the others point to it.
+        """
+
+    @abstractmethod
+    def delete_stale_chunks(
+        self,
+        chunk_counts: Dict[str, Optional[int]],
+        table_name: str = "default_table",
+    ) -> bool:
+        """
+        Delete in bulk the chunks and references of the files missing from
+        `chunk_counts` and, for the listed files, those with a chunk_order not
+        below their count. A count of None keeps every chunk of the file.
+        """
+
+    @abstractmethod
+    def insert_chunk_references(
+        self,
+        references: List[Tuple[str, int, str, int, str]],
+        table_name: str = "default_table",
+    ) -> bool:
+        """
+        Record (filename, chunk_order, canonical_filename, canonical_chunk_order,
+        match_type) rows of chunks stored as a reference to a duplicated one,
+        replacing the row or reference stored with the same key
+        """
+
+    @abstractmethod
+    def insert_embedding(
+        self,
+        filename: str,
+        content: str,
+        embedding: List[float],
+        chunk_order: int = 0,
+        table_name: str = "default_table",
+    ) -> bool:
+        """Insert or update the embedding record of a chunk"""
+
+    @abstractmethod
+    def insert_embeddings_bulk(
+        self,
+        rows: List[Tuple[str, int, str, List[float]]],
+        table_name: str = "default_table",
+    ) -> List[int]:
+        """
+        Upsert many (filename, chunk_order, content, embedding) rows, leaving
+        untouched the stored rows whose content and embedding did not change
+
+        Returns:
+            List[int]: Positions in `rows` of the records that could not be inserted
+        """
+
+    @abstractmethod
+    def search_similar(
+        self,
+        query_embedding: List[float],
+        k: int = 5,
+        table_name: str = "default_table",
+        filters: Optional[Dict[str, Any]] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the k chunks closest to the query embedding"""
+
+    @abstractmethod
+    def search_similar_batch(
+        self,
+        query_embeddings: List[List[float]],
+        k: int = 5,
+        table_name: str = "default_table",
+        filters: Optional[Dict[str, Any]] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Return the k closest chunks of every query embedding"""
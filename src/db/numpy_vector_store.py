@@ -0,0 +1,852 @@
+"""In-process vector store backed by a memory-mapped NumPy matrix"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from conf.config import DIMENSION_EMBEDDING_DIMENSION, VECTORS_DIR
+from src.db.base_vector_store import BaseVectorStore, SCHEMA_VERSION
+
+
+class _VectorTable:
+    """
+    One table of the NumPy store.
+
+    Files under `<VECTORS_DIR>/<table>/`:
+        - embeddings.f32: float32 matrix (capacity x dimension) of L2-normalized rows
+        - rows.jsonl: append-only log of added and deleted rows and chunk references
+        - state.json: dimension, schema version, generation and last indexed commit
+
+    Each (filename, chunk_order) has at most one alive row and one reference.
+
+    Compaction writes the live rows to the files of the next generation
+    (embeddings.<n>.f32, rows.<n>.jsonl) and switches to them by replacing
+    state.json, so a crash at any point leaves one complete generation.
+    """
+
+    _MIN_CAPACITY = 1024
+
+    def __init__(self, path: Path, dimension: Optional[int] = None):
+        """
+        Args:
+            path (Path): Directory of the table
+            dimension (int, optional): Expected dimension of the vectors. When None, the
+                dimension stored with the table (or DIMENSION_EMBEDDING_DIMENSION) is used
+        """
+        self.path = path
+        self.dimension = dimension
+        self.count = 0
+        self.capacity = 0
+        self.filenames: List[str] = []
+        self.chunk_orders: List[int] = []
+        self.contents: List[str] = []
+        self.references: Dict[Tuple[str, int], Tuple[str, int, str, int, str]] = {}
+        self.keys: Dict[Tuple[str, int], int] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.commit_sha: Optional[str] = None
+        self.schema_version = SCHEMA_VERSION
+        self.generation = 0
+        self.matrix: Optional[np.memmap] = None
+        self._duplicates: List[int] = []
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._load_state()
+        self._remove_other_generations()
+        self._replay_log()
+        self._open_matrix(max(self.count, self._MIN_CAPACITY))
+        self._log_file = open(self._log_path, "a", encoding="utf-8")
+        if self.schema_version < SCHEMA_VERSION:
+            self._migrate()
+
+    def _generation_paths(self, generation: int) -> Tuple[Path, Path]:
+        """Embeddings matrix and rows log of a generation of the table."""
+        if generation == 0:
+            return self.path / "embeddings.f32", self.path / "rows.jsonl"
+        return (
+            self.path / f"embeddings.{generation}.f32",
+            self.path / f"rows.{generation}.jsonl",
+        )
+
+    @property
+    def _matrix_path(self) -> Path:
+        return self._generation_paths(self.generation)[0]
+
+    @property
+    def _log_path(self) -> Path:
+        return self._generation_paths(self.generation)[1]
+
+    @property
+    def _state_path(self) -> Path:
+        return self.path / "state.json"
+
+    def _load_state(self):
+        if not self._state_path.exists():
+            self.dimension = self.dimension or int(DIMENSION_EMBEDDING_DIMENSION)
+            self._save_state()
+            return
+        with open(self._state_path, "r", encoding="utf-8") as file:
+            state = json.load(file)
+        self.dimension = self.dimension or state["dimension"]
+        if state["dimension"] != self.dimension:
+            raise ValueError(
+                f"Table '{self.path.name}' stores vectors of dimension "
+                f"{state['dimension']}, not {self.dimension}"
+            )
+        self.commit_sha = state.get("commit_sha")
+        self.schema_version = state.get("schema_version", 1)
+        self.generation = state.get("generation", 0)
+
+    def _save_state(self):
+        tmp_path = self._state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "dimension": self.dimension,
+                    "schema_version": self.schema_version,
+                    "generation": self.generation,
+                    "commit_sha": self.commit_sha,
+                },
+                file,
+            )
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self._state_path)
+        self._fsync_dir()
+
+    def _fsync_dir(self):
+        """Make the files created or replaced in the table directory durable."""
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            # Directories cannot be opened on Windows
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _remove_other_generations(self):
+        """
+        Remove the files of the generations not in use: the previous one,
+        left by a crash after a compaction, or an unfinished next one.
+        """
+        current = set(self._generation_paths(self.generation))
+        for path in [
+            *self.path.glob("embeddings*.f32"),
+            *self.path.glob("rows*.jsonl"),
+        ]:
+            if path not in current:
+                path.unlink(missing_ok=True)
+
+    def _migrate(self):
+        """
+        Version 2 keeps one row per chunk: delete the older copies appended
+        by the reruns of version 1.
+        """
+        self.delete_rows(self._duplicates)
+        self._duplicates = []
+        self.schema_version = SCHEMA_VERSION
+        self._save_state()
+
+    def _read_log(self) -> Iterator[dict]:
+        """
+        Records of the rows log. A torn last line, left by a crash while it
+        was written, is dropped from the file so that the next records are
+        not appended to it.
+        """
+        valid_size = 0
+        with open(self._log_path, "rb") as file:
+            for line in file:
+                if not line.strip():
+                    valid_size += len(line)
+                    continue
+                try:
+                    record = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    record = None
+                if record is None:
+                    # Everything before the torn line is valid
+                    break
+                valid_size += len(line)
+                yield record
+        if valid_size < self._log_path.stat().st_size:
+            with open(self._log_path, "rb+") as file:
+                file.truncate(valid_size)
+
+    def _replay_log(self):
+        if not self._log_path.exists():
+            return
+        deleted = set()
+        for record in self._read_log():
+            if record["op"] == "add":
+                key = (record["filename"], record["chunk_order"])
+                if key in self.keys:
+                    self._duplicates.append(self.keys[key])
+                self.keys[key] = len(self.filenames)
+                self.filenames.append(record["filename"])
+                self.chunk_orders.append(record["chunk_order"])
+                self.contents.append(record["content"])
+            elif record["op"] == "del":
+                deleted.update(record["rows"])
+                self._forget_rows(record["rows"])
+            elif record["op"] == "ref":
+                for ref in record["refs"]:
+                    self.references[(ref[0], ref[1])] = tuple(ref)
+            elif record["op"] == "unref":
+                self._drop_references(set(record["filenames"]))
+            elif record["op"] == "unref_keys":
+                for filename, chunk_order in record["keys"]:
+                    self.references.pop((filename, chunk_order), None)
+        self.count = len(self.filenames)
+        self.alive = np.ones(self.count, dtype=bool)
+        if deleted:
+            self.alive[list(deleted)] = False
+        self._duplicates = [row for row in self._duplicates if self.alive[row]]
+
+    def _open_matrix(self, capacity: int):
+        """(Re)map the embeddings file with room for `capacity` rows."""
+        if self.matrix is not None:
+            self.matrix.flush()
+            del self.matrix
+        with open(self._matrix_path, "ab") as file:
+            file.truncate(capacity * self.dimension * 4)
+        self.matrix = np.memmap(
+            self._matrix_path,
+            dtype=np.float32,
+            mode="r+",
+            shape=(capacity, self.dimension),
+        )
+        self.capacity = capacity
+
+    def _normalize(self, rows: List[Tuple[str, int, str, List[float]]]) -> np.ndarray:
+        vectors = np.asarray([row[3] for row in rows], dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Expected vectors of dimension {self.dimension}, got {vectors.shape}"
+            )
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors
+
+    def append(self, rows: List[Tuple[str, int, str, List[float]]]):
+        self._append(rows, self._normalize(rows))
+
+    def _append(self, rows: List[Tuple[str, int, str, List[float]]], vectors):
+        needed = self.count + len(rows)
+        if needed > self.capacity:
+            self._open_matrix(max(needed, self.capacity * 2))
+
+        start = self.count
+        self.matrix[start:needed] = vectors
+        self.matrix.flush()
+
+        for offset, (filename, chunk_order, content, _) in enumerate(rows):
+            self._log_file.write(
+                json.dumps(
+                    {
+                        "op": "add",
+                        "row": start + offset,
+                        "filename": filename,
+                        "chunk_order": chunk_order,
+                        "content": content,
+                    },
+                    ensure_ascii=False,
+                )
+                + "\n"
+            )
+            self.keys[(filename, chunk_order)] = start + offset
+            self.filenames.append(filename)
+            self.chunk_orders.append(chunk_order)
+            self.contents.append(content)
+        self._sync_log()
+
+        self.alive = np.concatenate([self.alive, np.ones(len(rows), dtype=bool)])
+        self.count = needed
+
+    def _sync_log(self):
+        """Make the records written to the rows log durable."""
+        self._log_file.flush()
+        os.fsync(self._log_file.fileno())
+
+    def delete_rows(self, row_ids: List[int]) -> int:
+        row_ids = [row for row in row_ids if self.alive[row]]
+        if not row_ids:
+            return 0
+        self.alive[row_ids] = False
+        self._forget_rows(row_ids)
+        self._log_file.write(json.dumps({"op": "del", "rows": row_ids}) + "\n")
+        self._sync_log()
+        return len(row_ids)
+
+    def _forget_rows(self, row_ids: List[int]):
+        for row in row_ids:
+            key = (self.filenames[row], self.chunk_orders[row])
+            if self.keys.get(key) == row:
+                del self.keys[key]
+
+    def upsert(self, rows: List[Tuple[str, int, str, List[float]]]) -> int:
+        """
+        Append the rows of new or changed chunks, replacing their stored row
+        and reference. Rows whose content and vector did not change are left
+        as they are.
+
+        Returns:
+            int: Number of rows written
+        """
+        vectors = self._normalize(rows)
+        latest = {(row[0], row[1]): offset for offset, row in enumerate(rows)}
+        changed, replaced = [], []
+        for key, offset in latest.items():
+            stored = self.keys.get(key)
+            if stored is not None:
+                if self.contents[stored] == rows[offset][2] and np.array_equal(
+                    self.matrix[stored], vectors[offset]
+                ):
+                    continue
+                replaced.append(stored)
+            changed.append(offset)
+
+        self.delete_reference_keys(list(latest))
+        self.delete_rows(replaced)
+        if changed:
+            self._append([rows[offset] for offset in changed], vectors[changed])
+        return len(changed)
+
+    def add_references(self, references: List[Tuple[str, int, str, int, str]]):
+        references = [
+            ref for ref in references if self.references.get(ref[:2]) != tuple(ref)
+        ]
+        if not references:
+            return
+        keys = [(ref[0], ref[1]) for ref in references]
+        self.delete_rows([self.keys[key] for key in keys if key in self.keys])
+        self._log_file.write(json.dumps({"op": "ref", "refs": references}) + "\n")
+        self._sync_log()
+        self.references.update(zip(keys, references))
+
+    def delete_reference_keys(self, keys: List[Tuple[str, int]]) -> int:
+        keys = [key for key in keys if key in self.references]
+        if not keys:
+            return 0
+        for key in keys:
+            del self.references[key]
+        self._log_file.write(json.dumps({"op": "unref_keys", "keys": keys}) + "\n")
+        self._sync_log()
+        return len(keys)
+
+    def delete_stale(self, chunk_counts: Dict[str, Optional[int]]) -> int:
+        """Delete the rows and references not kept by `chunk_counts`."""
+
+        def is_stale(key: Tuple[str, int]) -> bool:
+            if key[0] not in chunk_counts:
+                return True
+            count = chunk_counts[key[0]]
+            return count is not None and key[1] >= count
+
+        deleted = self.delete_rows(
+            [row for key, row in self.keys.items() if is_stale(key)]
+        )
+        return deleted + self.delete_reference_keys(
+            [key for key in self.references if is_stale(key)]
+        )
+
+    def promote_references(self, filenames: set) -> int:
+        """
+        Before the chunks of `filenames` are deleted, turn the first reference
+        from another file to each of them into a row with its content and
+        vector, and point the other references to it.
+
+        Returns:
+            int: Number of references promoted
+        """
+        promoted: Dict[Tuple[str, int], Tuple[str, int]] = {}
+        for key, ref in sorted(self.references.items()):
+            canonical = (ref[2], ref[3])
+            if (
+                ref[2] in filenames
+                and ref[0] not in filenames
+                and canonical in self.keys
+                and canonical not in promoted
+            ):
+                promoted[canonical] = key
+        if not promoted:
+            return 0
+
+        repointed = [
+            (*key, *promoted[(ref[2], ref[3])], ref[4])
+            for key, ref in self.references.items()
+            if (ref[2], ref[3]) in promoted
+            and ref[0] not in filenames
+            and key != promoted[(ref[2], ref[3])]
+        ]
+        rows = [self.keys[canonical] for canonical in promoted]
+        self.delete_reference_keys(list(promoted.values()))
+        self._append(
+            [
+                (*key, self.contents[row], None)
+                for key, row in zip(promoted.values(), rows)
+            ],
+            np.array(self.matrix[rows]),
+        )
+        self.add_references(repointed)
+        return len(promoted)
+
+    def _drop_references(self, filenames: set):
+        self.references = {
+            key: ref
+            for key, ref in self.references.items()
+            if ref[0] not in filenames and ref[2] not in filenames
+        }
+
+    def delete_references(self, filenames: set):
+        self._log_file.write(
+            json.dumps({"op": "unref", "filenames": sorted(filenames)}) + "\n"
+        )
+        self._sync_log()
+        self._drop_references(filenames)
+
+    def compact(self):
+        """
+        Rewrite the table without the deleted rows. The live rows are written
+        to the files of the next generation and fsync'ed, then state.json is
+        replaced to switch to them; the current files are only removed after
+        that, so a crash or a full disk never leaves the table without them.
+        """
+        if self.alive.all():
+            return
+        keep = np.flatnonzero(self.alive)
+        generation = self.generation + 1
+        matrix_path, log_path = self._generation_paths(generation)
+        capacity = max(len(keep), self._MIN_CAPACITY)
+        try:
+            self._write_matrix(matrix_path, keep, capacity)
+            self._write_log(log_path, keep)
+            self._fsync_dir()
+        except OSError:
+            matrix_path.unlink(missing_ok=True)
+            log_path.unlink(missing_ok=True)
+            raise
+
+        old_paths = (self._matrix_path, self._log_path)
+        self.generation = generation
+        self._save_state()
+
+        self._log_file.close()
+        self.matrix.flush()
+        self.matrix = None
+        self.filenames = [self.filenames[row] for row in keep]
+        self.chunk_orders = [self.chunk_orders[row] for row in keep]
+        self.contents = [self.contents[row] for row in keep]
+        self.keys = {
+            key: row for row, key in enumerate(zip(self.filenames, self.chunk_orders))
+        }
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.count = len(keep)
+        self._open_matrix(capacity)
+        self._log_file = open(self._log_path, "a", encoding="utf-8")
+        for path in old_paths:
+            path.unlink(missing_ok=True)
+
+    def _write_matrix(self, path: Path, keep: np.ndarray, capacity: int):
+        """Copy the rows `keep` of the matrix to a new, fsync'ed file."""
+        with open(path, "wb") as file:
+            file.truncate(capacity * self.dimension * 4)
+        matrix = np.memmap(
+            path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension)
+        )
+        block = 65536
+        for start in range(0, len(keep), block):
+            end = min(start + block, len(keep))
+            matrix[start:end] = self.matrix[keep[start:end]]
+        matrix.flush()
+        del matrix
+        with open(path, "rb+") as file:
+            os.fsync(file.fileno())
+
+    def _write_log(self, path: Path, keep: np.ndarray):
+        """Write the log of the references and of the rows `keep`, fsync'ed."""
+        with open(path, "w", encoding="utf-8") as file:
+            if self.references:
+                file.write(
+                    json.dumps({"op": "ref", "refs": list(self.references.values())})
+                    + "\n"
+                )
+            for new_row, row in enumerate(keep):
+                file.write(
+                    json.dumps(
+                        {
+                            "op": "add",
+                            "row": new_row,
+                            "filename": self.filenames[row],
+                            "chunk_order": self.chunk_orders[row],
+                            "content": self.contents[row],
+                        },
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+            file.flush()
+            os.fsync(file.fileno())
+
+    def set_commit(self, commit_sha: str):
+        self.commit_sha = commit_sha
+        self._save_state()
+
+    def close(self):
+        self._log_file.close()
+        if self.matrix is not None:
+            self.matrix.flush()
+
+
+class NumpyVectorStore(BaseVectorStore):
+    """
+    Vector store with the same interface as VectorDatabase, keeping the
+    embeddings in memory-mapped float32 matrices under VECTORS_DIR and
+    answering queries with an exact, vectorized cosine top-k.
+    """
+
+    def __init__(self, logger, base_dir: Path = VECTORS_DIR):
+        super().__init__(logger)
+        self.logger = logger
+        self.base_dir = Path(base_dir)
+        self._tables: Dict[str, _VectorTable] = {}
+        self._lock = threading.RLock()
+
+    def connect(self) -> bool:
+        """The store is in-process, there is nothing to connect to"""
+        return True
+
+    def disconnect(self):
+        """Flush and close every open table"""
+        with self._lock:
+            for table in self._tables.values():
+                table.close()
+            self._tables.clear()
+
+    def _get_table(self, table_name: str) -> Optional[_VectorTable]:
+        """Table set up in this process, or stored on disk by an earlier one."""
+        if table_name in self._tables:
+            return self._tables[table_name]
+        if (self.base_dir / table_name / "state.json").exists():
+            return self._open_table(table_name)
+        self.logger.error("Table '%s' has not been set up", table_name)
+        return None
+
+    def setup_database(
+        self,
+        table_name: str = "default_table",
+        vector_dimension: int = DIMENSION_EMBEDDING_DIMENSION,
+        create_index: bool = True,
+    ) -> bool:
+        """
+        Open (or create) the files of a table
+
+        Args:
+            table_name (str, optional): Name of the table. Defaults to 'default_table'.
+            vector_dimension (int, optional): Dimension of the embedding vectors.
+            create_index (bool, optional): Ignored, searches are exact.
+
+        Returns:
+            bool: True if setup successful, False otherwise
+        """
+        with self._lock:
+            table = self._tables.get(table_name)
+            if table is not None:
+                if table.dimension == int(vector_dimension):
+                    return True
+                self.logger.error(
+                    "Table '%s' stores vectors of dimension %d, not %s",
+                    table_name,
+                    table.dimension,
+                    vector_dimension,
+                )
+                return False
+            try:
+                self._tables[table_name] = _VectorTable(
+                    self.base_dir / table_name, int(vector_dimension)
+                )
+                self.logger.info(
+                    "Vector store setup completed successfully for table '%s'",
+                    table_name,
+                )
+                return True
+            except (OSError, ValueError) as e:
+                self.logger.error("Error setting up vector store: %s", e)
+                return False
+
+    def build_vector_index(
+        self, table_name: str = "default_table", rebuild: bool = False
+    ) -> bool:
+        """
+        Searches are exact, so building the index only compacts the table,
+        dropping the deleted rows from the files.
+        """
+        with self._lock:
+            table = self._get_table(table_name)
+            if table is None:
+                return False
+            try:
+                table.compact()
+                return True
+            except OSError as e:
+                self.logger.error("Error compacting table '%s': %s", table_name, e)
+                return False
+
+    def _open_table(self, table_name: str) -> Optional[_VectorTable]:
+        """Open a table with the dimension it was created with."""
+        if table_name not in self._tables:
+            try:
+                self._tables[table_name] = _VectorTable(self.base_dir / table_name)
+            except (OSError, ValueError) as e:
+                self.logger.error("Error opening table '%s': %s", table_name, e)
+                return None
+        return self._tables[table_name]
+
+    def get_indexed_commit(self, table_name: str = "default_table") -> Optional[str]:
+        """Get the commit SHA of the last indexed state of a table"""
+        with self._lock:
+            table = self._open_table(table_name)
+            return table.commit_sha if table else None
+
+    def set_indexed_commit(
+        self, commit_sha: str, table_name: str = "default_table"
+    ) -> bool:
+        """Store the commit SHA of the last indexed state of a table"""
+        with self._lock:
+            table = self._open_table(table_name)
+            if table is None:
+                return False
+            try:
+                table.set_commit(commit_sha)
+                return True
+            except OSError as e:
+                self.logger.error(
+                    "Error storing index state of '%s': %s", table_name, e
+                )
+                return False
+
+    def delete_file_chunks(
+        self, filenames: Iterable[str], table_name: str = "default_table"
+    ) -> bool:
+        """
+        Delete every chunk stored for the given files, and the references from
+        or to them, once the references of other files are promoted
+        """
+        filenames = set(filenames)
+        if not filenames:
+            return True
+
+        with self._lock:
+            table = self._get_table(table_name)
+            if table is None:
+                return False
+            rows = [
+                row
+                for row, filename in enumerate(table.filenames)
+                if filename in filenames
+            ]
+            try:
+                promoted = table.promote_references(filenames)
+                deleted = table.delete_rows(rows)
+                table.delete_references(filenames)
+            except OSError as e:
+                self.logger.error("Error deleting chunks from '%s': %s", table_name, e)
+                return False
+            if promoted:
+                self.logger.info(
+                    "Promoted %d chunk references of '%s' to rows", promoted, table_name
+                )
+            self.logger.info("Deleted %d stale chunks from '%s'", deleted, table_name)
+            return True
+
+    def delete_stale_chunks(
+        self,
+        chunk_counts: Dict[str, Optional[int]],
+        table_name: str = "default_table",
+    ) -> bool:
+        """
+        Delete the chunks left over by a full re-index: those of the files
+        missing from `chunk_counts` and those with a chunk_order not below the
+        count of their file (None keeps every chunk)
+        """
+        with self._lock:
+            table = self._get_table(table_name)
+            if table is None:
+                return False
+            try:
+                deleted = table.delete_stale(chunk_counts)
+            except OSError as e:
+                self.logger.error("Error deleting chunks from '%s': %s", table_name, e)
+                return False
+            self.logger.info("Deleted %d stale chunks from '%s'", deleted, table_name)
+            return True
+
+    def insert_chunk_references(
+        self,
+        references: List[Tuple[str, int, str, int, str]],
+        table_name: str = "default_table",
+    ) -> bool:
+        """
+        Record chunks whose embedding was skipped because they duplicate another
+        one, replacing the row or reference stored for the same chunk
+        """
+        if not references:
+            return True
+
+        with self._lock:
+            table = self._get_table(table_name)
+            if table is None:
+                return False
+            try:
+                table.add_references([tuple(ref) for ref in references])
+                return True
+            except OSError as e:
+                self.logger.error(
+                    "Error inserting chunk references into '%s': %s", table_name, e
+                )
+                return False
+
+    def insert_embedding(
+        self,
+        filename: str,
+        content: str,
+        embedding: List[float],
+        chunk_order: int = 0,
+        table_name: str = "default_table",
+    ) -> bool:
+        """Insert or update the embedding record of a chunk"""
+        return not self.insert_embeddings_bulk(
+            [(filename, chunk_order, content, embedding)], table_name
+        )
+
+    def insert_embeddings_bulk(
+        self,
+        rows: List[Tuple[str, int, str, List[float]]],
+        table_name: str = "default_table",
+    ) -> List[int]:
+        """
+        Upsert many embedding records: the rows of new or changed chunks are
+        appended and replace the stored ones, unchanged rows are skipped
+
+        Returns:
+            List[int]: Positions in `rows` of the records that could not be inserted
+        """
+        if not rows:
+            return []
+
+        with self._lock:
+            table = self._get_table(table_name)
+            if table is None:
+                return list(range(len(rows)))
+
+            failed_rows, valid_rows = [], []
+            for idx, row in enumerate(rows):
+                if row[3] is not None and len(row[3]) == table.dimension:
+                    valid_rows.append(row)
+                else:
+                    self.logger.error("Invalid embedding vector for '%s'", row[0])
+                    failed_rows.append(idx)
+
+            if valid_rows:
+                try:
+                    table.upsert(valid_rows)
+                except (OSError, ValueError) as e:
+                    self.logger.error(
+                        "Error inserting embeddings into '%s': %s", table_name, e
+                    )
+                    return list(range(len(rows)))
+            return failed_rows
+
+    def _filter_mask(
+        self, table: _VectorTable, filters: Optional[Dict[str, Any]]
+    ) -> np.ndarray:
+        mask = table.alive.copy()
+        for key, value in (filters or {}).items():
+            if key == "filename":
+                names = set(value) if isinstance(value, (list, tuple, set)) else {value}
+                mask &= np.fromiter(
+                    (name in names for name in table.filenames), bool, table.count
+                )
+            elif key == "filename_prefix":
+                mask &= np.fromiter(
+                    (name.startswith(value) for name in table.filenames),
+                    bool,
+                    table.count,
+                )
+            elif key == "chunk_order":
+                mask &= np.asarray(table.chunk_orders, dtype=np.int64) == value
+            else:
+                raise ValueError(f"Unsupported search filter: {key}")
+        return mask
+
+    def search_similar(
+        self,
+        query_embedding: List[float],
+        k: int = 5,
+        table_name: str = "default_table",
+        filters: Optional[Dict[str, Any]] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the k chunks closest to the query embedding (exact cosine distance)"""
+        results = self.search_similar_batch(
+            [query_embedding], k, table_name, filters, probes, ef_search
+        )
+        return results[0] if results else []
+
+    def search_similar_batch(
+        self,
+        query_embeddings: List[List[float]],
+        k: int = 5,
+        table_name: str = "default_table",
+        filters: Optional[Dict[str, Any]] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Answer several similarity queries with a single matrix product
+
+        `probes` and `ef_search` are accepted for interface compatibility,
+        searches are always exact.
+        """
+        if not query_embeddings:
+            return []
+
+        with self._lock:
+            table = self._get_table(table_name)
+            if table is None:
+                return []
+
+            queries = np.asarray(query_embeddings, dtype=np.float32)
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            queries /= norms
+
+            mask = self._filter_mask(table, filters)
+            candidates = np.flatnonzero(mask)
+            results: List[List[Dict[str, Any]]] = [[] for _ in query_embeddings]
+            if not len(candidates):
+                return results
+
+            scores = queries @ table.matrix[candidates].T
+            top = min(k, len(candidates))
+            best = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+
+            for query_idx in range(len(queries)):
+                order = best[query_idx][np.argsort(-scores[query_idx, best[query_idx]])]
+                for position in order:
+                    row = int(candidates[position])
+                    results[query_idx].append(
+                        {
+                            "filename": table.filenames[row],
+                            "chunk_order": table.chunk_orders[row],
+                            "content": table.contents[row],
+                            "distance": float(1.0 - scores[query_idx, position]),
+                        }
+                    )
+            return results
@@ -1,9 +1,22 @@
 """PosgreSQL Vectore Database Manager with pgvector support"""
 
+import math
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from tenacity import (
+    Retrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+from src.db.base_vector_store import BaseVectorStore, SCHEMA_VERSION, content_hash
+from src.utils.resource_limits import db_slot
 from conf.config import (
     POSGRESQL_DB_HOST,
     POSGRESQL_DB_PORT,
@@ -11,13 +24,39 @@ from conf.config import (
     POSGRESQL_DB_USER,
     POSGRESQL_DB_PSW,
     DIMENSION_EMBEDDING_DIMENSION,
+    VECTOR_INDEX_TYPE,
+    VECTOR_INDEX_MAINTENANCE_WORK_MEM,
+    VECTOR_INDEX_PARALLEL_WORKERS,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    VECTOR_SEARCH_PROBES,
+    VECTOR_SEARCH_EF_SEARCH,
+    DB_POOL_ENABLED,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_HEALTH_CHECK,
+    DB_RETRY_ATTEMPTS,
+    DB_RETRY_BACKOFF_SECONDS,
 )
 
 
-class VectorDatabase:
+INDEX_STATE_TABLE = "doctech_index_state"
+SCHEMA_VERSION_TABLE = "doctech_schema_version"
+REFERENCES_TABLE_SUFFIX = "_refs"
+
+# Errors after which the operation is retried on a fresh connection
+TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class VectorDatabase(BaseVectorStore):
     """Class to manage embeddings sotrage and similarity search in PosgreSQL with pgvector"""
 
-    def __init__(self, logger, connection_params: Dict[str, str] = None):
+    def __init__(
+        self,
+        logger,
+        connection_params: Dict[str, str] = None,
+        pooled: bool = DB_POOL_ENABLED,
+    ):
         """
         Initialize the vector database connection
 
@@ -25,12 +64,19 @@ class VectorDatabase:
             logger: Logger instance
             connection_params: Database connection parameters
                               If None, will try to get from environment variables
+            pooled: Use a ThreadedConnectionPool (DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE)
+                    instead of a single connection shared behind a lock
         """
+        super().__init__(logger)
         self.logger = logger
         self.connection = None
+        self.pool: Optional[ThreadedConnectionPool] = None
+        self.pooled = pooled
         self.connection_params = (
             connection_params or self._get_default_connection_params()
         )
+        self._connection_lock = threading.RLock()
+        self._pool_slots = threading.BoundedSemaphore(max(1, DB_POOL_MAX_SIZE))
 
     def _get_default_connection_params(self) -> Dict[str, str]:
         """Get connection parameters from environment variables"""
@@ -50,8 +96,15 @@ class VectorDatabase:
             bool: True if connection successful, False otherwise
         """
         try:
-            self.connection = psycopg2.connect(**self.connection_params)
-            self.connection.autocommit = False
+            if self.pooled:
+                self.pool = ThreadedConnectionPool(
+                    max(1, DB_POOL_MIN_SIZE),
+                    max(1, DB_POOL_MAX_SIZE),
+                    **self.connection_params,
+                )
+            else:
+                self.connection = psycopg2.connect(**self.connection_params)
+                self.connection.autocommit = False
             self.logger.info("Succesfully connect to PostgreSQL database")
             return True
         except psycopg2.Error as e:
@@ -60,20 +113,107 @@ class VectorDatabase:
 
     def disconnect(self):
         """Close database connection"""
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
+            self.logger.info("Database connection pool closed")
         if self.connection:
             self.connection.close()
             self.logger.info("Database connection closed")
 
     def _ensure_connection(self) -> bool:
         """Ensure database conneciton is active"""
+        if self.pooled:
+            return (self.pool is not None and not self.pool.closed) or self.connect()
         if not self.connection or self.connection.closed:
             return self.connect()
         return True
 
+    def _is_healthy(self, connection) -> bool:
+        """Check that a pooled connection is still usable before handing it out"""
+        if connection.closed:
+            return False
+        if not DB_POOL_HEALTH_CHECK:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @contextmanager
+    def _get_connection(self) -> Iterator[Any]:
+        """
+        Borrow a connection for one transaction.
+
+        In pooled mode the connection is checked out of the pool (blocking while
+        all DB_POOL_MAX_SIZE connections are in use) and health-checked; broken
+        connections are discarded. Otherwise the single connection is used
+        under a lock, so the instance can be shared by threads. In a batch run
+        a global slot is also held, capping the connections in use by all the
+        processes.
+        """
+        if not self.pooled:
+            with self._connection_lock, db_slot():
+                if not self._ensure_connection():
+                    raise psycopg2.OperationalError("Could not connect to PostgreSQL")
+                yield self.connection
+            return
+
+        with self._connection_lock:
+            if not self._ensure_connection():
+                raise psycopg2.OperationalError("Could not connect to PostgreSQL")
+
+        with self._pool_slots, db_slot():
+            connection = self.pool.getconn()
+            while not self._is_healthy(connection):
+                self.logger.warning("Discarding a broken pooled connection")
+                self.pool.putconn(connection, close=True)
+                connection = self.pool.getconn()
+            connection.autocommit = False
+            try:
+                yield connection
+            finally:
+                self.pool.putconn(connection, close=bool(connection.closed))
+
+    def _run(self, operation: Callable[[Any], Any]) -> Any:
+        """
+        Run `operation(connection)` in a transaction and commit it.
+
+        The transaction is rolled back on error. Transient errors (lost
+        connection, server restart) are retried DB_RETRY_ATTEMPTS times with
+        exponential backoff on a fresh connection; other errors are raised.
+        """
+        for attempt in Retrying(
+            retry=retry_if_exception_type(TRANSIENT_ERRORS),
+            stop=stop_after_attempt(max(1, DB_RETRY_ATTEMPTS)),
+            wait=wait_exponential_jitter(initial=DB_RETRY_BACKOFF_SECONDS, max=30),
+            before_sleep=lambda state: self.logger.warning(
+                "Transient database error, retrying (attempt %d): %s",
+                state.attempt_number,
+                state.outcome.exception(),
+            ),
+            reraise=True,
+        ):
+            with attempt:
+                with self._get_connection() as connection:
+                    try:
+                        result = operation(connection)
+                        connection.commit()
+                        return result
+                    except psycopg2.Error:
+                        if not connection.closed:
+                            connection.rollback()
+                        raise
+        return None
+
     def setup_database(
         self,
         table_name: str = "default_table",
         vector_dimension: int = DIMENSION_EMBEDDING_DIMENSION,
+        create_index: bool = True,
     ) -> bool:
         """
         Create the necessary table and enable pgvector extension
@@ -81,15 +221,15 @@ class VectorDatabase:
         Args:
             table_name (str, optional): Name of the table to create. Defaults to 'default_table'.
             vector_dimension (int, optional): Dimension of the embedding vectors. Defaults to 768.
+            create_index (bool, optional): Create the similarity index right away. Pass False
+                when bulk-loading and call build_vector_index once the rows are in.
 
         Returns:
             bool: True if setup successful, False otherwise
         """
-        if not self._ensure_connection():
-            return False
 
-        try:
-            with self.connection.cursor() as cursor:
+        def _setup(connection):
+            with connection.cursor() as cursor:
                 # Enable pgvector extension
                 cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
 
@@ -101,6 +241,7 @@ class VectorDatabase:
                         filename VARCHAR(500) NOT NULL,
                         chunk_order INTEGER DEFAULT 0, 
                         content TEXT, 
+                        content_hash CHAR(64),
                         embedding VECTOR({dimension}),
                         create_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     );
@@ -113,27 +254,548 @@ class VectorDatabase:
                 cursor.execute(create_table_query)
 
                 # Create index for similarity search
-                index_query = sql.SQL(
+                if create_index:
+                    cursor.execute(
+                        self._build_index_query(table_name, if_not_exists=True)
+                    )
+
+                self._create_state_table(cursor)
+                self._create_references_table(cursor, table_name)
+                self._migrate_schema(cursor, table_name)
+
+        try:
+            self._run(_setup)
+            self.logger.info(
+                "Database setup completed successfully for table '%s'", table_name
+            )
+            return True
+        except psycopg2.Error as e:
+            self.logger.error("Error setting up database: %s", e)
+            return False
+
+    def _index_name(self, table_name: str) -> str:
+        return f"idx_{table_name}_embedding"
+
+    def _build_index_query(
+        self, table_name: str, row_count: int = 0, if_not_exists: bool = False
+    ) -> sql.Composed:
+        """
+        Build the CREATE INDEX statement of the configured index type.
+
+        For ivfflat, `lists` follows the pgvector guidance: rows / 1000 up to
+        1M rows and sqrt(rows) above that.
+        """
+        if VECTOR_INDEX_TYPE == "hnsw":
+            method = sql.SQL(
+                "hnsw (embedding vector_cosine_ops) WITH (m = {m}, ef_construction = {ef})"
+            ).format(m=sql.Literal(HNSW_M), ef=sql.Literal(HNSW_EF_CONSTRUCTION))
+        else:
+            if row_count <= 0:
+                lists = 100
+            elif row_count <= 1_000_000:
+                lists = max(1, row_count // 1000)
+            else:
+                lists = int(math.sqrt(row_count))
+            method = sql.SQL(
+                "ivfflat (embedding vector_cosine_ops) WITH (lists = {lists})"
+            ).format(lists=sql.Literal(lists))
+
+        return sql.SQL(
+            "CREATE INDEX {if_not_exists} {index_name} ON {table} USING {method};"
+        ).format(
+            if_not_exists=sql.SQL("IF NOT EXISTS" if if_not_exists else ""),
+            index_name=sql.Identifier(self._index_name(table_name)),
+            table=sql.Identifier(table_name),
+            method=method,
+        )
+
+    def build_vector_index(
+        self, table_name: str = "default_table", rebuild: bool = False
+    ) -> bool:
+        """
+        Build the similarity index once the table is loaded
+
+        The index parameters are derived from the current row count, and the
+        build uses VECTOR_INDEX_MAINTENANCE_WORK_MEM and
+        VECTOR_INDEX_PARALLEL_WORKERS.
+
+        Args:
+            table_name (str, optional): Name of the table. Defaults to "default_table".
+            rebuild (bool, optional): Drop and rebuild the index if it already exists,
+                so ivfflat centroids are trained on the new data. Defaults to False.
+
+        Returns:
+            bool: True if the index exists after the call, False otherwise
+        """
+
+        def _build(connection) -> Optional[int]:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM pg_indexes WHERE tablename = %s AND indexname = %s;",
+                    (table_name, self._index_name(table_name)),
+                )
+                if cursor.fetchone() is not None and not rebuild:
+                    return None
+
+                cursor.execute(
+                    sql.SQL("SELECT COUNT(*) FROM {table};").format(
+                        table=sql.Identifier(table_name)
+                    )
+                )
+                row_count = cursor.fetchone()[0]
+                if row_count == 0:
+                    return 0
+
+                cursor.execute(
+                    sql.SQL("SET LOCAL maintenance_work_mem = {value};").format(
+                        value=sql.Literal(VECTOR_INDEX_MAINTENANCE_WORK_MEM)
+                    )
+                )
+                cursor.execute(
+                    sql.SQL(
+                        "SET LOCAL max_parallel_maintenance_workers = {value};"
+                    ).format(value=sql.Literal(VECTOR_INDEX_PARALLEL_WORKERS))
+                )
+                cursor.execute(
+                    sql.SQL("DROP INDEX IF EXISTS {index_name};").format(
+                        index_name=sql.Identifier(self._index_name(table_name))
+                    )
+                )
+                cursor.execute(self._build_index_query(table_name, row_count))
+                return row_count
+
+        try:
+            row_count = self._run(_build)
+        except psycopg2.Error as e:
+            self.logger.error("Error building the index of '%s': %s", table_name, e)
+            return False
+
+        if row_count == 0:
+            self.logger.info("Table '%s' is empty, index not built", table_name)
+        elif row_count is not None:
+            self.logger.info(
+                "Built %s index on '%s' over %d rows",
+                VECTOR_INDEX_TYPE,
+                table_name,
+                row_count,
+            )
+        return True
+
+    def _create_state_table(self, cursor):
+        """Create the table that keeps the last indexed commit of each table"""
+        cursor.execute(
+            sql.SQL(
+                """
+                CREATE TABLE IF NOT EXISTS {state_table} (
+                    table_name VARCHAR(255) PRIMARY KEY,
+                    commit_sha VARCHAR(64),
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                """
+            ).format(state_table=sql.Identifier(INDEX_STATE_TABLE))
+        )
+
+    def _references_table(self, table_name: str) -> sql.Identifier:
+        return sql.Identifier(f"{table_name}{REFERENCES_TABLE_SUFFIX}")
+
+    def _create_references_table(self, cursor, table_name: str):
+        """Create the side table of the chunks stored as a reference to a canonical one"""
+        cursor.execute(
+            sql.SQL(
+                """
+                CREATE TABLE IF NOT EXISTS {references_table} (
+                    id SERIAL PRIMARY KEY,
+                    filename VARCHAR(500) NOT NULL,
+                    chunk_order INTEGER DEFAULT 0,
+                    canonical_filename VARCHAR(500) NOT NULL,
+                    canonical_chunk_order INTEGER DEFAULT 0,
+                    match_type VARCHAR(16),
+                    create_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                """
+            ).format(references_table=self._references_table(table_name))
+        )
+
+    def _migrate_schema(self, cursor, table_name: str):
+        """
+        Bring the tables of a repository up to SCHEMA_VERSION.
+
+        Version 2 keeps a single row per (filename, chunk_order): the copies
+        appended by the reruns of older versions are deleted, keeping the
+        newest one, the content_hash column is added and filled, and the
+        unique indexes the upserts rely on are created.
+        """
+        cursor.execute(
+            sql.SQL(
+                """
+                CREATE TABLE IF NOT EXISTS {schema_table} (
+                    table_name VARCHAR(255) PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                """
+            ).format(schema_table=sql.Identifier(SCHEMA_VERSION_TABLE))
+        )
+        cursor.execute(
+            sql.SQL("SELECT version FROM {schema_table} WHERE table_name = %s;").format(
+                schema_table=sql.Identifier(SCHEMA_VERSION_TABLE)
+            ),
+            (table_name,),
+        )
+        row = cursor.fetchone()
+        version = row[0] if row else 1
+        if version >= SCHEMA_VERSION:
+            return
+
+        table = sql.Identifier(table_name)
+        references_table = self._references_table(table_name)
+        for target, index_name in (
+            (table, f"idx_{table_name}_chunk_key"),
+            (references_table, f"idx_{table_name}{REFERENCES_TABLE_SUFFIX}_chunk_key"),
+        ):
+            cursor.execute(
+                sql.SQL(
                     """
-                    CREATE INDEX IF NOT EXISTS {index_name}
-                    ON {table} USING ivfflat (embedding vector_cosine_ops)
-                    WITH (lists = 100);
+                    DELETE FROM {target} AS older USING {target} AS newer
+                    WHERE older.filename = newer.filename
+                      AND older.chunk_order = newer.chunk_order
+                      AND older.id < newer.id;
                     """
-                ).format(
-                    index_name=sql.Identifier(f"idx_{table_name}_embedding"),
-                    table=sql.Identifier(table_name),
+                ).format(target=target)
+            )
+            cursor.execute(
+                sql.SQL(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS {index_name} "
+                    "ON {target} (filename, chunk_order);"
+                ).format(index_name=sql.Identifier(index_name), target=target)
+            )
+        cursor.execute(
+            sql.SQL(
+                "ALTER TABLE {table} ADD COLUMN IF NOT EXISTS content_hash CHAR(64);"
+            ).format(table=table)
+        )
+        cursor.execute(
+            sql.SQL(
+                """
+                UPDATE {table}
+                SET content_hash = encode(sha256(convert_to(COALESCE(content, ''), 'UTF8')), 'hex')
+                WHERE content_hash IS NULL;
+                """
+            ).format(table=table)
+        )
+        cursor.execute(
+            sql.SQL(
+                """
+                INSERT INTO {schema_table} (table_name, version, updated_at)
+                VALUES (%s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (table_name) DO UPDATE
+                SET version = EXCLUDED.version,
+                    updated_at = EXCLUDED.updated_at;
+                """
+            ).format(schema_table=sql.Identifier(SCHEMA_VERSION_TABLE)),
+            (table_name, SCHEMA_VERSION),
+        )
+        self.logger.info(
+            "Table '%s' migrated to schema version %d", table_name, SCHEMA_VERSION
+        )
+
+    def get_indexed_commit(self, table_name: str = "default_table") -> Optional[str]:
+        """
+        Get the commit SHA of the last indexed state of a table
+
+        Args:
+            table_name (str, optional): Name of the table. Defaults to "default_table".
+
+        Returns:
+            Optional[str]: Commit SHA or None if the table was never fully indexed
+        """
+
+        def _select(connection) -> Optional[str]:
+            with connection.cursor() as cursor:
+                self._create_state_table(cursor)
+                cursor.execute(
+                    sql.SQL(
+                        "SELECT commit_sha FROM {state_table} WHERE table_name = %s;"
+                    ).format(state_table=sql.Identifier(INDEX_STATE_TABLE)),
+                    (table_name,),
                 )
+                row = cursor.fetchone()
+                return row[0] if row else None
+
+        try:
+            return self._run(_select)
+        except psycopg2.Error as e:
+            self.logger.error("Error reading index state of '%s': %s", table_name, e)
+            return None
+
+    def set_indexed_commit(
+        self, commit_sha: str, table_name: str = "default_table"
+    ) -> bool:
+        """
+        Store the commit SHA of the last indexed state of a table
+
+        Args:
+            commit_sha (str): SHA of the indexed commit
+            table_name (str, optional): Name of the table. Defaults to "default_table".
 
-                cursor.execute(index_query)
+        Returns:
+            bool: True if the state was stored, False otherwise
+        """
 
-                self.connection.commit()
-                self.logger.info(
-                    "Database setup completed successfully for table '%s'", table_name
+        def _upsert(connection):
+            with connection.cursor() as cursor:
+                self._create_state_table(cursor)
+                cursor.execute(
+                    sql.SQL(
+                        """
+                        INSERT INTO {state_table} (table_name, commit_sha, updated_at)
+                        VALUES (%s, %s, CURRENT_TIMESTAMP)
+                        ON CONFLICT (table_name) DO UPDATE
+                        SET commit_sha = EXCLUDED.commit_sha,
+                            updated_at = EXCLUDED.updated_at;
+                        """
+                    ).format(state_table=sql.Identifier(INDEX_STATE_TABLE)),
+                    (table_name, commit_sha),
                 )
-                return True
+
+        try:
+            self._run(_upsert)
+            return True
         except psycopg2.Error as e:
-            self.logger.error("Error setting up database: %s", e)
-            self.connection.rollback()
+            self.logger.error("Error storing index state of '%s': %s", table_name, e)
+            return False
+
+    def delete_file_chunks(
+        self, filenames: Iterable[str], table_name: str = "default_table"
+    ) -> bool:
+        """
+        Delete every chunk stored for the given files, and the chunk references
+        from or to them
+
+        In an incremental run the copies of a deleted chunk may belong to
+        unchanged files, which are not indexed again. So the first reference
+        of every deleted chunk that is still referenced from another file is
+        promoted to a row with the content and embedding of the chunk, and
+        the other references are pointed to it, before the delete.
+
+        Args:
+            filenames (Iterable[str]): Names of the files
+            table_name (str, optional): Name of the table. Defaults to "default_table".
+
+        Returns:
+            bool: True if deletion successful, False otherwise
+        """
+        filenames = list(filenames)
+        if not filenames:
+            return True
+
+        promote_query = sql.SQL(
+            """
+            WITH promoted AS (
+                SELECT DISTINCT ON (refs.canonical_filename, refs.canonical_chunk_order)
+                    refs.filename, refs.chunk_order,
+                    refs.canonical_filename, refs.canonical_chunk_order,
+                    stored.content, stored.content_hash, stored.embedding
+                FROM {references_table} AS refs
+                JOIN {table} AS stored
+                    ON stored.filename = refs.canonical_filename
+                    AND stored.chunk_order = refs.canonical_chunk_order
+                WHERE refs.canonical_filename = ANY(%(files)s)
+                    AND NOT refs.filename = ANY(%(files)s)
+                ORDER BY refs.canonical_filename, refs.canonical_chunk_order,
+                    refs.filename, refs.chunk_order
+            ),
+            inserted AS (
+                INSERT INTO {table}
+                    (filename, chunk_order, content, content_hash, embedding)
+                SELECT filename, chunk_order, content, content_hash, embedding
+                FROM promoted
+                ON CONFLICT (filename, chunk_order) DO NOTHING
+            ),
+            repointed AS (
+                UPDATE {references_table} AS refs
+                SET canonical_filename = promoted.filename,
+                    canonical_chunk_order = promoted.chunk_order
+                FROM promoted
+                WHERE refs.canonical_filename = promoted.canonical_filename
+                    AND refs.canonical_chunk_order = promoted.canonical_chunk_order
+                    AND (refs.filename, refs.chunk_order)
+                        <> (promoted.filename, promoted.chunk_order)
+                    AND NOT refs.filename = ANY(%(files)s)
+            )
+            DELETE FROM {references_table} AS refs
+            USING promoted
+            WHERE refs.filename = promoted.filename
+                AND refs.chunk_order = promoted.chunk_order;
+            """
+        ).format(
+            table=sql.Identifier(table_name),
+            references_table=self._references_table(table_name),
+        )
+
+        def _delete(connection) -> int:
+            with connection.cursor() as cursor:
+                cursor.execute(promote_query, {"files": filenames})
+                if cursor.rowcount:
+                    self.logger.info(
+                        "Promoted %d chunk references of '%s' to rows",
+                        cursor.rowcount,
+                        table_name,
+                    )
+                cursor.execute(
+                    sql.SQL("DELETE FROM {table} WHERE filename = ANY(%s);").format(
+                        table=sql.Identifier(table_name)
+                    ),
+                    (filenames,),
+                )
+                deleted = cursor.rowcount
+                cursor.execute(
+                    sql.SQL(
+                        """
+                        DELETE FROM {references_table}
+                        WHERE filename = ANY(%s) OR canonical_filename = ANY(%s);
+                        """
+                    ).format(references_table=self._references_table(table_name)),
+                    (filenames, filenames),
+                )
+                return deleted
+
+        try:
+            deleted = self._run(_delete)
+            self.logger.info("Deleted %d stale chunks from '%s'", deleted, table_name)
+            return True
+        except psycopg2.Error as e:
+            self.logger.error("Error deleting chunks from '%s': %s", table_name, e)
+            return False
+
+    def delete_stale_chunks(
+        self,
+        chunk_counts: Dict[str, Optional[int]],
+        table_name: str = "default_table",
+    ) -> bool:
+        """
+        Delete the chunks left over by a full re-index, in one statement per table
+
+        Args:
+            chunk_counts (Dict[str, Optional[int]]): Number of chunks of every file
+                of the repository. The chunks of other files and those with a
+                chunk_order not below the count are deleted; None keeps every
+                chunk of the file.
+            table_name (str, optional): Name of the table. Defaults to "default_table".
+
+        Returns:
+            bool: True if deletion successful, False otherwise
+        """
+        filenames = list(chunk_counts)
+        counts = [chunk_counts[filename] for filename in filenames]
+        delete_query = sql.SQL(
+            """
+            DELETE FROM {target} AS stored
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM unnest(%s::varchar[], %s::integer[]) AS kept(filename, chunks)
+                WHERE kept.filename = stored.filename
+                  AND (kept.chunks IS NULL OR stored.chunk_order < kept.chunks)
+            );
+            """
+        )
+
+        def _delete(connection) -> int:
+            deleted = 0
+            with connection.cursor() as cursor:
+                for target in (
+                    sql.Identifier(table_name),
+                    self._references_table(table_name),
+                ):
+                    cursor.execute(
+                        delete_query.format(target=target), (filenames, counts)
+                    )
+                    deleted += cursor.rowcount
+            return deleted
+
+        try:
+            deleted = self._run(_delete)
+            self.logger.info("Deleted %d stale chunks from '%s'", deleted, table_name)
+            return True
+        except psycopg2.Error as e:
+            self.logger.error("Error deleting chunks from '%s': %s", table_name, e)
+            return False
+
+    def _delete_keys(self, cursor, target: sql.Composable, keys: List[Tuple[str, int]]):
+        """Delete the rows of `target` with the given (filename, chunk_order) keys"""
+        cursor.execute(
+            sql.SQL(
+                """
+                DELETE FROM {target}
+                WHERE (filename, chunk_order) IN (
+                    SELECT * FROM unnest(%s::varchar[], %s::integer[])
+                );
+                """
+            ).format(target=target),
+            ([key[0] for key in keys], [key[1] for key in keys]),
+        )
+
+    def insert_chunk_references(
+        self,
+        references: List[Tuple[str, int, str, int, str]],
+        table_name: str = "default_table",
+    ) -> bool:
+        """
+        Record chunks whose embedding was skipped because they duplicate another one
+
+        A chunk has a single entry: its reference replaces the stored one and
+        any row stored for it in the table.
+
+        Args:
+            references (List[Tuple[str, int, str, int, str]]): (filename, chunk_order,
+                canonical_filename, canonical_chunk_order, match_type) rows
+            table_name (str, optional): Name of the table. Defaults to "default_table".
+
+        Returns:
+            bool: True if insertion successful, False otherwise
+        """
+        if not references:
+            return True
+        # ON CONFLICT cannot update the same row twice in one statement
+        references = list({(ref[0], ref[1]): ref for ref in references}.values())
+
+        insert_query = sql.SQL(
+            """
+            INSERT INTO {references_table} AS stored
+                (filename, chunk_order, canonical_filename, canonical_chunk_order, match_type)
+            VALUES %s
+            ON CONFLICT (filename, chunk_order) DO UPDATE
+            SET canonical_filename = EXCLUDED.canonical_filename,
+                canonical_chunk_order = EXCLUDED.canonical_chunk_order,
+                match_type = EXCLUDED.match_type,
+                create_at = CURRENT_TIMESTAMP
+            WHERE (stored.canonical_filename, stored.canonical_chunk_order, stored.match_type)
+                IS DISTINCT FROM
+                (EXCLUDED.canonical_filename, EXCLUDED.canonical_chunk_order, EXCLUDED.match_type)
+            """
+        ).format(references_table=self._references_table(table_name))
+
+        def _insert(connection):
+            with connection.cursor() as cursor:
+                self._delete_keys(
+                    cursor,
+                    sql.Identifier(table_name),
+                    [(ref[0], ref[1]) for ref in references],
+                )
+                execute_values(
+                    cursor,
+                    insert_query.as_string(cursor),
+                    references,
+                    page_size=len(references),
+                )
+
+        try:
+            self._run(_insert)
+            return True
+        except psycopg2.Error as e:
+            self.logger.error(
+                "Error inserting chunk references into '%s': %s", table_name, e
+            )
             return False
 
     def insert_embedding(
@@ -145,7 +807,8 @@ class VectorDatabase:
         table_name: str = "default_table",
     ) -> bool:
         """
-        Insert a new embedding record into the database
+        Insert the embedding record of a chunk, or update the stored one if
+        its content or embedding changed
 
         Args:
             filename (str): Name of the file
@@ -157,30 +820,326 @@ class VectorDatabase:
         Returns:
             bool: True if insertion successful, False otherwise
         """
-        if not self._ensure_connection():
-            return False
-
         if not embedding or len(embedding) == 0:
             self.logger.error("Empty embedding vector provided")
             return False
 
-        try:
-            with self.connection.cursor() as cursor:
-                insert_query = sql.SQL(
-                    """
-                    INSERT INTO {table} (filename, chunk_order, content, embedding)
-                    VALUES (%s, %s, %s, %s)
-                    """
-                ).format(table=sql.Identifier(table_name))
+        insert_query = self._upsert_query(table_name, "(%s, %s, %s, %s, %s)")
 
+        def _insert(connection):
+            with connection.cursor() as cursor:
+                self._delete_keys(
+                    cursor,
+                    self._references_table(table_name),
+                    [(filename, chunk_order)],
+                )
                 cursor.execute(
                     insert_query,
-                    (filename, chunk_order, content, embedding),
+                    (filename, chunk_order, content, content_hash(content), embedding),
                 )
 
-                self.connection.commit()
-                self.logger.debug("Successfully inserted embedding for %s", filename)
-                return True
+        try:
+            self._run(_insert)
+            self.logger.debug("Successfully inserted embedding for %s", filename)
+            return True
         except psycopg2.Error as e:
             self.logger.error("Error inserting embedding for '%s': %s", filename, e)
-            self.connection.rollback()
+            return False
+
+    def insert_embeddings_bulk(
+        self,
+        rows: List[Tuple[str, int, str, List[float]]],
+        table_name: str = "default_table",
+    ) -> List[int]:
+        """
+        Upsert many embedding records in a single transaction
+
+        The rows are written with a multi-row INSERT ... ON CONFLICT
+        (execute_values) keyed by (filename, chunk_order): a stored row is only
+        rewritten when its content hash or its embedding changed, so reruns do
+        not grow the table nor churn its indexes, and the references stored
+        for the same chunks are dropped. If the batch fails, it is retried row
+        by row inside one transaction using a savepoint per row, so a bad row
+        only discards itself.
+
+        Args:
+            rows (List[Tuple[str, int, str, List[float]]]): (filename, chunk_order, content, embedding) rows
+            table_name (str, optional): Name of the table. Defaults to "default_table".
+
+        Returns:
+            List[int]: Positions in `rows` of the records that could not be inserted
+        """
+        if not rows:
+            return []
+
+        failed_rows, valid_rows = [], []
+        for idx, row in enumerate(rows):
+            if row[3]:
+                valid_rows.append((idx, row))
+            else:
+                self.logger.error("Empty embedding vector provided for '%s'", row[0])
+                failed_rows.append(idx)
+        if not valid_rows:
+            return failed_rows
+        valid_rows = [
+            (idx, (filename, chunk_order, content, content_hash(content), embedding))
+            for idx, (filename, chunk_order, content, embedding) in valid_rows
+        ]
+
+        insert_query = self._upsert_query(table_name, "%s")
+
+        def _insert(connection):
+            with connection.cursor() as cursor:
+                self._delete_keys(
+                    cursor,
+                    self._references_table(table_name),
+                    [row[:2] for _, row in valid_rows],
+                )
+                execute_values(
+                    cursor,
+                    insert_query.as_string(cursor),
+                    [row for _, row in valid_rows],
+                    page_size=len(valid_rows),
+                )
+                # Rows skipped by the ON CONFLICT condition are not counted
+                return cursor.rowcount
+
+        try:
+            written = self._run(_insert)
+            self.logger.debug(
+                "Successfully upserted %d embeddings into '%s', %d unchanged",
+                written,
+                table_name,
+                len(valid_rows) - written,
+            )
+            return failed_rows
+        except TRANSIENT_ERRORS as e:
+            self.logger.error("Error inserting embeddings into '%s': %s", table_name, e)
+            return list(range(len(rows)))
+        except psycopg2.Error as e:
+            self.logger.warning(
+                "Bulk insert failed, retrying row by row for '%s': %s", table_name, e
+            )
+
+        return sorted(failed_rows + self._insert_rows_isolated(valid_rows, table_name))
+
+    def _upsert_query(self, table_name: str, values: str) -> sql.Composed:
+        """
+        INSERT of (filename, chunk_order, content, content_hash, embedding)
+        rows that updates the stored row of the same chunk only when its
+        content hash or its embedding (e.g. after a change of model) differ
+        """
+        return sql.SQL(
+            """
+            INSERT INTO {table} AS stored
+                (filename, chunk_order, content, content_hash, embedding)
+            VALUES {values}
+            ON CONFLICT (filename, chunk_order) DO UPDATE
+            SET content = EXCLUDED.content,
+                content_hash = EXCLUDED.content_hash,
+                embedding = EXCLUDED.embedding,
+                create_at = CURRENT_TIMESTAMP
+            WHERE stored.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+               OR stored.embedding IS DISTINCT FROM EXCLUDED.embedding
+            """
+        ).format(table=sql.Identifier(table_name), values=sql.SQL(values))
+
+    def _insert_rows_isolated(
+        self,
+        indexed_rows: List[Tuple[int, Tuple[str, int, str, str, List[float]]]],
+        table_name: str,
+    ) -> List[int]:
+        """
+        Upsert the (filename, chunk_order, content, content_hash, embedding)
+        rows one by one in a single transaction, isolating each row with a
+        savepoint. Returns the positions of the rows that failed.
+        """
+        insert_query = self._upsert_query(table_name, "(%s, %s, %s, %s, %s)")
+
+        def _insert(connection) -> List[int]:
+            failed_rows = []
+            with connection.cursor() as cursor:
+                self._delete_keys(
+                    cursor,
+                    self._references_table(table_name),
+                    [row[:2] for _, row in indexed_rows],
+                )
+                for idx, row in indexed_rows:
+                    cursor.execute("SAVEPOINT bulk_row;")
+                    try:
+                        cursor.execute(insert_query, row)
+                        cursor.execute("RELEASE SAVEPOINT bulk_row;")
+                    except TRANSIENT_ERRORS:
+                        raise
+                    except psycopg2.Error as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT bulk_row;")
+                        self.logger.error(
+                            "Error inserting chunk %d of '%s': %s", row[1], row[0], e
+                        )
+                        failed_rows.append(idx)
+            return failed_rows
+
+        try:
+            return self._run(_insert)
+        except psycopg2.Error as e:
+            self.logger.error("Error inserting embeddings into '%s': %s", table_name, e)
+            return [idx for idx, _ in indexed_rows]
+
+    def _to_vector_literal(self, embedding: List[float]) -> str:
+        """Format an embedding as a pgvector text literal."""
+        return "[" + ",".join(repr(float(value)) for value in embedding) + "]"
+
+    def _build_filters(
+        self, filters: Optional[Dict[str, Any]]
+    ) -> Tuple[sql.Composable, list]:
+        """
+        Build the WHERE clause of a similarity search.
+
+        Supported filters: `filename` (a name or a list of names),
+        `filename_prefix` and `chunk_order`.
+        """
+        conditions, params = [], []
+        for key, value in (filters or {}).items():
+            if key == "filename" and isinstance(value, (list, tuple, set)):
+                conditions.append(sql.SQL("filename = ANY(%s)"))
+                params.append(list(value))
+            elif key == "filename":
+                conditions.append(sql.SQL("filename = %s"))
+                params.append(value)
+            elif key == "filename_prefix":
+                conditions.append(sql.SQL("filename LIKE %s"))
+                params.append(
+                    value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                    + "%"
+                )
+            elif key == "chunk_order":
+                conditions.append(sql.SQL("chunk_order = %s"))
+                params.append(value)
+            else:
+                raise ValueError(f"Unsupported search filter: {key}")
+
+        if not conditions:
+            return sql.SQL(""), params
+        return sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions), params
+
+    def _set_search_params(
+        self, cursor, probes: Optional[int], ef_search: Optional[int]
+    ):
+        """Set the index scan parameters for the current transaction only."""
+        if VECTOR_INDEX_TYPE == "hnsw":
+            cursor.execute(
+                sql.SQL("SET LOCAL hnsw.ef_search = {value};").format(
+                    value=sql.Literal(int(ef_search or VECTOR_SEARCH_EF_SEARCH))
+                )
+            )
+        else:
+            cursor.execute(
+                sql.SQL("SET LOCAL ivfflat.probes = {value};").format(
+                    value=sql.Literal(int(probes or VECTOR_SEARCH_PROBES))
+                )
+            )
+
+    def search_similar(
+        self,
+        query_embedding: List[float],
+        k: int = 5,
+        table_name: str = "default_table",
+        filters: Optional[Dict[str, Any]] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the k chunks closest to the query embedding (cosine distance)
+
+        Args:
+            query_embedding (List[float]): Embedding of the query
+            k (int, optional): Number of results. Defaults to 5.
+            table_name (str, optional): Name of the table. Defaults to "default_table".
+            filters (Dict[str, Any], optional): `filename`, `filename_prefix` or `chunk_order`
+            probes (int, optional): ivfflat.probes for this query. Defaults to VECTOR_SEARCH_PROBES.
+            ef_search (int, optional): hnsw.ef_search for this query. Defaults to VECTOR_SEARCH_EF_SEARCH.
+
+        Returns:
+            List[Dict[str, Any]]: filename, chunk_order, content and distance of each
+            result, closest first. Empty list on error.
+        """
+        results = self.search_similar_batch(
+            [query_embedding], k, table_name, filters, probes, ef_search
+        )
+        return results[0] if results else []
+
+    def search_similar_batch(
+        self,
+        query_embeddings: List[List[float]],
+        k: int = 5,
+        table_name: str = "default_table",
+        filters: Optional[Dict[str, Any]] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Answer several similarity queries in a single round trip
+
+        Each query runs as a LATERAL top-k subquery ordered by the cosine
+        operator, so every one of them can use the vector index.
+
+        Args:
+            query_embeddings (List[List[float]]): Embeddings of the queries
+            k (int, optional): Number of results per query. Defaults to 5.
+            table_name (str, optional): Name of the table. Defaults to "default_table".
+            filters (Dict[str, Any], optional): Filters applied to every query
+            probes (int, optional): ivfflat.probes for these queries
+            ef_search (int, optional): hnsw.ef_search for these queries
+
+        Returns:
+            List[List[Dict[str, Any]]]: One result list per query, in the same order.
+            Empty list on error.
+        """
+        if not query_embeddings:
+            return []
+
+        where_clause, filter_params = self._build_filters(filters)
+        search_query = sql.SQL(
+            """
+            SELECT q.query_idx, r.filename, r.chunk_order, r.content, r.distance
+            FROM unnest(%s::text[]) WITH ORDINALITY AS q(query_vector, query_idx)
+            CROSS JOIN LATERAL (
+                SELECT filename, chunk_order, content,
+                       embedding <=> q.query_vector::vector AS distance
+                FROM {table}
+                {where}
+                ORDER BY embedding <=> q.query_vector::vector
+                LIMIT %s
+            ) r
+            ORDER BY q.query_idx, r.distance;
+            """
+        ).format(table=sql.Identifier(table_name), where=where_clause)
+        params = (
+            [[self._to_vector_literal(query) for query in query_embeddings]]
+            + filter_params
+            + [k]
+        )
+
+        def _search(connection) -> List[List[Dict[str, Any]]]:
+            results: List[List[Dict[str, Any]]] = [[] for _ in query_embeddings]
+            with connection.cursor() as cursor:
+                self._set_search_params(cursor, probes, ef_search)
+                cursor.execute(search_query, params)
+                for query_idx, filename, chunk_order, content, distance in cursor:
+                    results[query_idx - 1].append(
+                        {
+                            "filename": filename,
+                            "chunk_order": chunk_order,
+                            "content": content,
+                            "distance": distance,
+                        }
+                    )
+            return results
+
+        try:
+            return self._run(_search)
+        except psycopg2.Error as e:
+            self.logger.error(
+                "Error searching similar chunks in '%s': %s", table_name, e
+            )
+            return []
@@ -0,0 +1,33 @@
+from conf.config import VECTOR_STORE_BACKEND
+from src.db.base_vector_store import BaseVectorStore
+from src.db.vdb_manager import VectorDatabase
+
+
+class VectorStoreFactory:
+    """Factory to create the vector store selected in the configuration"""
+
+    @staticmethod
+    def get_vector_store(logger) -> BaseVectorStore:
+        """
+        Create the vector store of the configured backend
+
+        Args:
+            logger: Logger instance
+
+        Returns:
+            BaseVectorStore: PostgreSQL/pgvector store (default) or the in-process
+            NumPy store when VECTOR_STORE_BACKEND is "numpy"
+        """
+        backend = VECTOR_STORE_BACKEND.lower()
+
+        if backend == "numpy":
+            # Imported lazily so NumPy is only required by this backend
+            from src.db.numpy_vector_store import (  # pylint: disable=import-outside-toplevel
+                NumpyVectorStore,
+            )
+
+            return NumpyVectorStore(logger)
+
+        if backend != "pgvector":
+            logger.warning("Unknown vector store backend %s, using pgvector", backend)
+        return VectorDatabase(logger)
@@ -1,5 +1,27 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict
+from typing import Iterator, List, Optional, Dict
+
+
+def split_batches(
+    contents: List[str], batch_size: int, max_bytes: int
+) -> Iterator[List[str]]:
+    """
+    Split the texts into consecutive batches limited by number of items and payload size.
+
+    A single text bigger than max_bytes is sent alone in its own batch.
+    """
+    batch, batch_bytes = [], 0
+    for content in contents:
+        content_bytes = len(content.encode("utf-8"))
+        if batch and (
+            len(batch) >= batch_size or batch_bytes + content_bytes > max_bytes
+        ):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(content)
+        batch_bytes += content_bytes
+    if batch:
+        yield batch
 
 
 class BaseEmbeddingService(ABC):
@@ -20,6 +42,30 @@ class BaseEmbeddingService(ABC):
             Optional[List[float]]: Embedding vector or None if there is an error
         """
 
+    def generate_embeddings(self, contents: List[str]) -> List[Optional[List[float]]]:
+        """
+        Generate the embeddings for a list of texts
+
+        The default implementation calls generate_embedding once per text,
+        providers with a multi-input endpoint should override it.
+
+        Args:
+            contents (List[str]): Texts to generate the embeddings
+
+        Returns:
+            List[Optional[List[float]]]: One embedding vector (or None) per text, in order
+        """
+        return [self.generate_embedding(content) for content in contents]
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns the counters collected by the service (cache hits, retries, etc.)
+
+        Returns:
+            Dict[str, int]: Counters by name, empty if the service does not collect any
+        """
+        return {}
+
     @abstractmethod
     def get_model_info(self) -> Dict[str, str]:
         """
@@ -28,3 +74,45 @@ class BaseEmbeddingService(ABC):
         Returns:
             Dict[str, str]: Información del modelo (nombre, proveedor, etc.)
         """
+
+
+class BaseAsyncEmbeddingService(ABC):
+    """Abstract base class for embedding services driven from an asyncio event loop"""
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    @abstractmethod
+    async def agenerate_embeddings(
+        self, contents: List[str]
+    ) -> List[Optional[List[float]]]:
+        """
+        Generate the embeddings for a list of texts
+
+        Args:
+            contents (List[str]): Texts to generate the embeddings
+
+        Returns:
+            List[Optional[List[float]]]: One embedding vector (or None) per text, in order
+        """
+
+    async def aclose(self):
+        """Release the resources (connections) held by the service"""
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns the counters collected by the service
+
+        Returns:
+            Dict[str, int]: Counters by name, empty if the service does not collect any
+        """
+        return {}
+
+    @abstractmethod
+    def get_model_info(self) -> Dict[str, str]:
+        """
+        Returns information about the model
+
+        Returns:
+            Dict[str, str]: Model information (name, provider, etc.)
+        """
@@ -0,0 +1,144 @@
+import asyncio
+from typing import List, Optional, Dict, Tuple
+from src.embeddings.base_embedding import (
+    BaseAsyncEmbeddingService,
+    BaseEmbeddingService,
+)
+from src.embeddings.embedding_cache import EmbeddingCache
+from conf.config import DIMENSION_EMBEDDING_DIMENSION
+
+
+class _CacheLookup:
+    """Cache lookup shared by the sync and async cached services"""
+
+    def __init__(self, cache: EmbeddingCache, model: str):
+        self.cache = cache
+        self.model = model
+
+    def _key(self, content: str) -> str:
+        return EmbeddingCache.build_key(
+            self.model, DIMENSION_EMBEDDING_DIMENSION, content
+        )
+
+    def lookup(
+        self, contents: List[str]
+    ) -> Tuple[List[str], Dict[str, List[float]], Dict[str, str]]:
+        """
+        Returns:
+            Tuple: keys of the contents, cached vectors by key and missing contents by key
+        """
+        keys = [self._key(content) for content in contents]
+        cached = self.cache.get_many(keys)
+
+        missing: Dict[str, str] = {}
+        for key, content in zip(keys, contents):
+            if key not in cached and key not in missing:
+                missing[key] = content
+        return keys, cached, missing
+
+    def store(
+        self,
+        keys: List[str],
+        cached: Dict[str, List[float]],
+        missing: Dict[str, str],
+        vectors: List[Optional[List[float]]],
+    ) -> List[Optional[List[float]]]:
+        """Save the generated vectors and return the result in the order of the keys."""
+        generated = {
+            key: vector for key, vector in zip(missing.keys(), vectors) if vector
+        }
+        self.cache.put_many(generated)
+        cached.update(generated)
+        return [cached.get(key) for key in keys]
+
+
+class CachedEmbeddingService(BaseEmbeddingService):
+    """
+    Embedding service that answers from an EmbeddingCache and only delegates
+    the missing texts to the wrapped provider.
+    """
+
+    def __init__(
+        self,
+        logger,
+        service: BaseEmbeddingService,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        super().__init__(logger)
+        self.logger = logger
+        self.service = service
+        self.cache = cache or EmbeddingCache(logger)
+        self._lookup = _CacheLookup(self.cache, service.get_model_info().get("model"))
+
+    def generate_embedding(self, content: str) -> Optional[List[float]]:
+        """
+        Generate the embedding vector, using the cached one when available.
+        """
+        return self.generate_embeddings([content])[0]
+
+    def generate_embeddings(self, contents: List[str]) -> List[Optional[List[float]]]:
+        """
+        Generate the embedding vectors of several texts, only the texts missing
+        in the cache are sent to the wrapped service.
+        """
+        keys, cached, missing = self._lookup.lookup(contents)
+        vectors = (
+            self.service.generate_embeddings(list(missing.values())) if missing else []
+        )
+        return self._lookup.store(keys, cached, missing, vectors)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the cache counters merged with the ones of the wrapped service"""
+        return {**self.service.get_stats(), **self.cache.get_stats()}
+
+    def get_model_info(self) -> Dict[str, str]:
+        """Returns information about the wrapped model"""
+        return self.service.get_model_info()
+
+
+class CachedAsyncEmbeddingService(BaseAsyncEmbeddingService):
+    """
+    Asynchronous counterpart of CachedEmbeddingService. The SQLite lookups
+    and writes run in a worker thread, not on the event loop.
+    """
+
+    def __init__(
+        self,
+        logger,
+        service: BaseAsyncEmbeddingService,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        super().__init__(logger)
+        self.logger = logger
+        self.service = service
+        self.cache = cache or EmbeddingCache(logger)
+        self._lookup = _CacheLookup(self.cache, service.get_model_info().get("model"))
+
+    async def agenerate_embeddings(
+        self, contents: List[str]
+    ) -> List[Optional[List[float]]]:
+        """
+        Generate the embedding vectors of several texts, only the texts missing
+        in the cache are sent to the wrapped service.
+        """
+        keys, cached, missing = await asyncio.to_thread(self._lookup.lookup, contents)
+        vectors = (
+            await self.service.agenerate_embeddings(list(missing.values()))
+            if missing
+            else []
+        )
+        return await asyncio.to_thread(
+            self._lookup.store, keys, cached, missing, vectors
+        )
+
+    async def aclose(self):
+        """Close the wrapped service."""
+        await self.service.aclose()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the cache counters merged with the ones of the wrapped service"""
+        return {**self.service.get_stats(), **self.cache.get_stats()}
+
+    def get_model_info(self) -> Dict[str, str]:
+        """Returns information about the wrapped model"""
+        return self.service.get_model_info()
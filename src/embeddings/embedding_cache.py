@@ -0,0 +1,169 @@
+"""Persistent content-addressed cache of embedding vectors"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List
+from conf.config import CACHE_DIR, EMBEDDING_CACHE_MAX_ENTRIES
+
+
+class EmbeddingCache:
+    """
+    SQLite backed embedding cache keyed by hash(model, dimension, text).
+
+    Entries are evicted in least recently used order once the cache holds
+    more than `max_entries` vectors. The instance can be shared by threads,
+    and the file by processes: the entries are counted again in the write
+    transaction of every insert, so the eviction sees the inserts of all.
+    """
+
+    _LOOKUP_CHUNK = 500
+
+    def __init__(
+        self,
+        logger,
+        cache_path: Path = None,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+    ):
+        self.logger = logger
+        self.cache_path = Path(cache_path or CACHE_DIR / "embeddings.sqlite3")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(
+            str(self.cache_path), check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL;")
+        self._connection.execute("PRAGMA synchronous=NORMAL;")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used INTEGER NOT NULL
+            );
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used);"
+        )
+        self._connection.commit()
+        self._size = self._connection.execute(
+            "SELECT COUNT(*) FROM embeddings;"
+        ).fetchone()[0]
+
+    @staticmethod
+    def build_key(model: str, dimension: str, content: str) -> str:
+        """Build the content-addressed key of a text for a given model."""
+        digest = hashlib.sha256()
+        for part in (model, str(dimension), content):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up several keys and refresh their position in the LRU order.
+
+        Returns:
+            Dict[str, List[float]]: Vectors found, indexed by key
+        """
+        found: Dict[str, List[float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            try:
+                for start in range(0, len(unique_keys), self._LOOKUP_CHUNK):
+                    batch = unique_keys[start : start + self._LOOKUP_CHUNK]
+                    placeholders = ",".join("?" * len(batch))
+                    cursor = self._connection.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders});",
+                        batch,
+                    )
+                    for key, blob in cursor:
+                        found[key] = array("f", blob).tolist()
+
+                if found:
+                    now = time.time_ns()
+                    self._connection.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?;",
+                        [(now, key) for key in found],
+                    )
+                    self._connection.commit()
+            except sqlite3.Error as e:
+                self.logger.error("Error reading the embedding cache: %s", e)
+                return {}
+
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """Store several vectors and evict the least recently used ones if needed."""
+        if not items:
+            return
+
+        with self._lock:
+            try:
+                now = time.time_ns()
+                # Take the write lock now, so no other process inserts before the count
+                self._connection.execute("BEGIN IMMEDIATE;")
+                self._connection.executemany(
+                    """
+                    INSERT OR IGNORE INTO embeddings (key, vector, last_used)
+                    VALUES (?, ?, ?);
+                    """,
+                    [
+                        (key, array("f", vector).tobytes(), now)
+                        for key, vector in items.items()
+                    ],
+                )
+                self._evict()
+                self._connection.commit()
+            except sqlite3.Error as e:
+                self.logger.error("Error writing the embedding cache: %s", e)
+                self._connection.rollback()
+
+    def _evict(self):
+        """
+        Remove the least recently used entries above max_entries (lock held,
+        inside the write transaction).
+        """
+        self._size = self._connection.execute(
+            "SELECT COUNT(*) FROM embeddings;"
+        ).fetchone()[0]
+        overflow = self._size - self.max_entries
+        if overflow <= 0:
+            return
+
+        self._connection.execute(
+            """
+            DELETE FROM embeddings WHERE key IN (
+                SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?
+            );
+            """,
+            (overflow,),
+        )
+        self._size -= overflow
+        self.evictions += overflow
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the hit/miss counters of the cache."""
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_evictions": self.evictions,
+            "cache_entries": self._size,
+        }
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._connection.close()
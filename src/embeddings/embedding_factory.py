@@ -1,7 +1,26 @@
+import sqlite3
 from typing import Optional
-from conf.config import EMBEDDING_PROVIDER
-from src.embeddings.base_embedding import BaseEmbeddingService
+from conf.config import (
+    EMBEDDING_PROVIDER,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_RESILIENCE_ENABLED,
+)
+from src.embeddings.base_embedding import (
+    BaseAsyncEmbeddingService,
+    BaseEmbeddingService,
+)
+from src.embeddings.cached_embedding import (
+    CachedAsyncEmbeddingService,
+    CachedEmbeddingService,
+)
+from src.embeddings.resilient_embedding import (
+    AsyncResilientEmbeddingService,
+    ResilientEmbeddingService,
+)
 from src.embeddings.providers.ollama_embedding import OllamaEmbeddingService
+from src.embeddings.providers.ollama_async_embedding import (
+    AsyncOllamaEmbeddingService,
+)
 from src.embeddings.providers.openai_embedding import OpenAIEmbeddingService
 
 
@@ -30,11 +49,48 @@ class EmbeddingFactory:
             else:
                 logger.error("Provider not implemented: %s", provider)
                 return None
+
+            # Cache hits never reach the provider, nor its retries and limits
+            if EMBEDDING_RESILIENCE_ENABLED:
+                service = ResilientEmbeddingService(logger, service)
+            if EMBEDDING_CACHE_ENABLED:
+                service = CachedEmbeddingService(logger, service)
             return service
 
         except ImportError as e:
             logger.error("Error importing supplier %s: %s", provider, e)
             return None
-        except IOError as e:
+        except (IOError, sqlite3.Error) as e:
+            logger.error("Unexpected error creating embeddings service: %s", e)
+            return None
+
+    @staticmethod
+    def get_async_embedding_service(logger) -> Optional[BaseAsyncEmbeddingService]:
+        """
+        Crea y retorna una instancia asíncrona del servicio de embeddings
+
+        Args:
+            logger: Logger para registrar información
+
+        Returns:
+            Optional[BaseAsyncEmbeddingService]: Instancia del servicio o None si el
+            proveedor no tiene variante asíncrona
+        """
+        provider = EMBEDDING_PROVIDER.lower()
+
+        try:
+            if provider == "ollama":
+                service = AsyncOllamaEmbeddingService(logger)
+            else:
+                logger.warning("Provider without async support: %s", provider)
+                return None
+
+            if EMBEDDING_RESILIENCE_ENABLED:
+                service = AsyncResilientEmbeddingService(logger, service)
+            if EMBEDDING_CACHE_ENABLED:
+                service = CachedAsyncEmbeddingService(logger, service)
+            return service
+
+        except (IOError, sqlite3.Error) as e:
             logger.error("Unexpected error creating embeddings service: %s", e)
             return None
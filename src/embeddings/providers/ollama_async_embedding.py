@@ -0,0 +1,99 @@
+import asyncio
+from typing import List, Optional, Dict
+import httpx
+from src.embeddings.base_embedding import BaseAsyncEmbeddingService, split_batches
+from src.utils.resource_limits import aembedding_slot
+from conf.config import (
+    OLLAMA_HOST,
+    OLLAMA_EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_MAX_BYTES,
+    EMBEDDING_ASYNC_CONCURRENCY,
+    EMBEDDING_REQUEST_TIMEOUT,
+)
+
+
+class AsyncOllamaEmbeddingService(BaseAsyncEmbeddingService):
+    """
+    Asynchronous implementation of the EmbeddingService for Ollama models.
+
+    All requests share one keep-alive httpx connection pool and at most
+    `max_concurrency` batches are in flight at the same time.
+    """
+
+    def __init__(
+        self,
+        logger,
+        max_concurrency: int = EMBEDDING_ASYNC_CONCURRENCY,
+        timeout: float = EMBEDDING_REQUEST_TIMEOUT,
+    ):
+        super().__init__(logger)
+        self.logger = logger
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the pooled client lazily, inside the running event loop."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=OLLAMA_HOST,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def _embed_batch(self, batch: List[str]) -> List[Optional[List[float]]]:
+        """Send one batch to the embed endpoint."""
+        client = self._get_client()
+        async with self._semaphore, aembedding_slot():
+            try:
+                response = await client.post(
+                    "/api/embed",
+                    json={"model": OLLAMA_EMBEDDING_MODEL, "input": batch},
+                )
+                response.raise_for_status()
+                vectors = response.json().get("embeddings") or []
+            except (httpx.HTTPError, ValueError) as e:
+                self.logger.error("No se pudieron generar los embeddings: %s", e)
+                return [None] * len(batch)
+
+        if len(vectors) != len(batch):
+            self.logger.error(
+                "Ollama returned %d embeddings for a batch of %d texts",
+                len(vectors),
+                len(batch),
+            )
+            return [None] * len(batch)
+        return vectors
+
+    async def agenerate_embeddings(
+        self, contents: List[str]
+    ) -> List[Optional[List[float]]]:
+        """
+        Generate the embedding vectors of several texts, sending their batches
+        concurrently over the shared connection pool.
+        """
+        batches = list(
+            split_batches(contents, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_MAX_BYTES)
+        )
+        results = await asyncio.gather(*(self._embed_batch(b) for b in batches))
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    async def aclose(self):
+        """Close the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_model_info(self) -> Dict[str, str]:
+        """Returns information about the Ollama model"""
+        return {
+            "provider": "ollama",
+            "model": OLLAMA_EMBEDDING_MODEL,
+        }
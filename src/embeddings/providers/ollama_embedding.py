@@ -1,7 +1,13 @@
 from typing import List, Optional, Dict
-from ollama import embeddings, EmbeddingsResponse
-from src.embeddings.base_embedding import BaseEmbeddingService
-from conf.config import OLLAMA_EMBEDDING_MODEL
+from ollama import Client, EmbeddingsResponse, EmbedResponse, ResponseError
+from src.embeddings.base_embedding import BaseEmbeddingService, split_batches
+from src.utils.resource_limits import embedding_slot
+from conf.config import (
+    OLLAMA_HOST,
+    OLLAMA_EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_MAX_BYTES,
+)
 
 
 class OllamaEmbeddingService(BaseEmbeddingService):
@@ -12,22 +18,52 @@ class OllamaEmbeddingService(BaseEmbeddingService):
     def __init__(self, logger):
         super().__init__(logger)
         self.logger = logger
+        self.client = Client(host=OLLAMA_HOST)
 
     def generate_embedding(self, content: str) -> Optional[List[float]]:
         """
         Generate the embedding vector using the Ollama model.
         """
         try:
-            response: EmbeddingsResponse = embeddings(
-                model=OLLAMA_EMBEDDING_MODEL, prompt=content
-            )
+            with embedding_slot():
+                response: EmbeddingsResponse = self.client.embeddings(
+                    model=OLLAMA_EMBEDDING_MODEL, prompt=content
+                )
 
             embeddings_vector = response.model_dump().get("embedding")
             return embeddings_vector
-        except IOError as e:
+        except (IOError, ResponseError) as e:
             self.logger.error("No se pudieron generar los embeddings: %s", e)
             return None
 
+    def generate_embeddings(self, contents: List[str]) -> List[Optional[List[float]]]:
+        """
+        Generate the embedding vectors of several texts using the multi-input
+        embed endpoint of Ollama, one request per batch.
+        """
+        results: List[Optional[List[float]]] = []
+        for batch in split_batches(
+            contents, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_MAX_BYTES
+        ):
+            try:
+                with embedding_slot():
+                    response: EmbedResponse = self.client.embed(
+                        model=OLLAMA_EMBEDDING_MODEL, input=batch
+                    )
+                vectors = [list(vector) for vector in response.embeddings]
+                if len(vectors) != len(batch):
+                    self.logger.error(
+                        "Ollama returned %d embeddings for a batch of %d texts",
+                        len(vectors),
+                        len(batch),
+                    )
+                    vectors = [None] * len(batch)
+            except (IOError, ResponseError) as e:
+                self.logger.error("No se pudieron generar los embeddings: %s", e)
+                vectors = [None] * len(batch)
+            results.extend(vectors)
+        return results
+
     def get_model_info(self) -> Dict[str, str]:
         """Returns information about the Ollama model"""
         return {
@@ -0,0 +1,445 @@
+"""Retries, adaptive concurrency and circuit breaking around the embedding providers"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+from src.embeddings.base_embedding import (
+    BaseAsyncEmbeddingService,
+    BaseEmbeddingService,
+)
+from src.utils.metrics import metrics
+from conf.config import (
+    EMBEDDING_RETRY_ATTEMPTS,
+    EMBEDDING_RETRY_BACKOFF_SECONDS,
+    EMBEDDING_RETRY_MAX_BACKOFF_SECONDS,
+    EMBEDDING_CONCURRENCY_MIN,
+    EMBEDDING_CONCURRENCY_MAX,
+    EMBEDDING_LATENCY_TOLERANCE,
+    EMBEDDING_BREAKER_THRESHOLD,
+    EMBEDDING_BREAKER_RESET_SECONDS,
+    EMBEDDING_BREAKER_MAX_PAUSE_SECONDS,
+)
+
+# Errors raised by the providers after which the call is retried
+TRANSIENT_ERRORS = (OSError, httpx.HTTPError)
+
+
+class CircuitOpenError(Exception):
+    """The provider stayed unavailable for longer than the maximum pause"""
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    AIMD limit of the embedding calls in flight.
+
+    A successful call whose latency per text stays within `tolerance` times
+    the best one seen raises the limit by 1/limit, about one slot per round
+    of calls. A failed or slow call multiplies it by `decrease`. The limit
+    stays between `minimum` and `maximum` and starts at `maximum`.
+    """
+
+    def __init__(
+        self,
+        minimum: int = EMBEDDING_CONCURRENCY_MIN,
+        maximum: int = EMBEDDING_CONCURRENCY_MAX,
+        tolerance: float = EMBEDDING_LATENCY_TOLERANCE,
+        decrease: float = 0.5,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.tolerance = tolerance
+        self.decrease = decrease
+        self._limit = float(self.maximum)
+        self._baseline: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        """Calls allowed in flight right now"""
+        return int(self._limit)
+
+    def record(self, latency: float, texts: int, success: bool):
+        """Adjust the limit with the outcome of a call."""
+        per_text = latency / max(1, texts)
+        with self._lock:
+            if success and (self._baseline is None or per_text < self._baseline):
+                self._baseline = per_text
+            slow = (
+                self._baseline is not None
+                and per_text > self._baseline * self.tolerance
+            )
+            if success and not slow:
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+            else:
+                self._limit = max(self.minimum, self._limit * self.decrease)
+
+
+class CircuitBreaker:
+    """
+    Stops the calls to a provider that keeps failing, without dropping them.
+
+    After `threshold` consecutive failed calls the circuit opens for
+    `reset_timeout` seconds and callers wait instead of calling. Then one
+    probe call goes through (half-open): a success closes the circuit, a
+    failure opens it again for twice as long, up to `max_pause` seconds.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        logger,
+        threshold: int = EMBEDDING_BREAKER_THRESHOLD,
+        reset_timeout: float = EMBEDDING_BREAKER_RESET_SECONDS,
+        max_pause: float = EMBEDDING_BREAKER_MAX_PAUSE_SECONDS,
+    ):
+        self.logger = logger
+        self.threshold = max(1, threshold)
+        self.reset_timeout = reset_timeout
+        self.max_pause = max_pause
+        self.state = self.CLOSED
+        self.opened = 0
+        self._failures = 0
+        self._timeout = reset_timeout
+        self._reopen_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def wait_time(self) -> float:
+        """
+        Seconds the caller has to wait before trying again, 0 when it may
+        call now. The first caller after the pause becomes the probe.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            remaining = self._reopen_at - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if self._probing:
+                # Wait for the outcome of the probe
+                return min(1.0, self._timeout)
+            self.state, self._probing = self.HALF_OPEN, True
+            return 0.0
+
+    def record_success(self):
+        """A call reached the provider."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                self.logger.info("Embedding provider is back, closing the circuit")
+            self.state, self._probing = self.CLOSED, False
+            self._failures = 0
+            self._timeout = self.reset_timeout
+
+    def record_failure(self):
+        """A call failed, open the circuit after too many in a row."""
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN:
+                self._timeout = min(self._timeout * 2, self.max_pause)
+            elif self.state == self.OPEN or self._failures < self.threshold:
+                return
+            self.state, self._probing = self.OPEN, False
+            self._reopen_at = time.monotonic() + self._timeout
+            self.opened += 1
+            timeout = self._timeout
+        metrics.inc("embedding_circuit_opened_total")
+        self.logger.warning(
+            "Embedding provider keeps failing, pausing the calls for %.1fs", timeout
+        )
+
+
+class _Resilience:
+    """Retry policy, limit and breaker shared by the sync and async services"""
+
+    def __init__(
+        self, logger, breaker_pause: float = EMBEDDING_BREAKER_MAX_PAUSE_SECONDS
+    ):
+        self.logger = logger
+        self.limit = AdaptiveConcurrencyLimit()
+        self.breaker = CircuitBreaker(logger)
+        self.breaker_pause = breaker_pause
+        self._stats = {"retries": 0, "unembedded": 0}
+        self._lock = threading.Lock()
+
+    def retry_kwargs(self) -> dict:
+        """
+        Retry while texts are missing or the provider raised a transient error,
+        with exponential backoff and jitter. Once the attempts are exhausted
+        the texts are left without embedding.
+        """
+        return {
+            "retry": retry_if_result(bool) | retry_if_exception_type(TRANSIENT_ERRORS),
+            "stop": stop_after_attempt(max(1, EMBEDDING_RETRY_ATTEMPTS)),
+            "wait": wait_exponential_jitter(
+                initial=EMBEDDING_RETRY_BACKOFF_SECONDS,
+                max=EMBEDDING_RETRY_MAX_BACKOFF_SECONDS,
+            ),
+            "before_sleep": self._before_retry,
+            "retry_error_callback": lambda state: None,
+        }
+
+    def _before_retry(self, state):
+        self._count("retries")
+        metrics.inc("embedding_retries_total")
+        if state.outcome.failed:
+            reason = state.outcome.exception()
+        else:
+            reason = f"{len(state.outcome.result())} texts without embedding"
+        self.logger.warning(
+            "Embedding call failed, retrying (attempt %d): %s",
+            state.attempt_number,
+            reason,
+        )
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    def record(
+        self,
+        started: float,
+        results: List[Optional[List[float]]],
+        pending: List[int],
+        error: Optional[BaseException] = None,
+    ) -> List[int]:
+        """
+        Feed the outcome of a call to the limit and the breaker.
+
+        Returns:
+            List[int]: Positions still without embedding
+        """
+        missing = [idx for idx in pending if results[idx] is None]
+        self.limit.record(
+            time.perf_counter() - started, len(pending), error is None and not missing
+        )
+        if error is None and len(missing) < len(pending):
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        return missing
+
+    def finish(
+        self,
+        results: List[Optional[List[float]]],
+        error: Optional[CircuitOpenError] = None,
+    ) -> List[Optional[List[float]]]:
+        """Count and report the texts left without embedding."""
+        missing = sum(1 for vector in results if vector is None)
+        if missing:
+            self._count("unembedded", missing)
+            self.logger.error(
+                "%d texts left without embedding: %s",
+                missing,
+                error or "retries exhausted",
+            )
+        return results
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self._stats,
+                "circuit_opened": self.breaker.opened,
+                "concurrency_limit": self.limit.limit,
+            }
+
+
+class ResilientEmbeddingService(BaseEmbeddingService):
+    """
+    Embedding service that retries the failed texts of the wrapped provider
+    with exponential backoff and jitter, caps the calls in flight from the
+    threads of the run with an AdaptiveConcurrencyLimit, and pauses them
+    with a CircuitBreaker while the provider is down. Texts still without
+    embedding are returned as None, for the caller to queue them.
+    """
+
+    def __init__(self, logger, service: BaseEmbeddingService):
+        super().__init__(logger)
+        self.logger = logger
+        self.service = service
+        self._resilience = _Resilience(logger)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def _slot(self) -> Iterator[None]:
+        with self._condition:
+            while self._in_flight >= self._resilience.limit.limit:
+                self._condition.wait()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def _wait_breaker(self):
+        paused = 0.0
+        while True:
+            delay = self._resilience.breaker.wait_time()
+            if not delay:
+                return
+            if paused >= self._resilience.breaker_pause:
+                raise CircuitOpenError(f"circuit open for {paused:.0f}s")
+            time.sleep(delay)
+            paused += delay
+
+    def _attempt(
+        self, contents: List[str], results: List[Optional[List[float]]]
+    ) -> List[int]:
+        """Call the provider with the texts still missing, returns the ones that failed."""
+        pending = [idx for idx, vector in enumerate(results) if vector is None]
+        self._wait_breaker()
+        with self._slot():
+            started = time.perf_counter()
+            try:
+                vectors = self.service.generate_embeddings(
+                    [contents[idx] for idx in pending]
+                )
+            except TRANSIENT_ERRORS as e:
+                self._resilience.record(started, results, pending, e)
+                raise
+        for idx, vector in zip(pending, vectors):
+            results[idx] = vector or None
+        return self._resilience.record(started, results, pending)
+
+    def generate_embedding(self, content: str) -> Optional[List[float]]:
+        """Generate the embedding vector, retrying on failure."""
+        return self.generate_embeddings([content])[0]
+
+    def generate_embeddings(self, contents: List[str]) -> List[Optional[List[float]]]:
+        """
+        Generate the embedding vectors of several texts, only the texts that
+        failed are sent again on each retry.
+        """
+        results: List[Optional[List[float]]] = [None] * len(contents)
+        if not contents:
+            return results
+        try:
+            Retrying(**self._resilience.retry_kwargs())(
+                self._attempt, contents, results
+            )
+        except CircuitOpenError as e:
+            return self._resilience.finish(results, e)
+        return self._resilience.finish(results)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the resilience counters merged with the ones of the wrapped service"""
+        return {**self.service.get_stats(), **self._resilience.get_stats()}
+
+    def get_model_info(self) -> Dict[str, str]:
+        """Returns information about the wrapped model"""
+        return self.service.get_model_info()
+
+
+class AsyncResilientEmbeddingService(BaseAsyncEmbeddingService):
+    """Asynchronous counterpart of ResilientEmbeddingService"""
+
+    def __init__(self, logger, service: BaseAsyncEmbeddingService):
+        super().__init__(logger)
+        self.logger = logger
+        self.service = service
+        self._resilience = _Resilience(logger)
+        self._in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        """
+        Condition of the running event loop. It is created again, with no call
+        in flight, when the service is used from a new loop (one asyncio.run
+        per repository).
+        """
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            self._in_flight = 0
+        return self._condition
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(
+                lambda: self._in_flight < self._resilience.limit.limit
+            )
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            async with condition:
+                self._in_flight -= 1
+                condition.notify_all()
+
+    async def _wait_breaker(self):
+        paused = 0.0
+        while True:
+            delay = self._resilience.breaker.wait_time()
+            if not delay:
+                return
+            if paused >= self._resilience.breaker_pause:
+                raise CircuitOpenError(f"circuit open for {paused:.0f}s")
+            await asyncio.sleep(delay)
+            paused += delay
+
+    async def _attempt(
+        self, contents: List[str], results: List[Optional[List[float]]]
+    ) -> List[int]:
+        """Call the provider with the texts still missing, returns the ones that failed."""
+        pending = [idx for idx, vector in enumerate(results) if vector is None]
+        await self._wait_breaker()
+        async with self._slot():
+            started = time.perf_counter()
+            try:
+                vectors = await self.service.agenerate_embeddings(
+                    [contents[idx] for idx in pending]
+                )
+            except TRANSIENT_ERRORS as e:
+                self._resilience.record(started, results, pending, e)
+                raise
+        for idx, vector in zip(pending, vectors):
+            results[idx] = vector or None
+        return self._resilience.record(started, results, pending)
+
+    async def agenerate_embeddings(
+        self, contents: List[str]
+    ) -> List[Optional[List[float]]]:
+        """
+        Generate the embedding vectors of several texts, only the texts that
+        failed are sent again on each retry.
+        """
+        results: List[Optional[List[float]]] = [None] * len(contents)
+        if not contents:
+            return results
+        try:
+            await AsyncRetrying(**self._resilience.retry_kwargs())(
+                self._attempt, contents, results
+            )
+        except CircuitOpenError as e:
+            return self._resilience.finish(results, e)
+        return self._resilience.finish(results)
+
+    async def aclose(self):
+        """Close the wrapped service."""
+        await self.service.aclose()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the resilience counters merged with the ones of the wrapped service"""
+        return {**self.service.get_stats(), **self._resilience.get_stats()}
+
+    def get_model_info(self) -> Dict[str, str]:
+        """Returns information about the wrapped model"""
+        return self.service.get_model_info()
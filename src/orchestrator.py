@@ -3,6 +3,13 @@ from requests.exceptions import RequestException
 from src.core.repo_manager import RepoManager
 from src.core.repo_analyzer import RepoAnalyzer
 from src.core.repo_code_splitter import RepoCodeSplitter
+from src.core.git_tree_reader import GitTreeReader
+from src.utils.metrics import metrics, export_metrics
+from conf.config import (
+    STRUCTURE_STREAMING_ENABLED,
+    STRUCTURE_EXPORT_ENABLED,
+    GIT_OBJECT_DB_MODE,
+)
 
 
 class Orchestrator:
@@ -18,48 +25,130 @@ class Orchestrator:
         self.repo_analyzer = RepoAnalyzer(logger)
         self.repo_code_splitter = RepoCodeSplitter(logger)
 
-    def proccessing_repo(self, url_repo: str, token: str = None, username: str = None):
+    def proccessing_repo(
+        self, url_repo: str, token: str = None, username: str = None
+    ) -> bool:
         """
         Coordinates the full pipeline:
         - Clones the repository
         - Analyzes its structure
         - Processes the code for embedding
 
+        With STRUCTURE_STREAMING_ENABLED the files are processed while the
+        structure is being analyzed, instead of after its JSON export. With
+        GIT_OBJECT_DB_MODE the repository is a bare clone and the files are
+        streamed from the tree of its HEAD commit.
+
+        When the table already holds an indexed commit, only the files changed
+        between that commit and HEAD are re-processed. A run of HEAD that was
+        interrupted is resumed from its checkpoint journal.
+
+        The counters and latency histograms of the run are published through
+        the METRICS_SINKS at the end, also when it fails.
+
         Args:
             url_repo (str): URL of the GitHub repository.
             token (str, optional): GitHub token if authentication is needed.
             username (str, optional): GitHub username if authentication is needed.
+
+        Returns:
+            bool: True if the repository is fully indexed, False otherwise
         """
+        repo_name = None
+        metrics.reset()
         try:
             self.logger.info("Starting process. It may take a while...")
 
-            cloned_repo_path, repo_name = self.repo_manager.get_repo(
-                url_repo, token, username
-            )
+            with metrics.timer(stage="clone"):
+                cloned_repo_path, repo_name = self.repo_manager.get_repo(
+                    url_repo, token, username
+                )
             self.logger.info(
                 "Repository name: %s, Origin: %s", repo_name, cloned_repo_path
             )
 
             start_time = time.time()
 
-            output_json_path = self.repo_analyzer.analyze_and_export(
-                cloned_repo_path, repo_name
+            head_commit = self.repo_manager.get_head_commit(cloned_repo_path)
+            indexed_commit = (
+                self.repo_code_splitter.get_indexed_commit(repo_name)
+                if head_commit
+                else None
             )
-            self.logger.info("Structure exported to: %s", output_json_path)
+            changes = None
+            if head_commit and indexed_commit:
+                if head_commit == indexed_commit:
+                    self.logger.info(
+                        "Repository '%s' is already indexed at %s",
+                        repo_name,
+                        head_commit,
+                    )
+                    return True
+                with metrics.timer(stage="diff"):
+                    changes = self.repo_manager.get_changed_files(
+                        cloned_repo_path, indexed_commit, head_commit
+                    )
 
-            self.repo_code_splitter.process_files(
-                repo_name, cloned_repo_path, output_json_path
-            )
+            if GIT_OBJECT_DB_MODE:
+                tree_reader = GitTreeReader(self.logger, cloned_repo_path)
+                try:
+                    entries = self.repo_analyzer.iter_entries(
+                        cloned_repo_path,
+                        repo_name,
+                        export_json=STRUCTURE_EXPORT_ENABLED,
+                        tree_reader=tree_reader,
+                    )
+                    completed = self.repo_code_splitter.process_entries(
+                        repo_name,
+                        cloned_repo_path,
+                        entries,
+                        changes=changes,
+                        tree_reader=tree_reader,
+                        commit=head_commit,
+                    )
+                finally:
+                    tree_reader.close()
+                self.repo_analyzer.wait_for_export()
+            elif STRUCTURE_STREAMING_ENABLED:
+                entries = self.repo_analyzer.iter_entries(
+                    cloned_repo_path, repo_name, export_json=STRUCTURE_EXPORT_ENABLED
+                )
+                completed = self.repo_code_splitter.process_entries(
+                    repo_name,
+                    cloned_repo_path,
+                    entries,
+                    changes=changes,
+                    commit=head_commit,
+                )
+                self.repo_analyzer.wait_for_export()
+            else:
+                output_json_path = self.repo_analyzer.analyze_and_export(
+                    cloned_repo_path, repo_name
+                )
+                self.logger.info("Structure exported to: %s", output_json_path)
+
+                completed = self.repo_code_splitter.process_files(
+                    repo_name,
+                    cloned_repo_path,
+                    output_json_path,
+                    changes=changes,
+                    commit=head_commit,
+                )
+            if completed and head_commit:
+                self.repo_code_splitter.set_indexed_commit(repo_name, head_commit)
 
             end_time = time.time()
             elapsed_time = end_time - start_time
+            metrics.observe("stage_seconds", elapsed_time, stage="index")
             self.logger.info(
                 "The processing of embeddings has concluded. Elapsed time: %.2f seconds",
                 elapsed_time,
             )
+            return completed
 
         except ValueError as ve:
             self.logger.error("Invalid URL or malformed parameter: %s", ve)
+            return False
 
         except RequestException as re:
             self.logger.error("Network issue while accessing repository: %s", re)
@@ -68,3 +157,7 @@ class Orchestrator:
         except Exception:
             self.logger.exception("Unexpected error during processing")
             raise
+
+        finally:
+            if repo_name:
+                export_metrics(self.logger, repo_name)
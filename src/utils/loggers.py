@@ -1,5 +1,53 @@
+import atexit
 import logging
-from conf.config import LOG_DIR
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
+from typing import List
+from conf.config import LOG_DIR, LOG_QUEUE_ENABLED
+
+_listeners: List[logging.handlers.QueueListener] = []
+
+
+class _ThreadQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues the records as they are. The stock QueueHandler formats them in
+    the calling thread so they can be pickled, which is not needed for a
+    queue read by a thread of the same process.
+    """
+
+    def __init__(self, log_queue, listener):
+        super().__init__(log_queue)
+        self.listener = listener
+
+    def prepare(self, record):
+        return record
+
+
+def _stop_listeners():
+    """Write the queued records and stop the listener threads."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def _restart_listeners():
+    """
+    A forked child inherits the listeners but not their threads. Worker
+    processes of multiprocessing end without running atexit, so the queued
+    records are flushed by one of its finalizers.
+    """
+    if not _listeners:
+        return
+    for listener in _listeners:
+        listener._thread = None  # pylint: disable=protected-access
+        listener.start()
+    multiprocessing.util.Finalize(None, _stop_listeners, exitpriority=0)
+
+
+atexit.register(_stop_listeners)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listeners)
 
 
 class FileLoggerConfigurator:
@@ -20,8 +68,16 @@ class FileLoggerConfigurator:
             with open(log_file_path, "w", encoding="utf-8"):
                 pass
 
-    def setup_logger(self, name: str, level: int = 0):
-        """Set up a logger with the specified name and level."""
+    def setup_logger(
+        self, name: str, level: int = 0, use_queue: bool = LOG_QUEUE_ENABLED
+    ):
+        """
+        Set up a logger with the specified name and level.
+
+        With use_queue the logger only puts the records in a queue, and a
+        QueueListener thread formats and writes them to the file and the
+        console, so logging does not block the ingestion threads.
+        """
 
         const_logs_level = [
             logging.DEBUG,
@@ -46,19 +102,36 @@ class FileLoggerConfigurator:
             formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
             file_handler.setFormatter(formatter)
 
-            # Add the handler to the logger
-            logger.addHandler(file_handler)
-
             # Console handler
             console_handler = logging.StreamHandler()
             console_handler.setLevel(const_logs_level[level])
             console_handler.setFormatter(formatter)
-            logger.addHandler(console_handler)
+
+            if use_queue:
+                log_queue = queue.SimpleQueue()
+                listener = logging.handlers.QueueListener(
+                    log_queue,
+                    file_handler,
+                    console_handler,
+                    respect_handler_level=True,
+                )
+                listener.start()
+                _listeners.append(listener)
+                logger.addHandler(_ThreadQueueHandler(log_queue, listener))
+            else:
+                # Add the handlers to the logger
+                logger.addHandler(file_handler)
+                logger.addHandler(console_handler)
         else:
             # If the logger already has handlers, just set the level
             logger.setLevel(const_logs_level[level])
             for handler in logger.handlers:
-                if isinstance(handler, logging.FileHandler):
-                    handler.setLevel(const_logs_level[level])
+                if isinstance(handler, _ThreadQueueHandler):
+                    handlers = handler.listener.handlers
+                else:
+                    handlers = [handler]
+                for inner_handler in handlers:
+                    if isinstance(inner_handler, logging.FileHandler):
+                        inner_handler.setLevel(const_logs_level[level])
 
         return logger
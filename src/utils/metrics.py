@@ -0,0 +1,354 @@
+"""Counters and latency histograms of the ingestion, with pluggable sinks"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from conf.config import (
+    METRICS_ENABLED,
+    METRICS_SINKS,
+    METRICS_PROMETHEUS_PORT,
+    METRICS_DIR,
+)
+
+METRICS_PREFIX = "doctech_"
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# name -> (type, help, histogram buckets)
+METRIC_DEFINITIONS: Dict[str, Tuple[str, str, Optional[Tuple[float, ...]]]] = {
+    "stage_seconds": ("histogram", "Duration of each pipeline stage", LATENCY_BUCKETS),
+    "embedding_request_seconds": (
+        "histogram",
+        "Latency of the embedding calls",
+        LATENCY_BUCKETS,
+    ),
+    "embedding_batch_size": (
+        "histogram",
+        "Chunks sent per embedding call",
+        SIZE_BUCKETS,
+    ),
+    "db_insert_seconds": (
+        "histogram",
+        "Latency of the DB bulk inserts",
+        LATENCY_BUCKETS,
+    ),
+    "files_processed_total": ("counter", "Files read and split", None),
+    "bytes_read_total": ("counter", "Bytes of the files read", None),
+    "chunks_created_total": ("counter", "Chunks produced by the splitter", None),
+    "embeddings_generated_total": ("counter", "Embeddings received", None),
+    "rows_written_total": ("counter", "Rows stored in the vector DB", None),
+    "failures_total": ("counter", "Chunks or files that could not be indexed", None),
+    "embedding_retries_total": ("counter", "Retried embedding calls", None),
+    "embedding_circuit_opened_total": (
+        "counter",
+        "Times the embedding calls were paused by the circuit breaker",
+        None,
+    ),
+    "chunks_requeued_total": (
+        "counter",
+        "Chunks queued to be embedded again at the end of the run",
+        None,
+    ),
+    "directories_walked_total": (
+        "counter",
+        "Directories of the repository walked",
+        None,
+    ),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("bounds", "buckets", "count", "total", "minimum", "maximum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+
+class MetricsRegistry:
+    """
+    In-process store of counters and histograms, keyed by name and labels.
+
+    Updates take a single lock and a few arithmetic operations, and the
+    pipeline records them per file or per batch, never per chunk, so the
+    overhead on the ingestion path is negligible. When disabled every update
+    returns immediately.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+
+    def reset(self):
+        """Drop every recorded value, starting a new run."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        """Add to a counter."""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str):
+        """Record a value in a histogram."""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                definition = METRIC_DEFINITIONS.get(name)
+                bounds = definition[2] if definition else LATENCY_BUCKETS
+                histogram = series[key] = _Histogram(bounds)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str = "stage_seconds", **labels: str) -> Iterator[None]:
+        """Record the duration of the block in a histogram, even if it raises."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: Counters and histograms (count, sum, min, max, mean
+            and cumulative buckets) by name, one entry per label set
+        """
+        with self._lock:
+            counters = {
+                name: [
+                    {"labels": dict(key), "value": value}
+                    for key, value in series.items()
+                ]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": hist.count,
+                        "sum": round(hist.total, 6),
+                        "min": round(hist.minimum, 6) if hist.count else 0,
+                        "max": round(hist.maximum, 6),
+                        "mean": round(hist.total / hist.count, 6) if hist.count else 0,
+                        "buckets": dict(
+                            zip(
+                                [str(bound) for bound in hist.bounds] + ["+Inf"],
+                                _cumulative(hist.buckets),
+                            )
+                        ),
+                    }
+                    for key, hist in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines: List[str] = []
+        for name, series in sorted(snapshot["counters"].items()):
+            _header(lines, name, "counter")
+            for sample in series:
+                lines.append(
+                    f"{METRICS_PREFIX}{name}{_labels(sample['labels'])} {sample['value']}"
+                )
+        for name, series in sorted(snapshot["histograms"].items()):
+            _header(lines, name, "histogram")
+            for sample in series:
+                labels = sample["labels"]
+                for bound, count in sample["buckets"].items():
+                    bucket_labels = _labels({**labels, "le": bound})
+                    lines.append(
+                        f"{METRICS_PREFIX}{name}_bucket{bucket_labels} {count}"
+                    )
+                lines.append(
+                    f"{METRICS_PREFIX}{name}_sum{_labels(labels)} {sample['sum']}"
+                )
+                lines.append(
+                    f"{METRICS_PREFIX}{name}_count{_labels(labels)} {sample['count']}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _cumulative(buckets: List[int]) -> List[int]:
+    total, result = 0, []
+    for count in buckets:
+        total += count
+        result.append(total)
+    return result
+
+
+def _header(lines: List[str], name: str, metric_type: str):
+    description = METRIC_DEFINITIONS.get(name, (metric_type, name, None))[1]
+    lines.append(f"# HELP {METRICS_PREFIX}{name} {description}")
+    lines.append(f"# TYPE {METRICS_PREFIX}{name} {metric_type}")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = (
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class MetricsSink(ABC):
+    """Destination of the metrics of a run"""
+
+    @abstractmethod
+    def export(self, registry: MetricsRegistry, run_name: str):
+        """Publish the current metrics of the registry."""
+
+
+def _write_atomic(path: Path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+class PrometheusFileSink(MetricsSink):
+    """
+    Writes `<run_name>.prom` files for the textfile collector of the
+    Prometheus node exporter.
+    """
+
+    def __init__(self, directory: Path = METRICS_DIR):
+        self.directory = Path(directory)
+
+    def export(self, registry: MetricsRegistry, run_name: str):
+        _write_atomic(self.directory / f"{run_name}.prom", registry.to_prometheus())
+
+
+class JsonSummarySink(MetricsSink):
+    """Writes the summary of the run to `<run_name>.json`."""
+
+    def __init__(self, directory: Path = METRICS_DIR):
+        self.directory = Path(directory)
+
+    def export(self, registry: MetricsRegistry, run_name: str):
+        summary = {"run": run_name, "exported_at": time.time(), **registry.snapshot()}
+        _write_atomic(
+            self.directory / f"{run_name}.json", json.dumps(summary, indent=2)
+        )
+
+
+class PrometheusHttpSink(MetricsSink):
+    """
+    Serves the live metrics of the registry on http://<host>:<port>/metrics
+    from a daemon thread, so export has nothing to do.
+    """
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "0.0.0.0"):
+        class Handler(BaseHTTPRequestHandler):
+            """Answers the scrapes of Prometheus"""
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Return the metrics in the text exposition format."""
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._server.serve_forever, name="metrics-http", daemon=True
+        ).start()
+
+    def export(self, registry: MetricsRegistry, run_name: str):
+        pass
+
+
+metrics = MetricsRegistry()
+_sinks: Optional[List[MetricsSink]] = None
+_sinks_lock = threading.Lock()
+
+
+def get_sinks(logger) -> List[MetricsSink]:
+    """
+    Build once per process the sinks listed in METRICS_SINKS: "json",
+    "prometheus" (textfile) and "http" (endpoint on METRICS_PROMETHEUS_PORT).
+    """
+    global _sinks  # pylint: disable=global-statement
+    with _sinks_lock:
+        if _sinks is not None:
+            return _sinks
+        _sinks = []
+        for name in (item.strip().lower() for item in METRICS_SINKS.split(",")):
+            if not name:
+                continue
+            try:
+                if name == "json":
+                    _sinks.append(JsonSummarySink())
+                elif name == "prometheus":
+                    _sinks.append(PrometheusFileSink())
+                elif name == "http":
+                    _sinks.append(PrometheusHttpSink(metrics, METRICS_PROMETHEUS_PORT))
+                else:
+                    logger.warning("Unknown metrics sink '%s'", name)
+            except OSError as e:
+                logger.error("Could not start the metrics sink '%s': %s", name, e)
+        return _sinks
+
+
+def export_metrics(logger, run_name: str):
+    """Publish the metrics of the run through every configured sink."""
+    if not metrics.enabled:
+        return
+    for sink in get_sinks(logger):
+        try:
+            sink.export(metrics, run_name)
+        except OSError as e:
+            logger.error(
+                "Could not export the metrics to %s: %s", type(sink).__name__, e
+            )
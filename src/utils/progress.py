@@ -0,0 +1,70 @@
+"""Periodic progress summaries instead of one log line per chunk"""
+
+import threading
+import time
+from typing import Dict
+from conf.config import LOG_PROGRESS_INTERVAL_SECONDS
+
+
+class ProgressReporter:
+    """
+    Aggregates the per-file and per-chunk events of a run and logs one
+    summary line every `interval` seconds, with the totals and rates so far.
+
+    The check is done when events are added, so there is no timer thread and
+    a quiet run logs nothing until finish.
+    """
+
+    FIELDS = ("files", "chunks", "embeddings", "failures")
+
+    def __init__(self, logger, interval: float = LOG_PROGRESS_INTERVAL_SECONDS):
+        """
+        Args:
+            logger: Logger instance
+            interval (float): Seconds between summaries, 0 disables them
+        """
+        self.logger = logger
+        self.interval = interval
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, name: str = ""):
+        """Start counting a new run."""
+        with self._lock:
+            self.name = name
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+            self._start = time.monotonic()
+            self._next_report = self._start + self.interval
+
+    def add(self, **counts: int):
+        """Add events (files, chunks, embeddings, failures) to the totals."""
+        with self._lock:
+            for field, value in counts.items():
+                self._counts[field] += value
+            now = time.monotonic()
+            if not self.interval or now < self._next_report:
+                return
+            self._next_report = now + self.interval
+            snapshot, elapsed = dict(self._counts), now - self._start
+        self._log("Progress", snapshot, elapsed)
+
+    def finish(self) -> Dict[str, int]:
+        """Log the final summary of the run and return its totals."""
+        with self._lock:
+            snapshot, elapsed = dict(self._counts), time.monotonic() - self._start
+        self._log("Finished", snapshot, elapsed)
+        return snapshot
+
+    def _log(self, prefix: str, counts: Dict[str, int], elapsed: float):
+        elapsed = max(elapsed, 1e-9)
+        self.logger.info(
+            "%s %s: %d files, %d chunks, %d embeddings (%.1f/s), %d failures in %.1fs",
+            prefix,
+            self.name,
+            counts["files"],
+            counts["chunks"],
+            counts["embeddings"],
+            counts["embeddings"] / elapsed,
+            counts["failures"],
+            elapsed,
+        )
@@ -0,0 +1,58 @@
+"""Limits shared by every process of a batch run"""
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+_limits: Dict[str, Any] = {}
+
+
+def set_global_limits(
+    embedding_requests: Optional[Any] = None, db_connections: Optional[Any] = None
+):
+    """
+    Install the semaphores that cap the work of all the processes together.
+
+    Args:
+        embedding_requests: multiprocessing semaphore held during each embedding request
+        db_connections: multiprocessing semaphore held while a DB connection is in use
+    """
+    _limits["embedding"] = embedding_requests
+    _limits["db"] = db_connections
+
+
+@contextmanager
+def _slot(name: str) -> Iterator[None]:
+    semaphore = _limits.get(name)
+    if semaphore is None:
+        yield
+        return
+    semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def embedding_slot():
+    """Hold one of the global embedding request slots, if any are installed."""
+    return _slot("embedding")
+
+
+def db_slot():
+    """Hold one of the global DB connection slots, if any are installed."""
+    return _slot("db")
+
+
+@asynccontextmanager
+async def aembedding_slot() -> AsyncIterator[None]:
+    """Asynchronous embedding_slot, waiting for the slot outside the event loop."""
+    semaphore = _limits.get("embedding")
+    if semaphore is None:
+        yield
+        return
+    await asyncio.to_thread(semaphore.acquire)
+    try:
+        yield
+    finally:
+        semaphore.release()
@@ -0,0 +1,216 @@
+"""Fixtures shared by the tests"""
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import pytest
+from psycopg2 import sql
+from src.core.checkpoint_journal import CheckpointJournal
+from src.db.numpy_vector_store import NumpyVectorStore
+from src.db.vector_store_factory import VectorStoreFactory
+from src.embeddings.base_embedding import BaseEmbeddingService
+from src.embeddings.embedding_factory import EmbeddingFactory
+from conf.config import DIMENSION_EMBEDDING_DIMENSION
+
+LOGGER = logging.getLogger("tests")
+
+
+class FakeEmbeddingService(BaseEmbeddingService):
+    """Deterministic embeddings derived from the hash of the text"""
+
+    def __init__(self, logger):
+        super().__init__(logger)
+        self.texts: List[str] = []
+
+    def generate_embedding(self, content: str) -> Optional[List[float]]:
+        self.texts.append(content)
+        digest = hashlib.sha256(content.encode("utf-8")).digest()
+        dimension = int(DIMENSION_EMBEDDING_DIMENSION)
+        return [digest[idx % len(digest)] / 255 + 0.01 for idx in range(dimension)]
+
+    def get_model_info(self) -> Dict[str, str]:
+        return {"provider": "fake", "model": "fake"}
+
+
+def write_repo(path: Path, files: Dict[str, str]):
+    """Write the files of a repository, keyed by their path in it."""
+    for filename, content in files.items():
+        file_path = path / filename
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content, encoding="utf-8")
+
+
+def repo_entries(files: Dict[str, str]):
+    """(relative_path, filename) entries of the files, as RepoAnalyzer yields them."""
+    entries = []
+    for filename in sorted(files):
+        directory, _, name = filename.rpartition("/")
+        entries.append(("/" + directory, name))
+    return entries
+
+
+def python_module(name: str, functions: int) -> str:
+    """Python module of `functions` distinct functions."""
+    return "\n\n".join(
+        f"def {name}_{idx}(value):\n    return value * {idx} + {len(name)}\n"
+        for idx in range(functions)
+    )
+
+
+@pytest.fixture
+def make_splitter(tmp_path, monkeypatch):
+    """
+    Build RepoCodeSplitters with fake embeddings, a NumPy store and a
+    checkpoint journal under tmp_path. Keyword arguments override the
+    settings imported by repo_code_splitter.
+    """
+    # pylint: disable=import-outside-toplevel
+    import src.core.repo_code_splitter as repo_code_splitter
+
+    monkeypatch.setattr(
+        EmbeddingFactory,
+        "get_embedding_service",
+        staticmethod(FakeEmbeddingService),
+    )
+    monkeypatch.setattr(
+        VectorStoreFactory,
+        "get_vector_store",
+        staticmethod(lambda logger: NumpyVectorStore(logger, tmp_path / "vectors")),
+    )
+
+    def build(**settings):
+        for name, value in settings.items():
+            monkeypatch.setattr(repo_code_splitter, name, value)
+        splitter = repo_code_splitter.RepoCodeSplitter(LOGGER)
+        if splitter.checkpoint:
+            splitter.checkpoint = CheckpointJournal(LOGGER, tmp_path / "checkpoints")
+        return splitter
+
+    return build
+
+
+def stored_keys(splitter, table_name: str):
+    """(filename, chunk_order) of the rows and references stored in a table."""
+    table = splitter.vecto_db._get_table(table_name)  # pylint: disable=protected-access
+    return set(table.keys) | set(table.references)
+
+
+def render_sql(query) -> str:
+    """Text of a psycopg2 query, rendered without a server connection."""
+    if isinstance(query, str):
+        return query
+    if isinstance(query, sql.Composed):
+        return "".join(render_sql(part) for part in query.seq)
+    if isinstance(query, sql.SQL):
+        return query.string
+    if isinstance(query, sql.Identifier):
+        return ".".join(f'"{name}"' for name in query.strings)
+    if isinstance(query, sql.Literal):
+        value = query.wrapped
+        return f"'{value}'" if isinstance(value, str) else str(value)
+    raise TypeError(f"Cannot render {type(query).__name__}")
+
+
+class FakeCursor:
+    """Cursor of a FakeConnection"""
+
+    def __init__(self, connection: "FakeConnection"):
+        self.connection = connection
+        self.rowcount = 0
+        self._rows: List[tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=None):
+        text = render_sql(query)
+        self.connection.statements.append((text, params))
+        error = self.connection.fail(text, params)
+        if error is not None:
+            raise error
+        self._rows = list(self.connection.answer(text, params))
+        self.rowcount = len(self._rows)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+class FakeConnection:
+    """
+    psycopg2 connection recording the statements it runs. `fail(text, params)`
+    returns the error a statement raises, `answer(text, params)` the rows it
+    returns. Reconnecting reopens the same connection.
+    """
+
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = True
+        self.connects = 0
+        self.statements: List[Tuple[str, Any]] = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.fail: Callable[[str, Any], Optional[Exception]] = lambda text, params: None
+        self.answer: Callable[[str, Any], Iterable[tuple]] = lambda text, params: []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+    def executed(self, prefix: str) -> List[Tuple[str, Any]]:
+        """Statements starting with `prefix`, whitespace collapsed."""
+        statements = [
+            (" ".join(text.split()), params) for text, params in self.statements
+        ]
+        return [
+            statement for statement in statements if statement[0].startswith(prefix)
+        ]
+
+
+@pytest.fixture
+def fake_postgres(monkeypatch):
+    """
+    VectorDatabase connected to a FakeConnection instead of PostgreSQL.
+
+    Returns:
+        Tuple[VectorDatabase, FakeConnection]
+    """
+    # pylint: disable=import-outside-toplevel
+    import src.db.vdb_manager as vdb_manager
+
+    connection = FakeConnection()
+
+    def connect(**params):
+        connection.closed = 0
+        connection.connects += 1
+        return connection
+
+    monkeypatch.setattr(vdb_manager.psycopg2, "connect", connect)
+    monkeypatch.setattr(
+        sql.Composed, "as_string", lambda query, context: render_sql(query)
+    )
+    monkeypatch.setattr(sql.SQL, "as_string", lambda query, context: render_sql(query))
+    monkeypatch.setattr(
+        vdb_manager,
+        "execute_values",
+        lambda cursor, query, argslist, **kwargs: cursor.execute(query, list(argslist)),
+    )
+    return vdb_manager.VectorDatabase(LOGGER), connection
@@ -0,0 +1,62 @@
+"""The async ingestion must keep reading and writing off the event loop"""
+
+import threading
+from typing import Dict, List, Optional
+from src.embeddings.base_embedding import BaseAsyncEmbeddingService
+from tests.conftest import (
+    LOGGER,
+    FakeEmbeddingService,
+    python_module,
+    repo_entries,
+    stored_keys,
+    write_repo,
+)
+
+FILES = {
+    "main.py": python_module("main", 3),
+    "pkg/util.py": python_module("util", 4),
+}
+
+
+class _FakeAsyncService(BaseAsyncEmbeddingService):
+    """FakeEmbeddingService vectors, recording the thread of the event loop"""
+
+    def __init__(self, logger):
+        super().__init__(logger)
+        self.service = FakeEmbeddingService(logger)
+        self.loop_threads = set()
+
+    async def agenerate_embeddings(
+        self, contents: List[str]
+    ) -> List[Optional[List[float]]]:
+        self.loop_threads.add(threading.get_ident())
+        return [self.service.generate_embedding(content) for content in contents]
+
+    def get_model_info(self) -> Dict[str, str]:
+        return self.service.get_model_info()
+
+
+def test_files_are_read_and_rows_written_off_the_event_loop(make_splitter, tmp_path):
+    write_repo(tmp_path / "repo", FILES)
+    splitter = make_splitter(CHUNKING_PROCESSES=0, EMBEDDING_BATCH_SIZE=2)
+    splitter.async_embedding_service = _FakeAsyncService(LOGGER)
+    blocking_threads = set()
+
+    def record(method):
+        def recorded(*args, **kwargs):
+            blocking_threads.add(threading.get_ident())
+            return method(*args, **kwargs)
+
+        return recorded
+
+    # pylint: disable=protected-access
+    splitter._load_file_chunks = record(splitter._load_file_chunks)
+    splitter.vecto_db.insert_embeddings_bulk = record(
+        splitter.vecto_db.insert_embeddings_bulk
+    )
+
+    assert splitter.process_entries("repo", str(tmp_path / "repo"), repo_entries(FILES))
+    assert {name for name, _ in stored_keys(splitter, "repo")} == set(FILES)
+    loop_threads = splitter.async_embedding_service.loop_threads
+    assert len(loop_threads) == 1
+    assert blocking_threads and not blocking_threads & loop_threads
@@ -0,0 +1,96 @@
+"""Batch embedding API and batched Ollama embed requests"""
+
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from ollama import ResponseError
+from src.embeddings.base_embedding import BaseEmbeddingService, split_batches
+import src.embeddings.providers.ollama_embedding as ollama_embedding
+from tests.conftest import LOGGER
+
+
+def test_split_batches_by_count():
+    texts = [str(idx) for idx in range(7)]
+    assert list(split_batches(texts, 3, 1_000)) == [
+        ["0", "1", "2"],
+        ["3", "4", "5"],
+        ["6"],
+    ]
+
+
+def test_split_batches_by_utf8_size():
+    # "é" is 2 bytes in UTF-8
+    assert list(split_batches(["aa", "éé", "a", "b"], 10, 5)) == [
+        ["aa"],
+        ["éé", "a"],
+        ["b"],
+    ]
+
+
+def test_text_above_max_bytes_goes_alone():
+    assert list(split_batches(["a", "x" * 10, "b"], 10, 4)) == [
+        ["a"],
+        ["x" * 10],
+        ["b"],
+    ]
+    assert not list(split_batches([], 10, 4))
+
+
+class _PerTextService(BaseEmbeddingService):
+    def generate_embedding(self, content: str) -> Optional[List[float]]:
+        return [float(len(content))] if content else None
+
+    def get_model_info(self) -> Dict[str, str]:
+        return {"provider": "fake", "model": "fake"}
+
+
+def test_default_generate_embeddings_calls_each_text():
+    service = _PerTextService(LOGGER)
+    assert service.generate_embeddings(["a", "", "abc"]) == [[1.0], None, [3.0]]
+
+
+class _FakeClient:
+    """Ollama client answering /api/embed with the length of the texts"""
+
+    def __init__(self, fail_on: str = None, drop_last: bool = False):
+        self.batches = []
+        self.fail_on = fail_on
+        self.drop_last = drop_last
+
+    def embed(self, model, input):  # pylint: disable=redefined-builtin
+        self.batches.append(list(input))
+        if self.fail_on in input:
+            raise ResponseError("model failure")
+        vectors = [[float(len(text)), 1.0] for text in input]
+        return SimpleNamespace(embeddings=vectors[:-1] if self.drop_last else vectors)
+
+
+def _ollama_service(monkeypatch, client, batch_size=2):
+    monkeypatch.setattr(ollama_embedding, "EMBEDDING_BATCH_SIZE", batch_size)
+    monkeypatch.setattr(ollama_embedding, "EMBEDDING_BATCH_MAX_BYTES", 1_000)
+    service = ollama_embedding.OllamaEmbeddingService(LOGGER)
+    service.client = client
+    return service
+
+
+def test_ollama_sends_one_request_per_batch(monkeypatch):
+    client = _FakeClient()
+    service = _ollama_service(monkeypatch, client)
+
+    vectors = service.generate_embeddings(["a", "bb", "ccc", "dddd", "e"])
+
+    assert client.batches == [["a", "bb"], ["ccc", "dddd"], ["e"]]
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0], [4.0, 1.0], [1.0, 1.0]]
+
+
+def test_ollama_failed_batch_only_loses_its_texts(monkeypatch):
+    service = _ollama_service(monkeypatch, _FakeClient(fail_on="ccc"))
+
+    vectors = service.generate_embeddings(["a", "bb", "ccc", "dddd", "e"])
+
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], None, None, [1.0, 1.0]]
+
+
+def test_ollama_short_response_fails_the_batch(monkeypatch):
+    service = _ollama_service(monkeypatch, _FakeClient(drop_last=True), batch_size=3)
+
+    assert service.generate_embeddings(["a", "bb"]) == [None, None]
@@ -0,0 +1,67 @@
+"""Transactional bulk inserts of VectorDatabase"""
+
+import psycopg2
+
+
+def _rows(*filenames):
+    return [
+        (filename, 0, f"content of {filename}", [0.1, 0.2]) for filename in filenames
+    ]
+
+
+def _fail_rows_of(filename):
+    """`fail` hook of FakeConnection rejecting the INSERTs holding a row of the file"""
+
+    def fail(text, params):
+        rows = params if isinstance(params, list) else [params]
+        if text.lstrip().startswith("INSERT") and any(
+            row and row[0] == filename for row in rows
+        ):
+            return psycopg2.DataError(f"invalid row of {filename}")
+        return None
+
+    return fail
+
+
+def test_rows_are_inserted_in_one_statement(fake_postgres):
+    database, connection = fake_postgres
+
+    assert database.insert_embeddings_bulk(_rows("a.py", "b.py", "c.py"), "t") == []
+
+    inserts = connection.executed('INSERT INTO "t"')
+    assert len(inserts) == 1
+    assert [row[0] for row in inserts[0][1]] == ["a.py", "b.py", "c.py"]
+    assert connection.commits == 1
+    assert not connection.executed("SAVEPOINT")
+
+
+def test_rows_without_embedding_are_reported(fake_postgres):
+    database, connection = fake_postgres
+    rows = _rows("a.py", "b.py", "c.py")
+    rows[1] = ("b.py", 0, "content", [])
+
+    assert database.insert_embeddings_bulk(rows, "t") == [1]
+
+    (insert,) = connection.executed('INSERT INTO "t"')
+    assert [row[0] for row in insert[1]] == ["a.py", "c.py"]
+
+
+def test_failed_batch_is_replayed_row_by_row(fake_postgres):
+    database, connection = fake_postgres
+    connection.fail = _fail_rows_of("bad.py")
+
+    failed = database.insert_embeddings_bulk(_rows("a.py", "bad.py", "c.py"), "t")
+
+    assert failed == [1]
+    assert connection.rollbacks >= 1
+    assert len(connection.executed("SAVEPOINT bulk_row")) == 3
+    assert len(connection.executed("ROLLBACK TO SAVEPOINT bulk_row")) == 1
+    assert len(connection.executed("RELEASE SAVEPOINT bulk_row")) == 2
+    assert connection.commits >= 1
+
+
+def test_empty_batch_does_not_connect(fake_postgres):
+    database, connection = fake_postgres
+
+    assert database.insert_embeddings_bulk([], "t") == []
+    assert not connection.statements
@@ -0,0 +1,105 @@
+"""Checkpoint journal of the ingestion runs"""
+
+import pytest
+from src.core.checkpoint_journal import CheckpointJournal
+from tests.conftest import (
+    LOGGER,
+    python_module,
+    repo_entries,
+    stored_keys,
+    write_repo,
+)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = CheckpointJournal(LOGGER, tmp_path)
+    yield journal
+    journal.close()
+
+
+def interrupted_run(journal: CheckpointJournal):
+    """First run of c1: a.py finished, b.py half stored, c.py failed."""
+    assert not journal.open("repo", "c1", incremental=False)
+    journal.expect("a.py", [0, 1])
+    journal.expect("b.py", [0, 1])
+    journal.expect("c.py", [0])
+    journal.expect("empty.py", [])
+    journal.record_stored([("a.py", 0), ("a.py", 1), ("b.py", 0)])
+    journal.fail("c.py")
+    journal.record_stored([("c.py", 0)])
+    journal.close()
+
+
+def test_resume_loads_the_progress_of_the_same_commit(journal):
+    interrupted_run(journal)
+
+    assert journal.open("repo", "c1", incremental=False)
+    assert journal.done == {"a.py", "empty.py"}
+    assert journal.is_stored("b.py", 0)
+    assert not journal.is_stored("b.py", 1)
+    assert journal.is_stored("c.py", 0)
+    assert journal.touched_files == {"a.py", "b.py", "c.py", "empty.py"}
+
+
+@pytest.mark.parametrize("commit, incremental", [("c2", False), ("c1", True)])
+def test_other_runs_start_from_scratch(journal, commit, incremental):
+    interrupted_run(journal)
+
+    assert not journal.open("repo", commit, incremental=incremental)
+    assert not journal.done and not journal.touched_files
+    journal.close()
+    # The journal of the previous run was replaced
+    assert not journal.open("repo", "c1", incremental=False)
+
+
+def test_torn_last_line_is_ignored(journal, tmp_path):
+    interrupted_run(journal)
+    with open(tmp_path / "repo.jsonl", "a", encoding="utf-8") as file:
+        file.write('{"stored": [["b.py", 1]], "do')
+
+    assert journal.open("repo", "c1", incremental=False)
+    assert journal.done == {"a.py", "empty.py"}
+    assert not journal.is_stored("b.py", 1)
+
+
+def test_discard_removes_the_journal(journal, tmp_path):
+    interrupted_run(journal)
+    journal.discard("repo")
+
+    assert not (tmp_path / "repo.jsonl").exists()
+    assert not journal.open("repo", "c1", incremental=False)
+
+
+class Interrupted(Exception):
+    """Stands for the process being killed"""
+
+
+def test_interrupted_run_is_resumed_without_embedding_again(make_splitter, tmp_path):
+    files = {f"pkg/module_{idx}.py": python_module(f"m{idx}", 3) for idx in range(6)}
+    repo = tmp_path / "repo"
+    write_repo(repo, files)
+    entries = repo_entries(files)
+
+    splitter = make_splitter(DB_INSERT_BATCH_SIZE=2, EMBEDDING_BATCH_SIZE=2)
+    insert = splitter.vecto_db.insert_embeddings_bulk
+    writes = []
+
+    def crashing_insert(rows, table_name):
+        if len(writes) == 2:
+            raise Interrupted()
+        writes.append(rows)
+        return insert(rows, table_name=table_name)
+
+    splitter.vecto_db.insert_embeddings_bulk = crashing_insert
+    with pytest.raises(Interrupted):
+        splitter.process_entries("repo", str(repo), entries, commit="c1")
+    stored_before = {(row[0], row[1]) for rows in writes for row in rows}
+
+    splitter.vecto_db.insert_embeddings_bulk = insert
+    splitter.embedding_service.texts.clear()
+    assert splitter.process_entries("repo", str(repo), entries, commit="c1")
+
+    assert {name for name, _ in stored_keys(splitter, "repo")} == set(files)
+    # The chunks stored before the interruption were not embedded again
+    assert len(splitter.embedding_service.texts) == len(files) - len(stored_before)
@@ -0,0 +1,92 @@
+"""Lifecycle of the chunk references of duplicated files in incremental runs"""
+
+import pytest
+from src.core.repo_manager import RepoChanges
+from tests.conftest import python_module, repo_entries, stored_keys, write_repo
+
+SHARED = python_module("shared", 3)
+FILES = {
+    "a.py": SHARED,
+    "vendor/b.py": SHARED,
+    "vendor/c.py": SHARED,
+    "other.py": python_module("other", 2),
+}
+
+
+@pytest.fixture
+def indexed(make_splitter, tmp_path):
+    """Splitter and repository with every file indexed at commit c1"""
+    repo = tmp_path / "repo"
+    write_repo(repo, FILES)
+    splitter = make_splitter(CHUNK_DEDUP_ENABLED=True)
+    assert splitter.process_entries("repo", str(repo), repo_entries(FILES), commit="c1")
+    table = splitter.vecto_db._get_table("repo")  # pylint: disable=protected-access
+    # The copies are stored as references to the chunks of a.py
+    assert {ref[0] for ref in table.references.values()} == {
+        "vendor/b.py",
+        "vendor/c.py",
+    }
+    assert {ref[2] for ref in table.references.values()} == {"a.py"}
+    return splitter, repo, table
+
+
+def reindex(splitter, repo, files, changes, commit):
+    write_repo(repo, {name: files[name] for name in changes.files_to_index})
+    for name in changes.deleted:
+        (repo / name).unlink()
+    return splitter.process_entries(
+        "repo", str(repo), repo_entries(files), changes=changes, commit=commit
+    )
+
+
+def test_modified_canonical_file_keeps_its_copies(indexed):
+    splitter, repo, table = indexed
+    before = stored_keys(splitter, "repo")
+    files = {**FILES, "a.py": python_module("changed", 2)}
+
+    assert reindex(splitter, repo, files, RepoChanges(modified={"a.py"}), "c2")
+
+    after = stored_keys(splitter, "repo")
+    for name in ("vendor/b.py", "vendor/c.py", "other.py"):
+        assert {key for key in after if key[0] == name} == {
+            key for key in before if key[0] == name
+        }
+    # One copy holds the chunks now, the other one references it
+    assert all(table.contents[table.keys[key]] for key in after if key in table.keys)
+    assert {ref[2] for ref in table.references.values()} <= {"vendor/b.py"}
+    assert any(key[0] == "vendor/b.py" for key in table.keys)
+
+
+def test_deleted_canonical_file_keeps_its_copies(indexed):
+    splitter, repo, table = indexed
+    files = {name: content for name, content in FILES.items() if name != "a.py"}
+
+    assert reindex(splitter, repo, files, RepoChanges(deleted={"a.py"}), "c2")
+
+    names = {key[0] for key in stored_keys(splitter, "repo")}
+    assert names == set(files)
+    promoted = [key for key in table.keys if key[0] == "vendor/b.py"]
+    assert promoted
+    assert all(table.contents[table.keys[key]] in SHARED for key in promoted)
+
+
+def test_promoted_references_survive_a_reopen(indexed, tmp_path):
+    splitter, repo, _ = indexed
+    files = {**FILES, "a.py": python_module("changed", 2)}
+    assert reindex(splitter, repo, files, RepoChanges(modified={"a.py"}), "c2")
+    before = stored_keys(splitter, "repo")
+
+    splitter.vecto_db.disconnect()
+    assert splitter.vecto_db.setup_database("repo")
+    assert stored_keys(splitter, "repo") == before
+
+
+def test_deleting_every_copy_leaves_no_reference(indexed):
+    splitter, repo, table = indexed
+    files = {"other.py": FILES["other.py"]}
+    changes = RepoChanges(deleted={"a.py", "vendor/b.py", "vendor/c.py"})
+
+    assert reindex(splitter, repo, files, changes, "c2")
+
+    assert {key[0] for key in stored_keys(splitter, "repo")} == {"other.py"}
+    assert not table.references
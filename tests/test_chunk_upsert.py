@@ -0,0 +1,131 @@
+"""One stored row per chunk: upserts and the stale chunk sweep"""
+
+import hashlib
+import pytest
+from src.db.numpy_vector_store import NumpyVectorStore
+from tests.conftest import LOGGER
+
+TABLE = "repo"
+
+
+def vector(seed: int):
+    return [float(seed + 1), 1.0, float(seed % 3), 0.5]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = NumpyVectorStore(LOGGER, tmp_path)
+    assert store.setup_database(TABLE, vector_dimension=4)
+    rows = [
+        (f"{name}.py", order, f"{name} {order}", vector(order))
+        for name in "abc"
+        for order in range(3)
+    ]
+    assert store.insert_embeddings_bulk(rows, table_name=TABLE) == []
+    yield store
+    store.disconnect()
+
+
+def table_of(store):
+    return store._get_table(TABLE)  # pylint: disable=protected-access
+
+
+def contents(store):
+    table = table_of(store)
+    return {key: table.contents[row] for key, row in table.keys.items()}
+
+
+def test_unchanged_rows_are_not_rewritten(store):
+    table = table_of(store)
+    count = table.count
+
+    rows = [("a.py", 0, "a 0", vector(0)), ("a.py", 1, "a 1", vector(1))]
+    assert store.insert_embeddings_bulk(rows, table_name=TABLE) == []
+
+    assert table.count == count
+    assert len(contents(store)) == 9
+
+
+def test_changed_rows_replace_the_stored_ones(store):
+    table = table_of(store)
+    count = table.count
+
+    rows = [("a.py", 0, "a 0 changed", vector(0)), ("a.py", 1, "a 1", vector(7))]
+    assert store.insert_embeddings_bulk(rows, table_name=TABLE) == []
+
+    assert table.count == count + 2
+    assert int(table.alive.sum()) == 9
+    assert contents(store)[("a.py", 0)] == "a 0 changed"
+
+
+def test_reference_and_row_replace_each_other(store):
+    table = table_of(store)
+
+    assert store.insert_chunk_references(
+        [("b.py", 1, "a.py", 1, "exact")], table_name=TABLE
+    )
+    assert ("b.py", 1) not in table.keys
+    assert ("b.py", 1) in table.references
+
+    assert (
+        store.insert_embeddings_bulk([("b.py", 1, "b 1", vector(1))], table_name=TABLE)
+        == []
+    )
+    assert ("b.py", 1) in table.keys
+    assert ("b.py", 1) not in table.references
+
+
+def test_stale_sweep(store):
+    table = table_of(store)
+    assert store.insert_chunk_references(
+        [("c.py", 5, "a.py", 0, "exact"), ("d.py", 0, "a.py", 0, "exact")],
+        table_name=TABLE,
+    )
+
+    # a.py shrank to one chunk, b.py is left as is and c.py, d.py were deleted
+    assert store.delete_stale_chunks({"a.py": 1, "b.py": None}, table_name=TABLE)
+
+    assert set(contents(store)) == {("a.py", 0), ("b.py", 0), ("b.py", 1), ("b.py", 2)}
+    assert not table.references
+
+
+def test_pgvector_upsert_skips_unchanged_rows(fake_postgres):
+    database, connection = fake_postgres
+
+    assert database.insert_embeddings_bulk([("a.py", 0, "text", [0.1])], "t") == []
+
+    (insert,) = connection.executed('INSERT INTO "t"')
+    assert "ON CONFLICT (filename, chunk_order) DO UPDATE" in insert[0]
+    assert (
+        "WHERE stored.content_hash IS DISTINCT FROM EXCLUDED.content_hash "
+        "OR stored.embedding IS DISTINCT FROM EXCLUDED.embedding"
+    ) in insert[0]
+    assert insert[1] == [
+        ("a.py", 0, "text", hashlib.sha256(b"text").hexdigest(), [0.1])
+    ]
+    # The reference stored for the same chunk is dropped
+    (delete,) = connection.executed('DELETE FROM "t_refs"')
+    assert delete[1] == (["a.py"], [0])
+
+
+def test_pgvector_stale_sweep(fake_postgres):
+    database, connection = fake_postgres
+
+    assert database.delete_stale_chunks({"a.py": 1, "b.py": None}, "t")
+
+    deletes = connection.executed("DELETE FROM")
+    assert [text.split()[2] for text, _ in deletes] == ['"t"', '"t_refs"']
+    assert all(params == (["a.py", "b.py"], [1, None]) for _, params in deletes)
+
+
+@pytest.mark.parametrize("version, migrated", [(None, True), (1, True), (2, False)])
+def test_pgvector_migration(fake_postgres, version, migrated):
+    database, connection = fake_postgres
+    connection.answer = lambda text, params: (
+        [(version,)] if version and text.startswith("SELECT version") else []
+    )
+
+    assert database.setup_database(table_name="t")
+
+    assert bool(connection.executed("CREATE UNIQUE INDEX")) == migrated
+    assert bool(connection.executed("ALTER TABLE")) == migrated
@@ -0,0 +1,141 @@
+"""Clones and updates of RepoManager with each strategy, against a file:// remote"""
+
+import os
+import git
+import pytest
+from src.core import repo_manager
+from src.core.repo_manager import RepoChanges, RepoManager
+from tests.conftest import LOGGER
+from tests.test_repo_changes import IDENTITY
+
+FIRST = {"main.py": "a = 1\n", "lib/util.py": "b = 1\n", "notes.bin": "binary\n"}
+SECOND = {"main.py": "a = 2\n", "node_modules/dep/index.js": "module.exports = 1;\n"}
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    """Bare origin with two commits, and the working repository pushing to it."""
+    monkeypatch.setattr(repo_manager, "REPOS_DIR", tmp_path / "repos")
+    origin = git.Repo.init(tmp_path / "origin.git", bare=True)
+    # Partial clones need the server to accept filters, as hosted remotes do
+    origin.git.config("uploadpack.allowFilter", "true")
+    work = git.Repo.init(tmp_path / "work")
+    work.git.update_environment(**IDENTITY)
+    work.git.checkout("-q", "-b", "main")
+    work.create_remote("origin", str(tmp_path / "origin.git"))
+    first = push(work, FIRST, "first")
+    second = push(work, SECOND, "second")
+    origin.git.symbolic_ref("HEAD", "refs/heads/main")
+    yield work, f"file://{tmp_path / 'origin.git'}", [first, second]
+    work.close()
+    origin.close()
+
+
+def push(work: git.Repo, files: dict, message: str) -> str:
+    """Write (or delete, for None) the files, commit and push them, returns the SHA."""
+    for filename, content in files.items():
+        if content is None:
+            work.git.rm("-q", filename)
+            continue
+        path = os.path.join(work.working_tree_dir, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        work.git.add(filename)
+    work.git.commit("-q", "-m", message)
+    work.git.push("-q", "origin", "main")
+    return work.head.commit.hexsha
+
+
+def clone(url: str, **options):
+    path, name = RepoManager(LOGGER, **options).get_repo(url)
+    assert name == "origin"
+    return git.Repo(path)
+
+
+def commit_count(repo: git.Repo) -> int:
+    return int(repo.git.rev_list("--count", "HEAD"))
+
+
+def test_default_strategy_is_shallow():
+    assert RepoManager(LOGGER).clone_strategy == "shallow"
+
+
+@pytest.mark.parametrize(
+    "strategy, commits", [("full", 2), ("shallow", 1), ("blobless", 2)]
+)
+def test_clone_strategies(remote, strategy, commits):
+    _, url, shas = remote
+    repo = clone(url, clone_strategy=strategy, sparse_checkout=False, bare=False)
+
+    assert repo.head.commit.hexsha == shas[-1]
+    assert commit_count(repo) == commits
+    assert os.path.exists(os.path.join(repo.git_dir, "shallow")) == (
+        strategy == "shallow"
+    )
+    if strategy == "blobless":
+        assert repo.git.config("remote.origin.partialclonefilter") == "blob:none"
+    for filename in {**FIRST, **SECOND}:
+        assert os.path.exists(os.path.join(repo.working_tree_dir, filename))
+
+
+def test_sparse_checkout_only_writes_the_allowed_files(remote):
+    _, url, shas = remote
+    repo = clone(url, clone_strategy="blobless", sparse_checkout=True, bare=False)
+
+    assert repo.head.commit.hexsha == shas[-1]
+    files = {
+        os.path.relpath(os.path.join(root, name), repo.working_tree_dir)
+        for root, _, names in os.walk(repo.working_tree_dir)
+        if ".git" not in root.split(os.sep)
+        for name in names
+    }
+    assert files == {"main.py", os.path.join("lib", "util.py")}
+
+
+def test_bare_clone_has_no_working_tree(remote):
+    _, url, shas = remote
+    repo = clone(url, clone_strategy="shallow", sparse_checkout=True, bare=True)
+
+    assert repo.bare
+    assert repo.head.commit.hexsha == shas[-1]
+    assert repo.head.commit.tree["main.py"].data_stream.read() == b"a = 2\n"
+
+
+@pytest.mark.parametrize("bare", [False, True])
+@pytest.mark.parametrize("strategy", ["full", "shallow", "blobless"])
+def test_update_brings_the_clone_to_the_new_commit(remote, strategy, bare):
+    work, url, _ = remote
+    clone(url, clone_strategy=strategy, sparse_checkout=False, bare=bare)
+    third = push(work, {"main.py": "a = 3\n", "lib/util.py": None}, "third")
+
+    repo = clone(url, clone_strategy=strategy, sparse_checkout=False, bare=bare)
+
+    assert repo.head.commit.hexsha == third
+    assert repo.head.commit.tree["main.py"].data_stream.read() == b"a = 3\n"
+    if not bare:
+        assert not repo.is_dirty(untracked_files=True)
+        assert not os.path.exists(os.path.join(repo.working_tree_dir, "lib/util.py"))
+
+
+@pytest.mark.parametrize("bare", [False, True])
+def test_changes_from_a_commit_missing_in_the_shallow_clone(remote, bare):
+    work, url, shas = remote
+    push(work, {"main.py": "a = 3\n", "lib/util.py": None, "new.py": "c = 1\n"}, "3")
+    # A new clone, e.g. on another worker, of the commits after the indexed one
+    repo = clone(url, clone_strategy="shallow", sparse_checkout=False, bare=bare)
+    manager = RepoManager(LOGGER, clone_strategy="shallow", bare=bare)
+
+    for sha in shas:
+        with pytest.raises(ValueError):
+            repo.commit(sha)
+    changes = manager.get_changed_files(repo.git_dir, shas[1])
+    assert changes == RepoChanges(
+        added={"new.py"}, modified={"main.py"}, deleted={"lib/util.py"}
+    )
+    changes = manager.get_changed_files(repo.git_dir, shas[0])
+    assert changes == RepoChanges(
+        added={"new.py", "node_modules/dep/index.js"},
+        modified={"main.py"},
+        deleted={"lib/util.py"},
+    )
@@ -0,0 +1,32 @@
+"""Tests of the syntax-aware chunking of Python modules"""
+
+import ast
+import logging
+from src.core.code_chunker import CodeChunker
+from src.core.token_counter import ChunkSizing
+
+LOGGER = logging.getLogger("tests")
+SIZING = ChunkSizing(len, 200, 0, 0, "chars")
+
+MODULE = "\n\n".join(
+    f"def function_{idx}(value):\n    return [value] * {idx}\n" for idx in range(20)
+)
+
+
+def test_python_modules_are_split_by_function():
+    chunks = CodeChunker(LOGGER, SIZING).split(MODULE, "module.py")
+
+    assert sum(chunk.count("def ") for chunk in chunks) == 20
+    assert all(len(chunk) <= SIZING.chunk_size for chunk in chunks)
+    assert all(chunk.lstrip().startswith("def ") for chunk in chunks)
+
+
+def test_parser_errors_fall_back_to_the_character_splitter(monkeypatch):
+    def broken_parse(*_args, **_kwargs):
+        raise SystemError("AST constructor recursion depth mismatch")
+
+    monkeypatch.setattr(ast, "parse", broken_parse)
+    chunks = CodeChunker(LOGGER, SIZING).split(MODULE, "module.py")
+
+    assert chunks
+    assert all(len(chunk) <= SIZING.chunk_size for chunk in chunks)
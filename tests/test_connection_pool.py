@@ -0,0 +1,106 @@
+"""Pooled connections and retries of VectorDatabase"""
+
+import psycopg2
+import pytest
+from tenacity import wait_none
+import src.db.vdb_manager as vdb_manager
+from tests.conftest import LOGGER, FakeConnection
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(
+        vdb_manager, "wait_exponential_jitter", lambda **kwargs: wait_none()
+    )
+
+
+def _fail_first(count: int, error_type, close: bool = False):
+    """`fail` hook of FakeConnection failing the first `count` INSERTs"""
+    failures = []
+
+    def fail(text, params):
+        if not text.lstrip().startswith("INSERT") or len(failures) >= count:
+            return None
+        failures.append(text)
+        return error_type("server closed the connection unexpectedly")
+
+    return fail
+
+
+def test_transient_error_is_retried_on_a_new_connection(fake_postgres):
+    database, connection = fake_postgres
+    failures = _fail_first(1, psycopg2.OperationalError)
+
+    def fail(text, params):
+        error = failures(text, params)
+        if error:
+            connection.closed = 2
+        return error
+
+    connection.fail = fail
+
+    assert database.set_indexed_commit("abc", "t")
+
+    assert connection.connects == 2
+    assert len(connection.executed("INSERT INTO")) == 2
+    assert connection.commits == 1
+
+
+def test_retries_stop_after_the_configured_attempts(fake_postgres, monkeypatch):
+    database, connection = fake_postgres
+    monkeypatch.setattr(vdb_manager, "DB_RETRY_ATTEMPTS", 3)
+    connection.fail = _fail_first(10, psycopg2.OperationalError)
+
+    assert not database.set_indexed_commit("abc", "t")
+
+    assert len(connection.executed("INSERT INTO")) == 3
+    assert connection.rollbacks == 3
+    assert connection.commits == 0
+
+
+def test_other_errors_are_not_retried(fake_postgres):
+    database, connection = fake_postgres
+    connection.fail = _fail_first(10, psycopg2.ProgrammingError)
+
+    assert not database.set_indexed_commit("abc", "t")
+
+    assert len(connection.executed("INSERT INTO")) == 1
+    assert connection.rollbacks == 1
+
+
+class _FakePool:
+    """ThreadedConnectionPool handing out the given connections in order"""
+
+    def __init__(self, connections):
+        self.closed = False
+        self.idle = list(connections)
+        self.discarded = []
+
+    def getconn(self):
+        return self.idle.pop(0)
+
+    def putconn(self, connection, close=False):
+        (self.discarded if close else self.idle).append(connection)
+
+    def closeall(self):
+        self.closed = True
+
+
+def test_broken_pooled_connections_are_discarded(monkeypatch):
+    closed, unhealthy, healthy = FakeConnection(), FakeConnection(), FakeConnection()
+    closed.closed = 1
+    unhealthy.fail = lambda text, params: psycopg2.OperationalError("broken")
+    pool = _FakePool([closed, unhealthy, healthy])
+    monkeypatch.setattr(
+        vdb_manager, "ThreadedConnectionPool", lambda *args, **kwargs: pool
+    )
+    database = vdb_manager.VectorDatabase(LOGGER, pooled=True)
+
+    assert database.set_indexed_commit("abc", "t")
+
+    assert pool.discarded == [closed, unhealthy]
+    assert pool.idle == [healthy]
+    assert healthy.commits == 1
+    assert healthy.executed("SELECT 1;")
+    database.disconnect()
+    assert pool.closed
@@ -0,0 +1,85 @@
+"""Embedding cache shared by several processes, and its async service"""
+
+import asyncio
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from src.embeddings.base_embedding import BaseAsyncEmbeddingService
+from src.embeddings.cached_embedding import CachedAsyncEmbeddingService
+from src.embeddings.embedding_cache import EmbeddingCache
+from tests.conftest import LOGGER
+
+
+def _count(cache_path) -> int:
+    with sqlite3.connect(str(cache_path)) as connection:
+        return connection.execute("SELECT COUNT(*) FROM embeddings;").fetchone()[0]
+
+
+def test_instances_sharing_the_file_respect_max_entries(tmp_path):
+    cache_path = tmp_path / "embeddings.sqlite3"
+    first = EmbeddingCache(LOGGER, cache_path, max_entries=10)
+    second = EmbeddingCache(LOGGER, cache_path, max_entries=10)
+    try:
+        for idx in range(8):
+            first.put_many({f"first-{idx}": [float(idx)]})
+            second.put_many({f"second-{idx}": [float(idx)]})
+        assert _count(cache_path) == 10
+        assert first.get_stats()["cache_entries"] == 10
+        assert second.get_stats()["cache_entries"] == 10
+        # The most recent entries of both instances are kept
+        assert set(second.get_many(["first-7", "second-7", "first-0"])) == {
+            "first-7",
+            "second-7",
+        }
+    finally:
+        first.close()
+        second.close()
+
+
+class _FakeAsyncService(BaseAsyncEmbeddingService):
+    """Async embeddings equal to the length of the text"""
+
+    def __init__(self, logger):
+        super().__init__(logger)
+        self.texts: List[str] = []
+
+    async def agenerate_embeddings(
+        self, contents: List[str]
+    ) -> List[Optional[List[float]]]:
+        self.texts.extend(contents)
+        return [[float(len(content))] for content in contents]
+
+    def get_model_info(self) -> Dict[str, str]:
+        return {"provider": "fake", "model": "fake"}
+
+
+def test_async_service_reads_the_cache_off_the_event_loop(tmp_path, monkeypatch):
+    cache = EmbeddingCache(LOGGER, tmp_path / "embeddings.sqlite3")
+    threads = []
+    for name in ("get_many", "put_many"):
+        method = getattr(cache, name)
+
+        def record(*args, _method=method, **kwargs):
+            threads.append(threading.get_ident())
+            return _method(*args, **kwargs)
+
+        monkeypatch.setattr(cache, name, record)
+
+    wrapped = _FakeAsyncService(LOGGER)
+    service = CachedAsyncEmbeddingService(LOGGER, wrapped, cache)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        first = await service.agenerate_embeddings(["a", "bb"])
+        second = await service.agenerate_embeddings(["bb", "ccc"])
+        return loop_thread, first, second
+
+    try:
+        loop_thread, first, second = asyncio.run(run())
+    finally:
+        cache.close()
+
+    assert first == [[1.0], [2.0]]
+    assert second == [[2.0], [3.0]]
+    assert wrapped.texts == ["a", "bb", "ccc"]
+    assert threads and loop_thread not in threads
@@ -0,0 +1,64 @@
+"""The git object database walk must index the files of the filesystem walk"""
+
+import git
+import pytest
+from src.core.git_tree_reader import GitTreeReader
+from src.core.repo_analyzer import RepoAnalyzer
+from tests.conftest import LOGGER, write_repo
+
+FILES = {
+    ".gitignore": "build/\n*.gen.py\n/local_settings.py\n",
+    "app.py": "print('app')\n",
+    "local_settings.py": "DEBUG = True\n",
+    "models.gen.py": "GENERATED = 1\n",
+    "build/output.py": "built = 1\n",
+    "pkg/.gitignore": "!keep.gen.py\nscratch/\n",
+    "pkg/core.py": "core = 1\n",
+    "pkg/keep.gen.py": "kept = 1\n",
+    "pkg/drop.gen.py": "dropped = 1\n",
+    "pkg/local_settings.py": "nested = 1\n",
+    "pkg/scratch/notes.py": "notes = 1\n",
+}
+
+
+@pytest.fixture
+def repo_path(tmp_path):
+    path = tmp_path / "repo"
+    write_repo(path, FILES)
+    repo = git.Repo.init(path)
+    # Ignored files committed anyway, as `git add -f` does
+    repo.git.add("-A", "-f")
+    actor = git.Actor("Test", "test@example.com")
+    repo.index.commit("initial", author=actor, committer=actor)
+    repo.close()
+    return path
+
+
+def walk(repo_path, respect_gitignore: bool, object_db: bool):
+    analyzer = RepoAnalyzer(LOGGER, respect_gitignore=respect_gitignore)
+    reader = GitTreeReader(LOGGER, str(repo_path)) if object_db else None
+    try:
+        return set(
+            analyzer.iter_entries(
+                str(repo_path), "repo", export_json=False, tree_reader=reader
+            )
+        )
+    finally:
+        if reader:
+            reader.close()
+
+
+@pytest.mark.parametrize("respect_gitignore", [True, False])
+def test_both_walks_index_the_same_files(repo_path, respect_gitignore):
+    assert walk(repo_path, respect_gitignore, object_db=True) == walk(
+        repo_path, respect_gitignore, object_db=False
+    )
+
+
+def test_gitignore_rules_of_the_tree_are_applied(repo_path):
+    assert walk(repo_path, True, object_db=True) == {
+        ("/", "app.py"),
+        ("/pkg", "core.py"),
+        ("/pkg", "keep.gen.py"),
+        ("/pkg", "local_settings.py"),
+    }
@@ -0,0 +1,133 @@
+"""Precompiled ignore matcher and .gitignore rules"""
+
+import pytest
+from src.core.ignore_matcher import GitignoreRules, IgnoreMatcher, is_gitignored
+from src.core.repo_analyzer import RepoAnalyzer
+from tests.conftest import LOGGER
+
+
+@pytest.fixture
+def matcher():
+    return IgnoreMatcher(
+        ignored_directories=["node_modules", "packages/*/dist", "*.egg-info"],
+        ignored_files=["setup.py", "*.min.js", "coverage"],
+        ignored_exts=[".lock"],
+        allowed_exts=[".py", ".js", ".lock"],
+    )
+
+
+@pytest.mark.parametrize(
+    "name, rel_path, ignored",
+    [
+        ("node_modules", "web/node_modules", True),
+        ("Node_Modules", "Node_Modules", True),
+        ("dist", "packages/ui/dist", True),
+        ("dist", "dist", False),
+        ("dist", "packages/ui/lib/dist", False),
+        ("demo.egg-info", "demo.egg-info", True),
+        # Names and globs of the ignored files also prune directories
+        ("coverage", "coverage", True),
+        ("src", "src", False),
+    ],
+)
+def test_ignores_dir(matcher, name, rel_path, ignored):
+    assert matcher.ignores_dir(name, rel_path) is ignored
+
+
+@pytest.mark.parametrize(
+    "name, rel_path, allowed",
+    [
+        ("app.py", "src/app.py", True),
+        ("APP.PY", "src/APP.PY", True),
+        ("setup.py", "setup.py", False),
+        ("app.min.js", "static/app.min.js", False),
+        ("app.js", "static/app.js", True),
+        ("poetry.lock", "poetry.lock", False),
+        ("README.md", "README.md", False),
+    ],
+)
+def test_allows_file(matcher, name, rel_path, allowed):
+    assert matcher.allows_file(name, rel_path) is allowed
+
+
+def _rules(tmp_path, text: str, base: str = "") -> GitignoreRules:
+    path = tmp_path / ".gitignore"
+    path.write_text(text, encoding="utf-8")
+    return GitignoreRules.from_file(str(path), base)
+
+
+@pytest.mark.parametrize(
+    "rel_path, is_dir, expected",
+    [
+        ("build", True, True),
+        ("src/build", True, True),
+        ("build", False, None),
+        ("local.py", False, True),
+        ("src/local.py", False, None),
+        ("docs/api.md", False, True),
+        ("docs/guide/api.md", False, None),
+        ("a/b/generated.py", False, True),
+        ("models.gen.py", False, True),
+        ("keep.gen.py", False, False),
+        ("#notes.py", False, True),
+        ("src/app.py", False, None),
+    ],
+)
+def test_gitignore_rules(tmp_path, rel_path, is_dir, expected):
+    rules = _rules(
+        tmp_path,
+        "# comment\n\nbuild/\n/local.py\ndocs/*.md\n**/generated.py\n"
+        "*.gen.py\n!keep.gen.py\n\\#notes.py\n",
+    )
+
+    assert rules.match(rel_path, is_dir) is expected
+
+
+def test_gitignore_without_rules(tmp_path):
+    assert _rules(tmp_path, "# only a comment\n\n") is None
+
+
+def test_deepest_gitignore_wins(tmp_path):
+    root = _rules(tmp_path, "*.gen.py\n")
+    (tmp_path / "pkg").mkdir()
+    nested = _rules(tmp_path / "pkg", "!keep.gen.py\n", base="pkg")
+
+    assert is_gitignored([root, nested], "pkg/drop.gen.py", False)
+    assert not is_gitignored([root, nested], "pkg/keep.gen.py", False)
+    assert is_gitignored([root, nested], "keep.gen.py", False)
+    assert not is_gitignored([root, nested], "pkg/app.py", False)
+
+
+@pytest.mark.parametrize("respect_gitignore", [True, False])
+def test_walk_prunes_ignored_directories(tmp_path, matcher, respect_gitignore):
+    files = {
+        ".gitignore": "*.gen.py\n",
+        "app.py": "",
+        "setup.py": "",
+        "models.gen.py": "",
+        "node_modules/lib.js": "",
+        "packages/ui/dist/index.js": "",
+        "packages/ui/src/index.js": "",
+        "pkg/.gitignore": "!keep.gen.py\n",
+        "pkg/keep.gen.py": "",
+        "pkg/drop.gen.py": "",
+    }
+    for filename, content in files.items():
+        path = tmp_path / "repo" / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    analyzer = RepoAnalyzer(LOGGER, respect_gitignore=respect_gitignore)
+    analyzer.matcher = matcher
+
+    entries = set(
+        analyzer.iter_entries(str(tmp_path / "repo"), "repo", export_json=False)
+    )
+
+    expected = {
+        ("/", "app.py"),
+        ("/packages/ui/src", "index.js"),
+        ("/pkg", "keep.gen.py"),
+    }
+    if not respect_gitignore:
+        expected |= {("/", "models.gen.py"), ("/pkg", "drop.gen.py")}
+    assert entries == expected
@@ -0,0 +1,155 @@
+"""Failures of the ingestion stages must fail the run, never be dropped"""
+
+import threading
+import pytest
+from src.core.ingestion_pipeline import IngestionPipeline
+from tests.conftest import (
+    LOGGER,
+    python_module,
+    repo_entries,
+    stored_keys,
+    write_repo,
+)
+
+FILES = {
+    "main.py": python_module("main", 3),
+    "pkg/util.py": python_module("util", 4),
+    "pkg/models.py": python_module("models", 2),
+}
+
+
+def run_pipeline(load_chunks, embed_chunks, write_rows, entries):
+    failures, written = [], []
+    lock = threading.Lock()
+
+    def on_failure(stage, items):
+        with lock:
+            failures.append((stage, list(items)))
+
+    def write(rows):
+        write_rows(rows)
+        with lock:
+            written.extend(rows)
+
+    IngestionPipeline(
+        LOGGER,
+        load_chunks=load_chunks,
+        embed_chunks=embed_chunks,
+        write_rows=write,
+        on_failure=on_failure,
+        reader_workers=2,
+        embed_workers=2,
+        writer_workers=2,
+        embed_batch_size=2,
+        write_batch_size=2,
+    ).run(entries)
+    return failures, written
+
+
+def embed(chunks):
+    return [(name, order, content, [1.0]) for name, order, content in chunks]
+
+
+def test_failed_stages_report_what_they_dropped():
+    def load_chunks(entry):
+        if entry == "bad":
+            raise SystemError("reader crashed")
+        return [(entry, idx, f"{entry} {idx}") for idx in range(3)]
+
+    def write_rows(rows):
+        if any(name == "unwritable" for name, *_ in rows):
+            raise OSError("disk full")
+
+    failures, written = run_pipeline(
+        load_chunks, embed, write_rows, ["a", "bad", "b", "unwritable"]
+    )
+
+    assert ("reader", ["bad"]) in failures
+    dropped_rows = [
+        row for stage, items in failures if stage == "writer" for row in items
+    ]
+    assert {row[0] for row in dropped_rows} >= {"unwritable"}
+    # Every chunk is either written or reported, none is lost silently
+    assert len(written) + len(dropped_rows) == 9
+
+
+def test_failed_embedding_batches_are_reported():
+    def embed_chunks(chunks):
+        if any(name == "b" for name, *_ in chunks):
+            raise ValueError("bad response")
+        return embed(chunks)
+
+    failures, written = run_pipeline(
+        lambda entry: [(entry, 0, entry)], embed_chunks, lambda rows: None, ["a", "b"]
+    )
+
+    assert [stage for stage, _ in failures] == ["embedder"]
+    assert ("b", 0, "b") in failures[0][1]
+    assert len(written) + len(failures[0][1]) == 2
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "repo"
+    write_repo(path, FILES)
+    return path
+
+
+def test_reader_failure_fails_the_run_and_keeps_stored_chunks(make_splitter, repo):
+    splitter = make_splitter(PIPELINE_ENABLED=True)
+    entries = repo_entries(FILES)
+    assert splitter.process_entries("repo", str(repo), entries, commit="c1")
+    indexed = stored_keys(splitter, "repo")
+
+    split = splitter._create_text_splitter  # pylint: disable=protected-access
+
+    def failing_split(content, filename=""):
+        if filename == "util.py":
+            raise SystemError("AST constructor recursion depth mismatch")
+        return split(content, filename)
+
+    splitter._create_text_splitter = failing_split
+    assert not splitter.process_entries("repo", str(repo), entries, commit="c2")
+    # The chunks of the file that failed are not swept as stale
+    assert stored_keys(splitter, "repo") == indexed
+    # and the file is retried when the commit is resumed
+    assert "pkg/util.py" not in splitter.checkpoint.done
+
+
+def test_writer_failure_fails_the_run(make_splitter, repo):
+    splitter = make_splitter(PIPELINE_ENABLED=True)
+    insert = splitter.vecto_db.insert_embeddings_bulk
+
+    def failing_insert(rows, table_name):
+        if any(row[0] == "main.py" for row in rows):
+            raise OSError("disk full")
+        return insert(rows, table_name=table_name)
+
+    splitter.vecto_db.insert_embeddings_bulk = failing_insert
+    assert not splitter.process_entries("repo", str(repo), repo_entries(FILES))
+
+
+def test_failed_embedding_batches_are_embedded_again(make_splitter, repo):
+    splitter = make_splitter(PIPELINE_ENABLED=True)
+    generate = splitter.embedding_service.generate_embeddings
+    calls = []
+
+    def flaky_generate(contents):
+        calls.append(len(contents))
+        if len(calls) == 1:
+            raise ValueError("bad response")
+        return generate(contents)
+
+    splitter.embedding_service.generate_embeddings = flaky_generate
+    assert splitter.process_entries("repo", str(repo), repo_entries(FILES))
+    assert {name for name, _ in stored_keys(splitter, "repo")} == set(FILES)
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_undecodable_files_are_skipped_and_counted(make_splitter, repo, pipeline):
+    (repo / "latin1.py").write_bytes("nombre = 'Ñandú'\n".encode("latin-1"))
+    splitter = make_splitter(PIPELINE_ENABLED=pipeline)
+    entries = repo_entries({**FILES, "latin1.py": ""})
+
+    assert not splitter.process_entries("repo", str(repo), entries)
+    assert {name for name, _ in stored_keys(splitter, "repo")} == set(FILES)
@@ -0,0 +1,166 @@
+"""Compaction of the NumPy store must never lose the table"""
+
+import pytest
+from src.db.numpy_vector_store import NumpyVectorStore, _VectorTable
+from tests.conftest import LOGGER
+
+DIMENSION = 4
+TABLE = "repo"
+
+
+def vector(seed: int):
+    return [float(seed + 1), float(seed % 3), 1.0, float(seed % 5)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = NumpyVectorStore(LOGGER, tmp_path)
+    assert store.setup_database(TABLE, vector_dimension=DIMENSION)
+    rows = [
+        (f"file_{idx % 5}.py", idx // 5, f"chunk {idx}", vector(idx))
+        for idx in range(20)
+    ]
+    assert store.insert_embeddings_bulk(rows, table_name=TABLE) == []
+    assert store.insert_chunk_references(
+        [("copy.py", 0, "file_1.py", 0, "exact")], table_name=TABLE
+    )
+    # Leave deleted rows behind, for the compaction to drop
+    assert store.delete_file_chunks(["file_0.py"], table_name=TABLE)
+    assert (
+        store.insert_embeddings_bulk(
+            [("file_2.py", 0, "changed", vector(99))], table_name=TABLE
+        )
+        == []
+    )
+    yield store
+    store.disconnect()
+
+
+def snapshot(table: _VectorTable):
+    rows = {
+        key: (table.contents[row], [round(v, 5) for v in table.matrix[row].tolist()])
+        for key, row in table.keys.items()
+    }
+    return rows, dict(table.references)
+
+
+def reopen(store: NumpyVectorStore):
+    path = store.base_dir / TABLE
+    store.disconnect()
+    return _VectorTable(path, DIMENSION)
+
+
+def table_files(store: NumpyVectorStore):
+    return sorted(path.name for path in (store.base_dir / TABLE).iterdir())
+
+
+def test_compaction_keeps_the_live_rows(store):
+    table = store._get_table(TABLE)  # pylint: disable=protected-access
+    before = snapshot(table)
+
+    assert store.build_vector_index(TABLE)
+
+    assert table.alive.all() and table.count == 16
+    assert snapshot(table) == before
+    assert snapshot(reopen(store)) == before
+    assert table_files(store) == ["embeddings.1.f32", "rows.1.jsonl", "state.json"]
+
+
+def test_writes_after_compaction_are_durable(store):
+    assert store.build_vector_index(TABLE)
+    assert (
+        store.insert_embeddings_bulk(
+            [("file_0.py", 0, "back", vector(7))], table_name=TABLE
+        )
+        == []
+    )
+    table = store._get_table(TABLE)  # pylint: disable=protected-access
+    before = snapshot(table)
+
+    assert ("file_0.py", 0) in before[0]
+    assert snapshot(reopen(store)) == before
+
+
+def test_failed_compaction_leaves_the_table_untouched(store, monkeypatch):
+    table = store._get_table(TABLE)  # pylint: disable=protected-access
+    before = snapshot(table)
+    files = table_files(store)
+
+    def full_disk(*_args):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(_VectorTable, "_write_log", full_disk)
+    assert not store.build_vector_index(TABLE)
+
+    assert table_files(store) == files
+    assert snapshot(table) == before
+    assert snapshot(reopen(store)) == before
+
+
+def test_crash_before_the_switch_keeps_the_current_generation(store, monkeypatch):
+    table = store._get_table(TABLE)  # pylint: disable=protected-access
+    before = snapshot(table)
+    files = table_files(store)
+
+    def crash():
+        raise SystemExit("killed")
+
+    monkeypatch.setattr(table, "_save_state", crash)
+    with pytest.raises(SystemExit):
+        table.compact()
+    monkeypatch.undo()
+
+    reopened = reopen(store)
+    assert snapshot(reopened) == before
+    assert table_files(store) == files
+
+
+def test_crash_after_the_switch_uses_the_new_generation(store, monkeypatch):
+    table = store._get_table(TABLE)  # pylint: disable=protected-access
+    before = snapshot(table)
+    monkeypatch.setattr("pathlib.Path.unlink", lambda *_args, **_kwargs: None)
+    table.compact()
+    monkeypatch.undo()
+    assert "rows.jsonl" in table_files(store)
+
+    reopened = reopen(store)
+    assert snapshot(reopened) == before
+    assert table_files(store) == ["embeddings.1.f32", "rows.1.jsonl", "state.json"]
+
+
+def test_torn_last_line_is_ignored(store):
+    before = snapshot(store._get_table(TABLE))  # pylint: disable=protected-access
+    store.disconnect()
+    with open(store.base_dir / TABLE / "rows.jsonl", "a", encoding="utf-8") as file:
+        file.write(
+            '{"op": "add", "row": 21, "filename": "new.py", "chunk_order": 0, "con'
+        )
+
+    assert store.setup_database(TABLE, vector_dimension=DIMENSION)
+    table = store._get_table(TABLE)  # pylint: disable=protected-access
+    assert snapshot(table) == before
+    assert store.insert_embeddings_bulk([("new.py", 0, "new", vector(7))], TABLE) == []
+
+    reopened = reopen(store)
+    assert reopened.contents[reopened.keys[("new.py", 0)]] == "new"
+    assert len(reopened.keys) == len(before[0]) + 1
+
+
+def test_tables_of_an_earlier_process_are_searched_without_setup(store):
+    expected = store.search_similar(vector(3), k=3, table_name=TABLE)
+    store.disconnect()
+
+    # A new process only knows the files of the table
+    other = NumpyVectorStore(LOGGER, store.base_dir)
+    try:
+        assert other.search_similar(vector(3), k=3, table_name=TABLE) == expected
+        assert expected[0]["filename"] == "file_3.py"
+        assert other.delete_file_chunks(["file_3.py"], table_name=TABLE)
+        assert all(
+            hit["filename"] != "file_3.py"
+            for hit in other.search_similar(vector(3), k=3, table_name=TABLE)
+        )
+        assert other.search_similar(vector(3), table_name="missing") == []
+        assert not (store.base_dir / "missing").exists()
+    finally:
+        other.disconnect()
@@ -0,0 +1,109 @@
+"""A crashed worker process must not abort the run"""
+
+import os
+import pytest
+from src.core import batch_scheduler, chunking_pool
+from src.core.batch_scheduler import BatchScheduler, RepoJob
+from src.core.chunking_pool import ChunkingPool
+from tests.conftest import LOGGER
+
+PARENT_PID = os.getpid()
+
+
+def crash_in_worker():
+    """Kill the worker process like the OOM killer would."""
+    if os.getpid() != PARENT_PID:
+        os._exit(1)  # pylint: disable=protected-access
+
+
+SPLIT_BATCH = chunking_pool._split_batch  # pylint: disable=protected-access
+
+
+def crashing_split_batch(batch):
+    if any(filename == "crash.py" for filename, _, _ in batch):
+        crash_in_worker()
+    return SPLIT_BATCH(batch)
+
+
+def test_chunking_pool_splits_in_process_after_a_crash(monkeypatch):
+    monkeypatch.setattr(chunking_pool, "_split_batch", crashing_split_batch)
+    names = [f"file_{idx}.py" for idx in range(12)]
+    names.insert(5, "crash.py")
+    jobs = [(name, (name, None, f"value = {idx}\n")) for idx, name in enumerate(names)]
+
+    results = list(ChunkingPool(LOGGER, processes=2, batch_size=2).imap(jobs))
+
+    assert [key for key, _ in results] == names
+    assert all(chunks for _, chunks in results)
+
+
+def fake_init_worker(*_args):
+    """The real one sets up file loggers"""
+
+
+def fake_run_job(job):
+    if job.url.endswith("crash"):
+        crash_in_worker()
+    return {"status": "succeeded", "error": None, "pid": os.getpid()}
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_scheduler_fails_only_the_crashing_repository(
+    monkeypatch, tmp_path, max_workers
+):
+    monkeypatch.setattr(batch_scheduler, "_init_worker", fake_init_worker)
+    monkeypatch.setattr(batch_scheduler, "_run_job", fake_run_job)
+    urls = ["https://example.com/a", "https://example.com/crash"] + [
+        f"https://example.com/repo_{idx}" for idx in range(4)
+    ]
+
+    status = BatchScheduler(
+        LOGGER, max_workers=max_workers, status_path=tmp_path / "status.json"
+    ).run([RepoJob(url=url) for url in urls])
+
+    assert status["https://example.com/crash"]["status"] == "failed"
+    assert "crashed" in status["https://example.com/crash"]["error"]
+    assert all(
+        entry["status"] == "succeeded"
+        for url, entry in status.items()
+        if not url.endswith("crash")
+    )
+
+
+WORKER_LIMITS = {}
+
+
+def limited_init_worker(embedding_requests, _db_connections):
+    WORKER_LIMITS["embedding"] = embedding_requests
+
+
+def slot_holding_run_job(job):
+    """Hold the only embedding slot, and crash while holding it."""
+    if not WORKER_LIMITS["embedding"].acquire(timeout=2):
+        return {"status": "failed", "error": "No embedding slot", "pid": os.getpid()}
+    if job.url.endswith("crash"):
+        crash_in_worker()
+    WORKER_LIMITS["embedding"].release()
+    return {"status": "succeeded", "error": None, "pid": os.getpid()}
+
+
+def test_slots_held_by_a_crashed_worker_are_not_lost(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch_scheduler, "_init_worker", limited_init_worker)
+    monkeypatch.setattr(batch_scheduler, "_run_job", slot_holding_run_job)
+    urls = ["https://example.com/crash"] + [
+        f"https://example.com/repo_{idx}" for idx in range(3)
+    ]
+
+    status = BatchScheduler(
+        LOGGER,
+        max_workers=1,
+        embedding_concurrency=1,
+        status_path=tmp_path / "status.json",
+    ).run([RepoJob(url=url) for url in urls])
+
+    assert status["https://example.com/crash"]["status"] == "failed"
+    assert all(
+        entry["status"] == "succeeded"
+        for url, entry in status.items()
+        if not url.endswith("crash")
+    ), status
@@ -0,0 +1,95 @@
+"""Files changed between the indexed commit and HEAD"""
+
+import git
+import pytest
+from src.core.repo_manager import RepoChanges, RepoManager
+from tests.conftest import LOGGER
+
+IDENTITY = {
+    "GIT_AUTHOR_NAME": "Test",
+    "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "Test",
+    "GIT_COMMITTER_EMAIL": "test@example.com",
+}
+
+
+def commit(repo: git.Repo, files: dict, message: str) -> str:
+    """Write (or delete, for None) the files and commit them, returns the SHA."""
+    for filename, content in files.items():
+        path = repo.working_tree_dir + "/" + filename
+        if content is None:
+            repo.git.rm("-q", filename)
+            continue
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        repo.git.add(filename)
+    repo.git.commit("-q", "-m", message)
+    return repo.head.commit.hexsha
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = git.Repo.init(tmp_path / "repo")
+    repo.git.update_environment(**IDENTITY)
+    yield repo
+    repo.close()
+
+
+def test_added_modified_deleted_and_renamed(repo):
+    long_text = "".join(f"line {idx}\n" for idx in range(40))
+    first = commit(
+        repo,
+        {
+            "keep.py": "a = 1\n",
+            "edit.py": "b = 1\n",
+            "gone.py": "c = 1\n",
+            "old name.py": long_text,
+        },
+        "first",
+    )
+    repo.git.mv("old name.py", "new name.py")
+    commit(
+        repo, {"edit.py": "b = 2\n", "gone.py": None, "added.py": "d = 1\n"}, "second"
+    )
+
+    changes = RepoManager(LOGGER).get_changed_files(repo.working_tree_dir, first)
+
+    assert changes == RepoChanges(
+        added={"added.py"},
+        modified={"edit.py"},
+        deleted={"gone.py"},
+        renamed=[("old name.py", "new name.py")],
+    )
+    assert changes.files_to_index == {"added.py", "edit.py", "new name.py"}
+    assert changes.files_to_remove == {"edit.py", "gone.py", "old name.py"}
+    assert not changes.is_empty()
+
+
+def test_no_change_since_the_commit(repo):
+    first = commit(repo, {"keep.py": "a = 1\n"}, "first")
+
+    changes = RepoManager(LOGGER).get_changed_files(repo.working_tree_dir, first)
+
+    assert changes.is_empty()
+
+
+def test_copies_are_indexed_as_added(repo, monkeypatch):
+    first = commit(repo, {"keep.py": "a = 1\n"}, "first")
+    output = "\0".join(
+        ["C100", "keep.py", "copy.py", "R087", "a.py", "b.py", "M", "keep.py", ""]
+    )
+    monkeypatch.setattr(git.cmd.Git, "diff", lambda self, *args: output, raising=False)
+
+    changes = RepoManager(LOGGER).get_changed_files(repo.working_tree_dir, first)
+
+    assert changes == RepoChanges(
+        added={"copy.py"}, modified={"keep.py"}, renamed=[("a.py", "b.py")]
+    )
+
+
+def test_unknown_commit_returns_none(repo):
+    commit(repo, {"keep.py": "a = 1\n"}, "first")
+
+    assert (
+        RepoManager(LOGGER).get_changed_files(repo.working_tree_dir, "0" * 40) is None
+    )
@@ -0,0 +1,51 @@
+"""Adaptive concurrency of the async resilient embedding service"""
+
+import asyncio
+from typing import Dict, List, Optional
+from src.embeddings.base_embedding import BaseAsyncEmbeddingService
+from src.embeddings.resilient_embedding import (
+    AdaptiveConcurrencyLimit,
+    AsyncResilientEmbeddingService,
+)
+from tests.conftest import LOGGER
+
+
+class _SlowAsyncService(BaseAsyncEmbeddingService):
+    """Async embeddings that take a while, recording the calls in flight"""
+
+    def __init__(self, logger):
+        super().__init__(logger)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def agenerate_embeddings(
+        self, contents: List[str]
+    ) -> List[Optional[List[float]]]:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return [[float(len(content))] for content in contents]
+
+    def get_model_info(self) -> Dict[str, str]:
+        return {"provider": "fake", "model": "fake"}
+
+
+def test_calls_wait_for_a_slot_in_each_new_event_loop():
+    wrapped = _SlowAsyncService(LOGGER)
+    service = AsyncResilientEmbeddingService(LOGGER, wrapped)
+    # pylint: disable=protected-access
+    service._resilience.limit = AdaptiveConcurrencyLimit(minimum=1, maximum=1)
+
+    async def repository(texts: List[str]):
+        return await asyncio.gather(
+            *(service.agenerate_embeddings([text]) for text in texts)
+        )
+
+    # One asyncio.run per repository, as process_entries does
+    first = asyncio.run(repository(["a", "bb", "ccc"]))
+    second = asyncio.run(repository(["dddd", "eeeee", "ffffff"]))
+
+    assert first == [[[1.0]], [[2.0]], [[3.0]]]
+    assert second == [[[4.0]], [[5.0]], [[6.0]]]
+    assert wrapped.max_in_flight == 1
@@ -0,0 +1,104 @@
+"""Top-k similarity search of VectorDatabase"""
+
+import psycopg2
+import pytest
+import src.db.vdb_manager as vdb_manager
+
+
+def _answer_rows(rows):
+    def answer(text, params):
+        return rows if text.lstrip().startswith("SELECT q.query_idx") else []
+
+    return answer
+
+
+def test_results_are_grouped_by_query(fake_postgres):
+    database, connection = fake_postgres
+    connection.answer = _answer_rows(
+        [(1, "a.py", 0, "a", 0.1), (1, "c.py", 2, "c", 0.3), (3, "b.py", 1, "b", 0.2)]
+    )
+
+    results = database.search_similar_batch(
+        [[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]], 2, "t"
+    )
+
+    assert [[hit["filename"] for hit in hits] for hits in results] == [
+        ["a.py", "c.py"],
+        [],
+        ["b.py"],
+    ]
+    assert results[0][1] == {
+        "filename": "c.py",
+        "chunk_order": 2,
+        "content": "c",
+        "distance": 0.3,
+    }
+    (search,) = connection.executed("SELECT q.query_idx")
+    assert search[1] == [["[1.0,0.0]", "[0.0,1.0]", "[0.5,0.5]"], 2]
+
+
+def test_search_similar_returns_the_hits_of_one_query(fake_postgres):
+    database, connection = fake_postgres
+    connection.answer = _answer_rows([(1, "a.py", 0, "a", 0.1)])
+
+    assert [hit["filename"] for hit in database.search_similar([1.0], 1, "t")] == [
+        "a.py"
+    ]
+    assert not database.search_similar_batch([], 1, "t")
+
+
+def test_probes_are_set_for_the_transaction_only(fake_postgres, monkeypatch):
+    database, connection = fake_postgres
+
+    database.search_similar([1.0], 5, "t")
+    database.search_similar([1.0], 5, "t", probes=25)
+    monkeypatch.setattr(vdb_manager, "VECTOR_INDEX_TYPE", "hnsw")
+    database.search_similar([1.0], 5, "t", ef_search=100)
+
+    assert [text for text, _ in connection.executed("SET LOCAL")] == [
+        f"SET LOCAL ivfflat.probes = {vdb_manager.VECTOR_SEARCH_PROBES};",
+        "SET LOCAL ivfflat.probes = 25;",
+        "SET LOCAL hnsw.ef_search = 100;",
+    ]
+
+
+def test_filters_become_query_parameters(fake_postgres):
+    database, connection = fake_postgres
+
+    database.search_similar(
+        [1.0],
+        3,
+        "t",
+        filters={
+            "filename": ["a.py", "b.py"],
+            "filename_prefix": "src/my_%",
+            "chunk_order": 0,
+        },
+    )
+
+    (search,) = connection.executed("SELECT q.query_idx")
+    assert (
+        'FROM "t" WHERE filename = ANY(%s) AND filename LIKE %s AND chunk_order = %s'
+        in search[0]
+    )
+    assert search[1] == [["[1.0]"], ["a.py", "b.py"], "src/my\\_\\%%", 0, 3]
+
+
+def test_unsupported_filter_is_rejected(fake_postgres):
+    database, connection = fake_postgres
+
+    with pytest.raises(ValueError, match="content"):
+        database.search_similar([1.0], 3, "t", filters={"content": "x"})
+    assert not connection.executed("SELECT")
+
+
+def test_failed_search_returns_no_result(fake_postgres):
+    database, connection = fake_postgres
+    connection.fail = lambda text, params: (
+        psycopg2.ProgrammingError("no such table")
+        if text.lstrip().startswith("SELECT")
+        else None
+    )
+
+    assert database.search_similar([1.0], 3, "t") == []
+    assert connection.rollbacks == 1
@@ -0,0 +1,114 @@
+"""Chunks measured and packed in tokens of the embedding model"""
+
+import sys
+import pytest
+import src.core.token_counter as token_counter
+from src.core.code_chunker import CodeChunker
+from src.core.token_counter import (
+    ChunkSizing,
+    TokenCounter,
+    chunk_token_budget,
+    get_chunk_sizing,
+    get_token_counter,
+)
+from tests.conftest import LOGGER
+
+
+def test_estimate_counts_the_extra_utf8_bytes():
+    counter = TokenCounter(chars_per_token=4)
+
+    assert counter.count("") == 0
+    assert counter.count("abcdefgh") == 2
+    assert counter.count("abcdefg") == 2
+    # 4 characters and 8 extra UTF-8 bytes
+    assert counter.count("日本語だ") == 1 + 4
+
+
+@pytest.mark.parametrize(
+    "tokenizer",
+    ["estimate", "auto", "unknown", "tiktoken:cl100k_base", "huggingface:bge-m3"],
+)
+def test_unavailable_tokenizers_fall_back_to_the_estimate(monkeypatch, tokenizer):
+    monkeypatch.setattr(token_counter, "EMBEDDING_PROVIDER", "ollama")
+    # Not installed: the import raises ImportError
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    monkeypatch.setitem(sys.modules, "tokenizers", None)
+
+    counter = get_token_counter(LOGGER, tokenizer)
+
+    assert type(counter) is TokenCounter  # pylint: disable=unidiomatic-typecheck
+    assert counter.name == "estimate"
+
+
+def test_auto_uses_tiktoken_for_openai(monkeypatch):
+    monkeypatch.setattr(token_counter, "EMBEDDING_PROVIDER", "openai")
+    created = []
+    monkeypatch.setattr(
+        token_counter, "TiktokenCounter", lambda encoding: created.append(encoding)
+    )
+
+    get_token_counter(LOGGER, "auto")
+
+    assert created == ["cl100k_base"]
+
+
+@pytest.mark.parametrize(
+    "model, budget, expected",
+    [
+        ("all-minilm", 1024, 230),
+        ("nomic-embed-text", 1024, 1024),
+        ("unknown-model", 5000, 5000),
+        ("unknown-model", 0, 1),
+    ],
+)
+def test_budget_is_capped_by_the_context_of_the_model(model, budget, expected):
+    assert chunk_token_budget(model, budget) == expected
+
+
+def test_sizing_in_characters(monkeypatch):
+    monkeypatch.setattr(token_counter, "TOKEN_CHUNKING_ENABLED", False)
+
+    sizing = get_chunk_sizing(LOGGER)
+
+    assert sizing == ChunkSizing(
+        len,
+        token_counter.CHUNK_SIZE_CODE,
+        token_counter.CHUNK_OVERLAP_CODE,
+        token_counter.CHUNK_OVERLAP_SYNTAX,
+        "chars",
+    )
+
+
+def test_sizing_in_tokens(monkeypatch):
+    monkeypatch.setattr(token_counter, "TOKEN_CHUNKING_ENABLED", True)
+    monkeypatch.setattr(token_counter, "CHUNK_TOKENIZER", "estimate")
+    monkeypatch.setattr(token_counter, "EMBEDDING_PROVIDER", "ollama")
+    monkeypatch.setattr(token_counter, "OLLAMA_EMBEDDING_MODEL", "all-minilm:latest")
+    monkeypatch.setattr(token_counter, "CHUNK_TOKEN_BUDGET", 1024)
+    monkeypatch.setattr(token_counter, "CHUNK_CHARS_PER_TOKEN", 4.0)
+    monkeypatch.setattr(token_counter, "CHUNK_OVERLAP_CODE", 200)
+    monkeypatch.setattr(token_counter, "CHUNK_OVERLAP_SYNTAX", 1000)
+
+    sizing = get_chunk_sizing(LOGGER)
+
+    assert sizing.unit == "tokens"
+    assert sizing.chunk_size == 230
+    assert sizing.chunk_overlap == 50
+    # Capped to half the budget
+    assert sizing.syntax_overlap == 115
+    assert sizing.length_function("abcdefgh") == TokenCounter().count("abcdefgh")
+
+
+def test_chunks_are_packed_up_to_the_token_budget():
+    counter = TokenCounter(chars_per_token=4)
+    sizing = ChunkSizing(counter.count, 40, 0, 0, "tokens")
+    module = "\n\n".join(
+        f"def función_{idx}(valor):\n    return '{'é' * idx}'\n" for idx in range(30)
+    )
+
+    chunks = CodeChunker(LOGGER, sizing).split(module, "module.py")
+
+    assert sum(chunk.count("def ") for chunk in chunks) == 30
+    assert all(counter.count(chunk) <= 40 for chunk in chunks)
+    # Measured in characters, the chunks would be much bigger
+    assert max(len(chunk) for chunk in chunks) > 40
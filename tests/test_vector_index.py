@@ -0,0 +1,95 @@
+"""Deferred build of the vector index"""
+
+import pytest
+import src.db.vdb_manager as vdb_manager
+from tests.conftest import render_sql
+
+
+def _index_query(database, row_count: int = 0, **kwargs) -> str:
+    build = database._build_index_query  # pylint: disable=protected-access
+    return " ".join(render_sql(build("t", row_count, **kwargs)).split())
+
+
+def _answer(index_exists: bool, row_count: int):
+    def answer(text, params):
+        if "FROM pg_indexes" in text:
+            return [(1,)] if index_exists else []
+        if text.startswith("SELECT COUNT(*)"):
+            return [(row_count,)]
+        return []
+
+    return answer
+
+
+@pytest.mark.parametrize(
+    "row_count, lists",
+    [(0, 100), (500, 1), (50_000, 50), (1_000_000, 1000), (4_000_000, 2000)],
+)
+def test_ivfflat_lists_follow_the_row_count(fake_postgres, row_count, lists):
+    database, _ = fake_postgres
+
+    assert _index_query(database, row_count) == (
+        'CREATE INDEX "idx_t_embedding" ON "t" USING '
+        f"ivfflat (embedding vector_cosine_ops) WITH (lists = {lists});"
+    )
+
+
+def test_hnsw_index(fake_postgres, monkeypatch):
+    database, _ = fake_postgres
+    monkeypatch.setattr(vdb_manager, "VECTOR_INDEX_TYPE", "hnsw")
+    monkeypatch.setattr(vdb_manager, "HNSW_M", 24)
+    monkeypatch.setattr(vdb_manager, "HNSW_EF_CONSTRUCTION", 80)
+
+    assert _index_query(database, if_not_exists=True) == (
+        'CREATE INDEX IF NOT EXISTS "idx_t_embedding" ON "t" USING '
+        "hnsw (embedding vector_cosine_ops) WITH (m = 24, ef_construction = 80);"
+    )
+
+
+@pytest.mark.parametrize("create_index", [True, False])
+def test_setup_can_defer_the_index(fake_postgres, create_index):
+    database, connection = fake_postgres
+
+    assert database.setup_database(table_name="t", create_index=create_index)
+
+    assert bool(connection.executed("CREATE INDEX IF NOT EXISTS")) == create_index
+
+
+def test_build_sizes_the_index_on_the_loaded_rows(fake_postgres):
+    database, connection = fake_postgres
+    connection.answer = _answer(index_exists=False, row_count=20_000)
+
+    assert database.build_vector_index("t")
+
+    statements = [" ".join(text.split()) for text, _ in connection.statements]
+    # After the existence check and the row count
+    assert statements[2:] == [
+        "SET LOCAL maintenance_work_mem = "
+        f"'{vdb_manager.VECTOR_INDEX_MAINTENANCE_WORK_MEM}';",
+        "SET LOCAL max_parallel_maintenance_workers = "
+        f"{vdb_manager.VECTOR_INDEX_PARALLEL_WORKERS};",
+        'DROP INDEX IF EXISTS "idx_t_embedding";',
+        'CREATE INDEX "idx_t_embedding" ON "t" USING '
+        "ivfflat (embedding vector_cosine_ops) WITH (lists = 20);",
+    ]
+    assert connection.commits == 1
+
+
+@pytest.mark.parametrize("rebuild", [False, True])
+def test_existing_index_is_only_rebuilt_on_request(fake_postgres, rebuild):
+    database, connection = fake_postgres
+    connection.answer = _answer(index_exists=True, row_count=3_000)
+
+    assert database.build_vector_index("t", rebuild=rebuild)
+
+    assert bool(connection.executed("DROP INDEX")) == rebuild
+    assert bool(connection.executed("CREATE INDEX")) == rebuild
+
+
+def test_empty_table_is_not_indexed(fake_postgres):
+    database, connection = fake_postgres
+    connection.answer = _answer(index_exists=False, row_count=0)
+
+    assert database.build_vector_index("t", rebuild=True)
+
+    assert not connection.executed("CREATE INDEX")